@@ -0,0 +1,268 @@
+# analysis_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 파싱 결과 / LLM 프로파일 내용 주소 캐시 (SQLite, LRU)
+======================================================================
+
+[시스템 개요]
+같은 카카오톡 내보내기 파일을 다시 올리거나 다른 사용자가 이미 올린 파일을 올리면
+parse_target_rows와 call_llm_profile이 처음부터 다시 실행됩니다.
+업로드 파일을 저장하면서 SHA-256을 계산해 두고, 결과를 내용 기준 키로 로컬 SQLite에 저장합니다.
+
+[캐시 키]
+- parse:   (파일 해시, 대상자 이름(정규화), main.PARSER_VERSION) -> rows, ParseQuality
+- roster:  (파일 해시, main.PARSER_VERSION)                     -> 화자 목록 (화자 선택 화면용)
+- profile: (llm_input 해시, 모델명)                                -> LLM 프로파일 JSON
+파서 로직이 바뀌면 main.PARSER_VERSION을 올려 이전 파싱 결과가 재사용되지 않게 합니다.
+프롬프트가 바뀌면 main.PROFILE_PROMPT_VERSION을 올립니다. (profile 키에 포함)
+
+[저장소]
+- ANALYSIS_CACHE_PATH의 SQLite 파일 하나 (워커 프로세스/스레드 간 공유, WAL 모드)
+- 값은 zlib 압축 JSON, 전체 크기가 ANALYSIS_CACHE_MAX_MB를 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+- 캐시 오류는 분석을 막지 않습니다. (로그만 남기고 캐시 미사용으로 처리)
+
+[사용법]
+  file_hash = save_and_hash(file_storage, save_path)
+  cached = AnalysisCache.get_parse(file_hash, target_name)
+  AnalysisCache.put_parse(file_hash, target_name, rows, quality)
+"""
+
+import os
+import json
+import zlib
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import asdict
+
+from config import config_by_name
+
+logger = logging.getLogger(__name__)
+
+env = os.getenv('FLASK_ENV', 'development')
+cfg = config_by_name[env]
+
+# 업로드 스트리밍/해시 계산 단위
+HASH_CHUNK_SIZE = 1024 * 1024
+# 제거 후 목표 크기 (최대 크기 대비 비율, 매 저장마다 제거가 일어나지 않도록 여유를 둠)
+_EVICT_TARGET_RATIO = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    cache_key   TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    value       BLOB NOT NULL,
+    size_bytes  INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access ON cache_entries (last_access);
+"""
+
+
+def save_and_hash(file_storage, save_path):
+    """업로드 파일을 청크 단위로 저장하면서 SHA-256을 계산합니다. (파일을 다시 읽지 않음)"""
+    digest = hashlib.sha256()
+    stream = file_storage.stream
+    with open(save_path, 'wb') as out:
+        while True:
+            chunk = stream.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """저장된 파일의 SHA-256 (업로드 시 해시가 기록되지 않은 작업용)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _stable_hash(obj):
+    """dict/list를 키 순서와 무관한 JSON으로 직렬화하여 SHA-256을 계산합니다."""
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """내용 주소 기반 분석 캐시 (프로세스 간 공유 SQLite 파일)"""
+
+    _local = threading.local()  # 스레드별 sqlite3 연결
+    _init_lock = threading.Lock()
+    _initialized_path = None
+
+    # -------------------------------------------------------------------
+    # [키]
+    # -------------------------------------------------------------------
+    @staticmethod
+    def parse_key(file_hash, target_name):
+        import main as analyzer
+
+        # parse_target_rows는 이름을 공백 제거 + 소문자로 비교하므로 같은 규칙으로 정규화
+        name = (target_name or '').strip().lower()
+        return f"parse:{analyzer.PARSER_VERSION}:{file_hash}:{_stable_hash(name)[:16]}"
+
+    @staticmethod
+    def roster_key(file_hash):
+        import main as analyzer
+
+        return f"roster:{analyzer.PARSER_VERSION}:{file_hash}"
+
+    @staticmethod
+    def profile_key(llm_input, model):
+        import main as analyzer
+
+        return f"profile:{analyzer.PROFILE_PROMPT_VERSION}:{model or ''}:{_stable_hash(llm_input)}"
+
+    # -------------------------------------------------------------------
+    # [파싱 결과]
+    # -------------------------------------------------------------------
+    @classmethod
+    def get_parse(cls, file_hash, target_name):
+        """캐시된 (rows, ParseQuality)를 반환합니다. (없으면 None)"""
+        import main as analyzer
+
+        if not file_hash:
+            return None
+        value = cls.get(cls.parse_key(file_hash, target_name))
+        if value is None:
+            return None
+        return value['rows'], analyzer.ParseQuality(**value['quality'])
+
+    @classmethod
+    def put_parse(cls, file_hash, target_name, rows, quality):
+        if not file_hash:
+            return
+        cls.put(cls.parse_key(file_hash, target_name), 'parse', {'rows': rows, 'quality': asdict(quality)})
+
+    @classmethod
+    def get_roster(cls, file_hash):
+        """파일의 화자 목록 [{"name", "message_count"}] (없으면 None)"""
+        return cls.get(cls.roster_key(file_hash)) if file_hash else None
+
+    @classmethod
+    def put_roster(cls, file_hash, roster):
+        if file_hash:
+            cls.put(cls.roster_key(file_hash), 'roster', roster)
+
+    # -------------------------------------------------------------------
+    # [LLM 프로파일]
+    # -------------------------------------------------------------------
+    @classmethod
+    def get_profile(cls, llm_input, model):
+        return cls.get(cls.profile_key(llm_input, model))
+
+    @classmethod
+    def put_profile(cls, llm_input, model, profile):
+        cls.put(cls.profile_key(llm_input, model), 'profile', profile)
+
+    # -------------------------------------------------------------------
+    # [저장소]
+    # -------------------------------------------------------------------
+    @classmethod
+    def get(cls, key):
+        conn = cls._connect()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT value FROM cache_entries WHERE cache_key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE cache_entries SET last_access = ? WHERE cache_key = ?", (time.time(), key))
+            conn.commit()
+            return json.loads(zlib.decompress(row[0]).decode('utf-8'))
+        except Exception:
+            logger.exception(f"[AnalysisCache] 조회 실패 (key={key[:40]})")
+            return None
+
+    @classmethod
+    def put(cls, key, kind, value):
+        conn = cls._connect()
+        if conn is None:
+            return
+        try:
+            blob = zlib.compress(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+            max_bytes = cls._max_bytes()
+            if len(blob) > max_bytes:
+                return  # 캐시 전체보다 큰 항목은 저장하지 않음
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (cache_key, kind, value, size_bytes, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, sqlite3.Binary(blob), len(blob), now, now)
+            )
+            conn.commit()
+            cls._evict(conn, max_bytes)
+        except Exception:
+            logger.exception(f"[AnalysisCache] 저장 실패 (key={key[:40]})")
+
+    @classmethod
+    def stats(cls):
+        """종류별 항목 수와 크기 (관리/점검용)"""
+        conn = cls._connect()
+        if conn is None:
+            return {}
+        rows = conn.execute("SELECT kind, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM cache_entries GROUP BY kind").fetchall()
+        return {kind: {'entries': count, 'bytes': size} for kind, count, size in rows}
+
+    @classmethod
+    def clear(cls):
+        conn = cls._connect()
+        if conn is None:
+            return
+        conn.execute("DELETE FROM cache_entries")
+        conn.commit()
+
+    @staticmethod
+    def _max_bytes():
+        return int(cfg.ANALYSIS_CACHE_MAX_MB * 1024 * 1024)
+
+    @staticmethod
+    def _evict(conn, max_bytes):
+        """전체 크기가 최대치를 넘으면 last_access가 오래된 항목부터 목표 크기까지 삭제"""
+        total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM cache_entries").fetchone()[0]
+        if total <= max_bytes:
+            return
+        target = int(max_bytes * _EVICT_TARGET_RATIO)
+        removed, evicted = 0, 0
+        for key, size in conn.execute(
+                "SELECT cache_key, size_bytes FROM cache_entries ORDER BY last_access").fetchall():
+            if total - removed <= target:
+                break
+            conn.execute("DELETE FROM cache_entries WHERE cache_key = ?", (key,))
+            removed += size
+            evicted += 1
+        conn.commit()
+        logger.info(f"[AnalysisCache] LRU 제거 {evicted}건 ({removed / 1024 / 1024:.1f}MB)")
+
+    @classmethod
+    def _connect(cls):
+        """스레드별 연결을 반환합니다. 비활성화되었거나 열 수 없으면 None."""
+        if not cfg.ANALYSIS_CACHE_ENABLED or not cfg.ANALYSIS_CACHE_PATH:
+            return None
+        path = cfg.ANALYSIS_CACHE_PATH
+        conn = getattr(cls._local, 'conn', None)
+        if conn is not None and getattr(cls._local, 'path', None) == path:
+            return conn
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            conn = sqlite3.connect(path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with cls._init_lock:
+                if cls._initialized_path != path:
+                    conn.executescript(_SCHEMA)
+                    cls._initialized_path = path
+        except Exception:
+            logger.exception(f"[AnalysisCache] 캐시 파일을 열 수 없습니다: {path}")
+            return None
+        cls._local.conn, cls._local.path = conn, path
+        return conn
@@ -0,0 +1,704 @@
+# analysis_pipeline.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 채팅 로그 분석 작업 대기열 (DB 기반 백그라운드 파이프라인)
+======================================================================
+
+[시스템 개요]
+.txt 채팅 로그 분석(파싱 → 수치 신호 → LLM 프로파일링)은 LLM 응답 시간 동안 수십 초가 걸립니다.
+업로드 요청은 파일 저장과 작업 등록(analysis_jobs)만 하고 즉시 상태 페이지로 이동하며,
+실제 분석은 워커가 대기열에서 작업을 선점(claim)하여 처리합니다.
+클라이언트는 /api/analysis/<job_code>를 폴링하거나 실시간 채널(analysis:<job_code>)을 구독합니다.
+
+[작업 상태]
+QUEUED → RUNNING → COMPLETED / FAILED
+(ChatLog.process_status도 PENDING → PROCESSING → COMPLETED / FAILED로 함께 갱신)
+대상자 이름이 비었거나 파일에 없으면 RUNNING → AWAITING_SPEAKER (speaker_roster에 화자 목록 기록)
+→ 사용자가 화자를 고르면(select_speaker) 다시 QUEUED. 파일은 한 번만 읽고 화자별 파싱 결과를 캐시해 두므로
+재분석 시 파일을 다시 파싱하지 않습니다.
+
+[워커 모드] (ANALYSIS_WORKER_MODE)
+- embedded: 웹 프로세스 내부 스레드 ANALYSIS_WORKER_CONCURRENCY개가 처리 (별도 프로세스 불필요, 기본값)
+            프로세스의 첫 요청에서 start_embedded가 중단된 작업을 정리하고 워커/정리 스레드를 시작하므로
+            gunicorn처럼 __main__을 거치지 않는 실행에서도 대기 중인 작업이 처리됩니다.
+- external: 웹 프로세스는 등록만 하고, python analysis_worker.py 프로세스가 처리
+            (동시 분석 수 = 워커 프로세스 수 × --concurrency)
+- inline:   업로드 요청 안에서 바로 처리 (기존 동기 방식)
+
+[선점 방식]
+여러 워커/프로세스가 같은 작업을 가져가지 않도록 "UPDATE ... WHERE job_id=? AND status='QUEUED'"의
+영향 행 수로 선점 성공 여부를 판단합니다. (행 잠금 없이 MySQL/SQLite 모두 동작)
+처리 중인 워커는 ANALYSIS_HEARTBEAT_SECONDS마다 heartbeat_at을 갱신하고, 하트비트가
+ANALYSIS_JOB_TIMEOUT_SECONDS 동안 끊긴 RUNNING 작업(워커 비정상 종료)은 requeue_stale_job이 다시 대기열에 넣습니다.
+완료/실패/화자 선택 대기 기록은 "WHERE job_id=? AND worker_id=? AND status='RUNNING'" 조건부 UPDATE로 하며,
+그 사이 재등록되어 선점을 잃은 워커의 결과는 버립니다. (업로드 파일은 최종 상태를 기록한 워커만 삭제)
+
+[사용법]
+  job = AnalysisPipeline.enqueue(user_id, file_name, save_path, target_name)
+  AnalysisPipeline.get_status(job.job_code)
+"""
+
+import os
+import json
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from dataclasses import asdict
+
+from config import config_by_name
+from analysis_cache import AnalysisCache, hash_file
+import realtime
+
+logger = logging.getLogger(__name__)
+
+env = os.getenv('FLASK_ENV', 'development')
+cfg = config_by_name[env]
+
+# [보장 장치] big5.reasons가 비어있을 때 사용할 특성 이름
+BIG5_TRAIT_NAMES = {
+    'openness': '개방성',
+    'conscientiousness': '성실성',
+    'extraversion': '외향성',
+    'agreeableness': '우호성',
+    'neuroticism': '신경성'
+}
+
+# 한 번에 선점을 시도할 대기 작업 수 (다른 워커와 경쟁해 실패하면 다음 후보 시도)
+_CLAIM_CANDIDATES = 5
+# 화자 선택 화면에 보여주고 파싱 결과를 캐시해 둘 화자 수 (메시지 수 상위)
+ROSTER_LIMIT = 20
+# 워커 프로세스(embedded/external)가 중단된 작업을 정리하는 주기 (초)
+REQUEUE_INTERVAL_SECONDS = 60
+
+
+class SpeakerSelectionRequired(Exception):
+    """대상자 이름이 비었거나 파일에 없음 -> 화자 목록을 보여주고 선택을 기다림"""
+
+    def __init__(self, roster):
+        super().__init__("분석할 대화 참여자를 선택해주세요.")
+        self.roster = roster
+
+
+class AnalysisPipeline:
+    """분석 작업 등록/선점/처리 및 워커 스레드 관리"""
+
+    _wakeup = threading.Event()       # 새 작업 등록 시 같은 프로세스의 워커를 즉시 깨움
+    _workers_lock = threading.Lock()
+    _workers = []
+    _stop_event = None
+    _embedded_started = False
+
+    # -------------------------------------------------------------------
+    # [등록 / 조회]
+    # -------------------------------------------------------------------
+    @classmethod
+    def enqueue(cls, user_id, file_name, file_path, target_name, file_hash=None):
+        """ChatLog(PENDING)와 분석 작업(QUEUED)을 등록하고 커밋합니다."""
+        from extensions import db, ChatLog, AnalysisJob
+
+        log = ChatLog(
+            user_id=user_id,
+            file_name=file_name,
+            file_path=file_path,
+            target_name=target_name,
+            file_hash=file_hash,
+            process_status='PENDING'
+        )
+        db.session.add(log)
+        db.session.flush()
+
+        job = AnalysisJob(log_id=log.log_id, user_id=user_id)
+        db.session.add(job)
+        db.session.commit()
+
+        cls._wakeup.set()
+        logger.info(f"[AnalysisPipeline] 작업 등록 (job_id={job.job_id}, log_id={log.log_id})")
+        return job
+
+    @classmethod
+    def get_status(cls, job_code):
+        """상태 API 응답용 dict를 반환합니다. (작업이 없으면 None)"""
+        from extensions import db, AnalysisJob, AnalysisJobStatus
+
+        job = AnalysisJob.query.filter_by(job_code=job_code).first()
+        if job is None:
+            return None
+
+        position = None
+        if job.status == AnalysisJobStatus.QUEUED:
+            # 앞에 대기 중인 작업 수 (status, created_at 인덱스 사용)
+            position = db.session.query(db.func.count(AnalysisJob.job_id)).filter(
+                AnalysisJob.status == AnalysisJobStatus.QUEUED,
+                AnalysisJob.created_at < job.created_at
+            ).scalar()
+
+        return {
+            "job": job,
+            "status": job.status.value,
+            "queue_position": position,
+            "result_id": job.result_id,
+            "error": job.error_message,
+            "speakers": job.speaker_roster if job.status == AnalysisJobStatus.AWAITING_SPEAKER else None,
+        }
+
+    @classmethod
+    def select_speaker(cls, job, speaker_name):
+        """화자 선택 대기 중인 작업의 대상자를 지정하고 다시 대기열에 넣습니다."""
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+
+        names = {entry['name'] for entry in (job.speaker_roster or [])}
+        if job.status != AnalysisJobStatus.AWAITING_SPEAKER:
+            return {"success": False, "message": "화자 선택을 기다리는 작업이 아닙니다."}
+        if speaker_name not in names:
+            return {"success": False, "message": "대화 참여자 목록에서 선택해주세요."}
+
+        # 다른 요청이 먼저 선택했으면 무시 (중복 제출)
+        updated = AnalysisJob.query.filter_by(
+            job_id=job.job_id, status=AnalysisJobStatus.AWAITING_SPEAKER
+        ).update({
+            'status': AnalysisJobStatus.QUEUED,
+            'attempts': 0,
+            'worker_id': None,
+            'error_message': None,
+        }, synchronize_session=False)
+        if updated != 1:
+            db.session.rollback()
+            return {"success": False, "message": "이미 처리 중인 작업입니다."}
+        ChatLog.query.filter_by(log_id=job.log_id).update({'target_name': speaker_name}, synchronize_session=False)
+        db.session.commit()
+        db.session.refresh(job)
+
+        cls._wakeup.set()
+        logger.info(f"[AnalysisPipeline] 화자 선택 (job_id={job.job_id})")
+        return {"success": True, "message": "분석을 다시 시작합니다."}
+
+    # -------------------------------------------------------------------
+    # [선점 / 처리]
+    # -------------------------------------------------------------------
+    @classmethod
+    def claim_next(cls, worker_id):
+        """대기 중인 가장 오래된 작업을 선점하여 반환합니다. (없으면 None)"""
+        from extensions import db, AnalysisJob, AnalysisJobStatus
+
+        candidate_ids = [row[0] for row in db.session.query(AnalysisJob.job_id).filter(
+            AnalysisJob.status == AnalysisJobStatus.QUEUED
+        ).order_by(AnalysisJob.created_at, AnalysisJob.job_id).limit(_CLAIM_CANDIDATES).all()]
+
+        for job_id in candidate_ids:
+            job = cls.claim(job_id, worker_id)
+            if job is not None:
+                return job
+        return None
+
+    @classmethod
+    def claim(cls, job_id, worker_id):
+        """특정 작업을 선점합니다. 다른 워커가 먼저 가져갔으면 None을 반환합니다."""
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+
+        now = datetime.utcnow()
+        claimed = AnalysisJob.query.filter(
+            AnalysisJob.job_id == job_id,
+            AnalysisJob.status == AnalysisJobStatus.QUEUED
+        ).update({
+            AnalysisJob.status: AnalysisJobStatus.RUNNING,
+            AnalysisJob.worker_id: worker_id,
+            AnalysisJob.started_at: now,
+            AnalysisJob.heartbeat_at: now,
+            AnalysisJob.attempts: AnalysisJob.attempts + 1,
+        }, synchronize_session=False)
+        if claimed != 1:
+            db.session.rollback()
+            return None
+
+        job = db.session.get(AnalysisJob, job_id)
+        db.session.refresh(job)
+        ChatLog.query.filter_by(log_id=job.log_id).update({'process_status': 'PROCESSING'})
+        db.session.commit()
+        return job
+
+    @staticmethod
+    def _owned(job_id, worker_id):
+        """이 워커가 아직 선점하고 있는(RUNNING) 작업만 고르는 쿼리 (조건부 UPDATE용)"""
+        from extensions import AnalysisJob, AnalysisJobStatus
+
+        return AnalysisJob.query.filter(
+            AnalysisJob.job_id == job_id,
+            AnalysisJob.worker_id == worker_id,
+            AnalysisJob.status == AnalysisJobStatus.RUNNING
+        )
+
+    @classmethod
+    @contextmanager
+    def _heartbeat(cls, job_id, worker_id):
+        """블록을 실행하는 동안 별도 스레드가 ANALYSIS_HEARTBEAT_SECONDS마다 heartbeat_at을 갱신합니다."""
+        from flask import current_app
+        from extensions import db, AnalysisJob
+
+        app = current_app._get_current_object()
+        stop_event = threading.Event()
+
+        def beat():
+            while not stop_event.wait(timeout=cfg.ANALYSIS_HEARTBEAT_SECONDS):
+                with app.app_context():
+                    try:
+                        owned = cls._owned(job_id, worker_id).update(
+                            {AnalysisJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+                        db.session.commit()
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception(f"[AnalysisPipeline] 하트비트 기록 실패 (job_id={job_id})")
+                        continue
+                if owned != 1:
+                    logger.warning(f"[AnalysisPipeline] 다른 워커로 재등록된 작업 (job_id={job_id}, {worker_id})")
+                    return
+
+        thread = threading.Thread(target=beat, name=f"analysis-heartbeat-{job_id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop_event.set()
+            thread.join()
+
+    @classmethod
+    def run_job(cls, job):
+        """
+        선점한 작업을 분석하고 결과(COMPLETED/FAILED)를 기록합니다.
+        분석 도중 재등록되어 선점을 잃었으면 결과를 버리고 업로드 파일도 남겨 둡니다. (새로 선점한 워커가 사용)
+        """
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+        from match_manager import MatchManager
+
+        job_id, job_code, user_id, worker_id = job.job_id, job.job_code, job.user_id, job.worker_id
+        log = db.session.get(ChatLog, job.log_id)
+        file_path = log.file_path if log else None
+        finished = False  # 이 워커가 최종 상태(COMPLETED/FAILED)를 기록했는지 -> 업로드 파일 삭제
+        try:
+            if log is None:
+                raise ValueError("채팅 로그를 찾을 수 없습니다.")
+            log_id, target_name, file_hash = log.log_id, log.target_name, log.file_hash
+            db.session.commit()  # LLM 호출 동안 DB 연결/스냅샷을 점유하지 않도록 트랜잭션 종료
+
+            with cls._heartbeat(job_id, worker_id):
+                result = cls._analyze(log_id, file_path, file_hash, target_name, user_id)
+
+            owned = cls._owned(job_id, worker_id).update({
+                AnalysisJob.status: AnalysisJobStatus.COMPLETED,
+                AnalysisJob.result_id: result.result_id,
+                AnalysisJob.finished_at: datetime.utcnow(),
+            }, synchronize_session=False)
+            if owned != 1:
+                # 추가한 PersonalityResult와 대표 프로필 변경까지 함께 취소
+                db.session.rollback()
+                logger.warning(f"[AnalysisPipeline] 선점을 잃은 작업의 분석 결과 폐기 (job_id={job_id}, {worker_id})")
+                return
+            ChatLog.query.filter_by(log_id=log_id).update({'process_status': 'COMPLETED'})
+            db.session.commit()
+            finished = True
+            logger.info(f"[AnalysisPipeline] 분석 완료 (job_id={job_id}, result_id={result.result_id})")
+
+            if user_id:
+                MatchManager.notify_profile_changed(user_id)
+        except SpeakerSelectionRequired as e:
+            # 화자 선택 후 같은 파일로 다시 분석 (파싱 결과는 캐시에 있으므로 보통 다시 읽지 않음)
+            db.session.rollback()
+            cls._mark_awaiting_speaker(job_id, worker_id, e.roster)
+        except Exception as e:
+            db.session.rollback()
+            logger.exception(f"[AnalysisPipeline] 분석 실패 (job_id={job_id})")
+            if not finished:
+                finished = cls._mark_failed(job_id, worker_id, str(e))
+        finally:
+            if finished:
+                cls.remove_file(file_path)
+
+        realtime.publish(f"analysis:{job_code}")
+
+    @classmethod
+    def _analyze(cls, log_id, file_path, file_hash, target_name, user_id):
+        """채팅 로그를 분석하여 PersonalityResult를 추가합니다. (커밋은 호출 측)"""
+        from extensions import db, User, PersonalityResult
+        import main as analyzer
+
+        # 파싱 실행 (같은 파일 + 대상자 + 파서 버전이면 캐시 재사용)
+        if not file_hash:
+            file_hash = hash_file(file_path)
+        rows, quality = cls._load_rows(file_path, file_hash, target_name)
+
+        # 분석 실행
+        model = os.environ.get("OPENAI_MODEL")
+        from openai import OpenAI
+        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+        map_reduce_min = cfg.ANALYSIS_MAP_REDUCE_MIN_MESSAGES
+        if map_reduce_min and len(rows) >= map_reduce_min:
+            # 대용량 대화: 시간순 구간 요약(병렬) + 축소 샘플로 최종 프로파일
+            llm_input = analyzer.build_reduce_input(rows, cls._summarize_chunks(client, model, rows))
+        else:
+            signals = analyzer.compute_numeric_signals(rows)
+            samples = analyzer.sample_texts_for_llm(rows, 120, 18000)
+            llm_input = {"samples": samples, "numeric_signals": signals}
+
+        # 같은 LLM 입력 + 모델이면 이전 프로파일 재사용 (토큰 비용 없음)
+        profile = AnalysisCache.get_profile(llm_input, model)
+        if profile is None:
+            profile = analyzer.call_llm_profile(client, model, llm_input)
+            AnalysisCache.put_profile(llm_input, model, profile)
+        else:
+            logger.info(f"[AnalysisPipeline] LLM 프로파일 캐시 사용 (log_id={log_id})")
+
+        # [보장 장치] big5.reasons가 비어있으면 기본 설명 생성
+        if not profile.get('big5', {}).get('reasons'):
+            big5_reasons = []
+            big5_data = profile.get('big5', {}).get('scores_0_100', {})
+            for trait_key, trait_kr in BIG5_TRAIT_NAMES.items():
+                score = big5_data.get(trait_key, 50)
+                if score >= 70:
+                    level = '높음'
+                elif score >= 40:
+                    level = '보통'
+                else:
+                    level = '낮음'
+                big5_reasons.append(f"{trait_kr}: {level} (점수: {score})")
+            profile['big5']['reasons'] = big5_reasons
+
+        if user_id:
+            PersonalityResult.query.filter_by(user_id=user_id).update({'is_representative': False})
+
+        # 전체 구조 저장 (meta/llm_profile/parse_quality 포함)
+        full_report_data = {
+            "meta": {
+                "user_id": user_id,
+                "speaker_name": target_name,
+                "generated_at_utc": datetime.utcnow().isoformat() + "Z"
+            },
+            "parse_quality": asdict(quality),
+            "llm_profile": profile
+        }
+
+        # 회원 정보가 있다면 meta에 추가
+        user = db.session.get(User, user_id) if user_id else None
+        if user:
+            full_report_data['meta']['birth_date'] = user.birth_date.strftime('%Y-%m-%d') if user.birth_date else None
+            full_report_data['meta']['created_at'] = user.created_at.isoformat() + "Z" if user.created_at else None
+
+        new_profile = PersonalityResult(
+            user_id=user_id,
+            log_id=log_id,
+            is_representative=True if user_id else False,
+            openness=float(profile['big5']['scores_0_100']['openness']),
+            conscientiousness=float(profile['big5']['scores_0_100']['conscientiousness']),
+            extraversion=float(profile['big5']['scores_0_100']['extraversion']),
+            agreeableness=float(profile['big5']['scores_0_100']['agreeableness']),
+            neuroticism=float(profile['big5']['scores_0_100']['neuroticism']),
+            big5_confidence=float(profile.get('big5', {}).get('confidence', 0.0)),
+
+            line_count_at_analysis=quality.parsed_lines,
+
+            mbti_prediction=profile['mbti']['type'],
+            mbti_confidence=float(profile.get('mbti', {}).get('confidence', 0.0)),
+
+            socionics_prediction=profile['socionics']['type'],
+            socionics_confidence=float(profile.get('socionics', {}).get('confidence', 0.0)),
+
+            summary_text=profile['summary']['one_paragraph'],
+            reasoning_text=json.dumps(profile.get('mbti', {}).get('reasons', [])),
+            full_report_json=full_report_data
+        )
+        db.session.add(new_profile)
+        db.session.flush()
+        return new_profile
+
+    @staticmethod
+    def cache_speakers(file_hash, speakers, target_name=None):
+        """
+        전체 화자 파싱 결과(main.SpeakerParse) 중 상위 ROSTER_LIMIT명(+ 대상자)의 결과와 화자 목록을 캐시하고
+        화자 목록을 반환합니다. (업로드 중 스트리밍 파싱 결과도 여기로 넣어 워커가 파일을 다시 읽지 않게 함)
+        """
+        roster = speakers.roster(ROSTER_LIMIT)
+        names = [entry['name'] for entry in roster]
+        if target_name and target_name not in names:
+            names.append(target_name)
+        for name in names:
+            rows, quality = speakers.for_speaker(name)
+            if rows:
+                AnalysisCache.put_parse(file_hash, name, rows, quality)
+        AnalysisCache.put_roster(file_hash, roster)
+        return roster
+
+    @staticmethod
+    def _load_rows(file_path, file_hash, target_name):
+        """
+        대상자의 (rows, ParseQuality)를 반환합니다.
+        캐시가 없으면 파일을 한 번만 읽어 모든 화자를 파싱하고, 상위 ROSTER_LIMIT명의 결과와 화자 목록을 캐시합니다.
+        대상자가 비었거나 파일에 없으면 SpeakerSelectionRequired를 발생시킵니다.
+        """
+        import main as analyzer
+
+        cached = AnalysisCache.get_parse(file_hash, target_name) if target_name else None
+        if cached is not None and cached[0]:
+            return cached
+
+        roster = AnalysisCache.get_roster(file_hash)
+        listed = {analyzer.normalize_speaker(entry['name']) for entry in roster or []}
+        if roster is not None and target_name and (
+                len(roster) >= ROSTER_LIMIT or analyzer.normalize_speaker(target_name) in listed):
+            # 화자 목록은 캐시되어 있지만 이 화자의 파싱 결과는 없는 경우 (목록 밖 화자 / LRU 제거)
+            rows, quality = analyzer.parse_target_rows(file_path, target_name)
+        elif roster is None:
+            speakers = analyzer.parse_all_speakers(file_path)
+            roster = AnalysisPipeline.cache_speakers(file_hash, speakers)
+            rows, quality = speakers.for_speaker(target_name)
+        else:
+            rows, quality = [], None
+
+        if rows:
+            return rows, quality
+        if not roster:
+            raise ValueError("대화 내역에서 분석 가능한 메시지를 찾을 수 없습니다.")
+        raise SpeakerSelectionRequired(roster)
+
+    @staticmethod
+    def _summarize_chunks(client, model, rows):
+        """구간별 요약을 ANALYSIS_MAP_REDUCE_CONCURRENCY개씩 동시에 생성합니다. (구간 단위 캐시)"""
+        import main as analyzer
+
+        chunks = analyzer.plan_chunks(rows)
+
+        def summarize(texts, part, total):
+            key = AnalysisCache.profile_key({"chunk": texts, "part": part, "total": total}, model)
+            summary = AnalysisCache.get(key)
+            if summary is None:
+                summary = analyzer.summarize_chunk(client, model, texts, part, total)
+                AnalysisCache.put(key, 'chunk', summary)
+            return summary
+
+        return analyzer.summarize_chunks(client, model, chunks, cfg.ANALYSIS_MAP_REDUCE_CONCURRENCY, summarize)
+
+    @classmethod
+    def _mark_awaiting_speaker(cls, job_id, worker_id, roster):
+        """화자 선택 대기 상태로 전환합니다. 기록에 성공하면 True (업로드 파일은 어느 경우든 유지)"""
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+
+        try:
+            owned = cls._owned(job_id, worker_id).update({
+                AnalysisJob.status: AnalysisJobStatus.AWAITING_SPEAKER,
+                AnalysisJob.speaker_roster: roster,
+                AnalysisJob.error_message: None,
+            }, synchronize_session=False)
+            if owned != 1:
+                db.session.rollback()
+                return False
+            log_id = db.session.query(AnalysisJob.log_id).filter(AnalysisJob.job_id == job_id).scalar()
+            ChatLog.query.filter_by(log_id=log_id).update({'process_status': 'PENDING'})
+            db.session.commit()
+            logger.info(f"[AnalysisPipeline] 화자 선택 대기 (job_id={job_id}, speakers={len(roster)})")
+            return True
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"[AnalysisPipeline] 화자 선택 대기 기록 실패 (job_id={job_id})")
+            return False
+
+    @classmethod
+    def _mark_failed(cls, job_id, worker_id, error_message):
+        """실패 상태로 전환합니다. 이 워커가 선점 중이어서 기록에 성공하면 True"""
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+
+        try:
+            owned = cls._owned(job_id, worker_id).update({
+                AnalysisJob.status: AnalysisJobStatus.FAILED,
+                AnalysisJob.error_message: (error_message or '알 수 없는 오류')[:500],
+                AnalysisJob.finished_at: datetime.utcnow(),
+            }, synchronize_session=False)
+            if owned != 1:
+                db.session.rollback()
+                logger.warning(f"[AnalysisPipeline] 선점을 잃은 작업의 실패 기록 생략 (job_id={job_id}, {worker_id})")
+                return False
+            log_id = db.session.query(AnalysisJob.log_id).filter(AnalysisJob.job_id == job_id).scalar()
+            ChatLog.query.filter_by(log_id=log_id).update({'process_status': 'FAILED'})
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"[AnalysisPipeline] 실패 상태 기록 실패 (job_id={job_id})")
+            return False
+
+    @staticmethod
+    def remove_file(path):
+        # 안전한 파일 삭제 (완료/실패 모두 업로드 원본은 보관하지 않음)
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except Exception as cleanup_error:
+            logger.warning(f"Warning: 임시 파일 삭제 실패: {cleanup_error}")
+
+    # -------------------------------------------------------------------
+    # [복구]
+    # -------------------------------------------------------------------
+    @classmethod
+    def requeue_stale(cls):
+        """
+        하트비트가 ANALYSIS_JOB_TIMEOUT_SECONDS 동안 없는 RUNNING 작업(워커 비정상 종료)을 처리합니다.
+        시도 횟수가 ANALYSIS_MAX_ATTEMPTS 미만이면 다시 대기열에 넣고, 아니면 실패로 기록합니다.
+        상태 변경은 조회 이후 하트비트/상태가 바뀌지 않은 경우에만 적용합니다. (조건부 UPDATE)
+        ANALYSIS_SPEAKER_WAIT_HOURS 동안 화자를 선택하지 않은 작업은 실패 처리하고 업로드 파일을 삭제합니다.
+        """
+        from extensions import db, ChatLog, AnalysisJob, AnalysisJobStatus
+
+        cutoff = datetime.utcnow() - timedelta(seconds=cfg.ANALYSIS_JOB_TIMEOUT_SECONDS)
+        last_seen = db.func.coalesce(AnalysisJob.heartbeat_at, AnalysisJob.started_at)
+        stale = db.session.query(AnalysisJob.job_id, AnalysisJob.log_id, AnalysisJob.attempts).filter(
+            AnalysisJob.status == AnalysisJobStatus.RUNNING,
+            last_seen < cutoff
+        ).all()
+
+        requeued, failed = 0, 0
+        for job_id, log_id, attempts in stale:
+            still_stale = AnalysisJob.query.filter(
+                AnalysisJob.job_id == job_id,
+                AnalysisJob.status == AnalysisJobStatus.RUNNING,
+                last_seen < cutoff
+            )
+            if attempts < cfg.ANALYSIS_MAX_ATTEMPTS:
+                if still_stale.update({
+                    AnalysisJob.status: AnalysisJobStatus.QUEUED,
+                    AnalysisJob.worker_id: None,
+                }, synchronize_session=False):
+                    ChatLog.query.filter_by(log_id=log_id).update({'process_status': 'PENDING'})
+                    requeued += 1
+            elif still_stale.update({
+                AnalysisJob.status: AnalysisJobStatus.FAILED,
+                AnalysisJob.error_message: "분석 시간이 초과되었습니다. 다시 업로드해주세요.",
+                AnalysisJob.finished_at: datetime.utcnow(),
+            }, synchronize_session=False):
+                ChatLog.query.filter_by(log_id=log_id).update({'process_status': 'FAILED'})
+                failed += 1
+
+        wait_cutoff = datetime.utcnow() - timedelta(hours=cfg.ANALYSIS_SPEAKER_WAIT_HOURS)
+        waiting = db.session.query(AnalysisJob.job_id, AnalysisJob.log_id).filter(
+            AnalysisJob.status == AnalysisJobStatus.AWAITING_SPEAKER,
+            AnalysisJob.started_at < wait_cutoff
+        ).all()
+        abandoned, abandoned_paths = 0, []
+        for job_id, log_id in waiting:
+            # 조회 이후 화자를 선택했으면(QUEUED) 건너뜀
+            if not AnalysisJob.query.filter(
+                AnalysisJob.job_id == job_id,
+                AnalysisJob.status == AnalysisJobStatus.AWAITING_SPEAKER
+            ).update({
+                AnalysisJob.status: AnalysisJobStatus.FAILED,
+                AnalysisJob.error_message: "대화 참여자를 선택하지 않아 분석이 취소되었습니다. 다시 업로드해주세요.",
+                AnalysisJob.finished_at: datetime.utcnow(),
+            }, synchronize_session=False):
+                continue
+            abandoned += 1
+            log = db.session.get(ChatLog, log_id)
+            if log:
+                log.process_status = 'FAILED'
+                abandoned_paths.append(log.file_path)
+        db.session.commit()
+
+        for path in abandoned_paths:
+            cls.remove_file(path)
+
+        if requeued:
+            cls._wakeup.set()
+        if requeued or failed or abandoned:
+            logger.warning(f"[AnalysisPipeline] 중단된 작업 정리: 재등록 {requeued}건, 실패 {failed}건, "
+                           f"화자 미선택 {abandoned}건")
+        return {"success": True, "message": f"재등록 {requeued}건, 실패 {failed}건, 화자 미선택 {abandoned}건"}
+
+    @classmethod
+    def requeue_stale_job(cls, app):
+        """[스케줄러] 중단된 분석 작업을 주기적으로 정리합니다."""
+        with app.app_context():
+            try:
+                cls.requeue_stale()
+            except Exception:
+                logger.exception("[AnalysisPipeline] 중단된 작업 정리 실패")
+
+    # -------------------------------------------------------------------
+    # [워커]
+    # -------------------------------------------------------------------
+    @classmethod
+    def work_loop(cls, app, worker_id, stop_event):
+        """대기열이 빌 때까지 작업을 처리하고, 비면 새 작업 알림 또는 폴링 주기까지 대기합니다."""
+        from extensions import db
+
+        logger.info(f"[AnalysisPipeline] 워커 시작 ({worker_id})")
+        while not stop_event.is_set():
+            job = None
+            with app.app_context():
+                try:
+                    job = cls.claim_next(worker_id)
+                    if job is not None:
+                        cls.run_job(job)
+                except Exception:
+                    db.session.rollback()
+                    logger.exception(f"[AnalysisPipeline] 워커 루프 오류 ({worker_id})")
+                finally:
+                    db.session.remove()
+
+            if job is None:
+                cls._wakeup.wait(timeout=cfg.ANALYSIS_POLL_INTERVAL_SECONDS)
+                cls._wakeup.clear()
+        logger.info(f"[AnalysisPipeline] 워커 종료 ({worker_id})")
+
+    @classmethod
+    def start_workers(cls, app, concurrency=None, daemon=True):
+        """워커 스레드를 concurrency개 시작합니다. (프로세스당 한 번만, 이미 실행 중이면 무시)"""
+        concurrency = concurrency or cfg.ANALYSIS_WORKER_CONCURRENCY
+        with cls._workers_lock:
+            if cls._workers:
+                return cls._workers
+            stop_event = threading.Event()
+            prefix = f"{socket.gethostname()}:{os.getpid()}"
+            for i in range(concurrency):
+                thread = threading.Thread(
+                    target=cls.work_loop,
+                    args=(app, f"{prefix}:{i}", stop_event),
+                    name=f"analysis-worker-{i}",
+                    daemon=daemon
+                )
+                thread.start()
+                cls._workers.append(thread)
+            cls._stop_event = stop_event
+        return cls._workers
+
+    @classmethod
+    def start_embedded(cls, app):
+        """
+        [embedded 모드] 프로세스당 한 번: 이전 실행에서 중단된 작업을 정리하고 워커 스레드와
+        주기적 정리 스레드를 시작합니다. (스케줄러가 돌지 않는 gunicorn 실행에서도 재등록 보장)
+        """
+        if cls._embedded_started:
+            return
+        with cls._workers_lock:
+            if cls._embedded_started:
+                return
+            cls._embedded_started = True
+
+        cls.requeue_stale_job(app)
+        cls.start_workers(app)
+        stop_event = cls._stop_event
+
+        def requeue_loop():
+            while not stop_event.wait(timeout=REQUEUE_INTERVAL_SECONDS):
+                cls.requeue_stale_job(app)
+
+        threading.Thread(target=requeue_loop, name="analysis-requeue", daemon=True).start()
+
+    @classmethod
+    def stop_workers(cls, timeout=None):
+        """워커 스레드에 종료를 알리고 진행 중인 작업이 끝날 때까지 기다립니다."""
+        with cls._workers_lock:
+            workers, cls._workers = cls._workers, []
+        if not workers:
+            return
+        cls._stop_event.set()
+        cls._wakeup.set()
+        for thread in workers:
+            thread.join(timeout)
@@ -0,0 +1,51 @@
+# analysis_worker.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 채팅 로그 분석 워커 프로세스
+======================================================================
+ANALYSIS_WORKER_MODE=external 일 때 웹 서버와 별도로 실행하여 analysis_jobs 대기열을 처리합니다.
+동시 분석 수(LLM 동시 호출 수)는 실행한 프로세스 수 × --concurrency 입니다.
+워커가 여러 대여도 같은 작업을 중복 처리하지 않습니다. (analysis_pipeline.py [선점 방식] 참고)
+
+사용법:
+    python analysis_worker.py --concurrency 4
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from app import app, config_class
+from analysis_pipeline import AnalysisPipeline, REQUEUE_INTERVAL_SECONDS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EchoMind 채팅 로그 분석 워커")
+    parser.add_argument("--concurrency", type=int, default=config_class.ANALYSIS_WORKER_CONCURRENCY,
+                        help="이 프로세스의 동시 분석 수")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(name)s: %(message)s')
+
+    # 이전 실행에서 중단된 작업부터 정리
+    AnalysisPipeline.requeue_stale_job(app)
+
+    stopped = threading.Event()
+
+    def _shutdown(signum, frame):
+        logging.getLogger(__name__).info("종료 신호 수신 - 진행 중인 분석을 마치고 종료합니다.")
+        stopped.set()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    AnalysisPipeline.start_workers(app, concurrency=args.concurrency, daemon=False)
+    while not stopped.wait(timeout=REQUEUE_INTERVAL_SECONDS):
+        AnalysisPipeline.requeue_stale_job(app)
+    AnalysisPipeline.stop_workers()
+
+
+if __name__ == "__main__":
+    main()
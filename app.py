@@ -10,6 +10,7 @@
 
 import os
 import uuid
+import bisect
 import re
 import json
 import sqlalchemy
@@ -29,11 +30,21 @@ from markupsafe import escape
 # [설정 및 커스텀 모듈 임포트]
 from config import config_by_name
 from match_manager import MatchManager
+from population_stats import PopulationStatsService
+from candidate_store import CandidateStore
+from recommendation_cache import RecommendationCache
+import realtime
+from badge_cache import BadgeCache
+from inbox_version import InboxVersion
+from analysis_pipeline import AnalysisPipeline
+from upload_stream import ChatUploadRequest, UploadRejected, finish_upload
 import main as analyzer
 import visualize_profile
 from activity_insights import build_activity_summary
 
 app = Flask(__name__)
+# /upload의 .txt 파일은 임시 파일 없이 받으면서 저장/해시/파싱 (upload_stream.py)
+app.request_class = ChatUploadRequest
 Compress(app)
 
 # --- 환경 설정 (Environment Setup) ---
@@ -131,6 +142,8 @@ from extensions import (
     db,
     User,
     ChatLog,
+    AnalysisJob,
+    AnalysisJobStatus,
     PersonalityResult,
     MatchRequest, 
     Notification,
@@ -147,6 +160,13 @@ from blind_match_manager import BlindMatchManager, BlindMatchStatus
 
 db.init_app(app)
 migrate = Migrate(app, db)
+realtime.init_app(app)
+
+
+@app.context_processor
+def inject_realtime():
+    """템플릿에서 실시간 푸시 사용 여부 확인 (비활성화 시 폴링만 사용)"""
+    return {'realtime_enabled': realtime.is_enabled()}
 
 # --- Template Filters ---
 @app.template_filter('kst')
@@ -195,6 +215,34 @@ def admin_required(f):
 # -------------------------------------------------------------------
 # DB Schema Update Utility
 # -------------------------------------------------------------------
+# 대화 요약 컬럼 초기값 계산 (migrations/versions/5b7c2e9d4a18 과 동일)
+CONVERSATION_SUMMARY_BACKFILL = {
+    'match_requests': [
+        """UPDATE match_requests SET
+            sender_unread_count = (SELECT COUNT(*) FROM messages m WHERE m.request_id = match_requests.request_id
+                                   AND m.sender_id = match_requests.receiver_id AND m.is_read = 0),
+            receiver_unread_count = (SELECT COUNT(*) FROM messages m WHERE m.request_id = match_requests.request_id
+                                     AND m.sender_id = match_requests.sender_id AND m.is_read = 0),
+            last_message_id = (SELECT MAX(m.id) FROM messages m WHERE m.request_id = match_requests.request_id)""",
+        """UPDATE match_requests SET
+            last_message_preview = (SELECT SUBSTR(m.content, 1, 100) FROM messages m WHERE m.id = match_requests.last_message_id),
+            last_message_at = (SELECT m.created_at FROM messages m WHERE m.id = match_requests.last_message_id)
+          WHERE last_message_id IS NOT NULL""",
+    ],
+    'blind_matches': [
+        """UPDATE blind_matches SET
+            user1_unread_count = (SELECT COUNT(*) FROM blind_match_messages m WHERE m.match_id = blind_matches.id
+                                  AND m.sender_id = blind_matches.user2_id AND m.is_read = 0),
+            user2_unread_count = (SELECT COUNT(*) FROM blind_match_messages m WHERE m.match_id = blind_matches.id
+                                  AND m.sender_id = blind_matches.user1_id AND m.is_read = 0),
+            last_message_id = (SELECT MAX(m.id) FROM blind_match_messages m WHERE m.match_id = blind_matches.id)""",
+        """UPDATE blind_matches SET
+            last_message_preview = (SELECT SUBSTR(m.content, 1, 100) FROM blind_match_messages m WHERE m.id = blind_matches.last_message_id),
+            last_message_at = (SELECT m.created_at FROM blind_match_messages m WHERE m.id = blind_matches.last_message_id)
+          WHERE last_message_id IS NOT NULL""",
+    ],
+}
+
 def check_and_update_db_schema():
     """
     DB 스키마 자동 마이그레이션:
@@ -378,6 +426,63 @@ def check_and_update_db_schema():
                 except Exception as e:
                     app.logger.warning(f"user_activity_logs table creation failed: {e}")
 
+                # 11. 대화 요약 컬럼 추가 및 기존 메시지로 채우기 (안 읽은 수, 마지막 메시지)
+                try:
+                    table_names = inspector.get_table_names()
+                    for table, unread_cols in (('match_requests', ('sender_unread_count', 'receiver_unread_count')),
+                                               ('blind_matches', ('user1_unread_count', 'user2_unread_count'))):
+                        if table not in table_names:
+                            continue
+                        cols = [col['name'] for col in inspector.get_columns(table)]
+                        if 'last_message_id' in cols:
+                            continue
+                        for col in unread_cols:
+                            conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN {col} INT NOT NULL DEFAULT 0"))
+                        conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN last_message_id INT"))
+                        conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN last_message_preview VARCHAR(200)"))
+                        conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN last_message_at DATETIME"))
+                        for stmt in CONVERSATION_SUMMARY_BACKFILL[table]:
+                            conn.execute(sqlalchemy.text(stmt))
+                        conn.commit()
+                        app.logger.info(f"Conversation summary columns added to {table}.")
+                except Exception as e:
+                    app.logger.warning(f"conversation summary migration failed: {e}")
+
+                # 12. users 테이블에 inbox_version 컬럼 추가 (인박스 조건부 요청/롱폴링)
+                if 'inbox_version' not in user_columns:
+                    conn.execute(sqlalchemy.text("ALTER TABLE users ADD COLUMN inbox_version INT NOT NULL DEFAULT 0"))
+                    conn.commit()
+                    app.logger.info("'inbox_version' column added to users.")
+
+                # 13. chat_logs 테이블에 file_hash 컬럼 추가 (분석 캐시 키)
+                chat_log_columns = [col['name'] for col in inspector.get_columns('chat_logs')]
+                if 'file_hash' not in chat_log_columns:
+                    conn.execute(sqlalchemy.text("ALTER TABLE chat_logs ADD COLUMN file_hash VARCHAR(64)"))
+                    conn.commit()
+                    app.logger.info("'file_hash' column added to chat_logs.")
+
+                # 14. analysis_jobs 화자 선택 대기 상태 + speaker_roster 컬럼 (MySQL 기준)
+                try:
+                    if 'analysis_jobs' in inspector.get_table_names():
+                        job_columns = [col['name'] for col in inspector.get_columns('analysis_jobs')]
+                        if 'speaker_roster' not in job_columns:
+                            conn.execute(sqlalchemy.text(
+                                "ALTER TABLE analysis_jobs MODIFY COLUMN status "
+                                "ENUM('QUEUED','RUNNING','COMPLETED','FAILED','AWAITING_SPEAKER') NOT NULL"))
+                            conn.execute(sqlalchemy.text("ALTER TABLE analysis_jobs ADD COLUMN speaker_roster JSON"))
+                            conn.commit()
+                            app.logger.info("'speaker_roster' column added to analysis_jobs.")
+                except Exception as e:
+                    app.logger.warning(f"analysis_jobs speaker roster migration failed: {e}")
+
+                # 15. analysis_jobs 테이블에 heartbeat_at 컬럼 추가 (처리 중 워커 생존 확인)
+                if 'analysis_jobs' in inspector.get_table_names():
+                    job_columns = [col['name'] for col in inspector.get_columns('analysis_jobs')]
+                    if 'heartbeat_at' not in job_columns:
+                        conn.execute(sqlalchemy.text("ALTER TABLE analysis_jobs ADD COLUMN heartbeat_at DATETIME"))
+                        conn.commit()
+                        app.logger.info("'heartbeat_at' column added to analysis_jobs.")
+
         except Exception as e:
             app.logger.error(f"Schema update failed: {e}")
 
@@ -390,16 +495,37 @@ def favicon():
     """브라우저의 자동 파비콘 요청으로 인한 404 에러 로그 방지"""
     return '', 204
 
+@app.before_request
+def start_analysis_workers():
+    """
+    embedded 모드: 프로세스의 첫 요청에서 분석 워커를 시작합니다. (이후 요청은 플래그 확인만)
+    gunicorn 등 __main__을 거치지 않는 실행에서도 재시작 전에 대기/중단된 작업이 처리되도록 합니다.
+    (import만 하는 flask db upgrade 등 CLI/스크립트에서는 시작하지 않음)
+    """
+    if config_class.ANALYSIS_WORKER_MODE == 'embedded':
+        AnalysisPipeline.start_embedded(app)
+
 @app.before_request
 def load_user():
+    """
+    요청 사용자 로드 (모든 요청 공통).
+    정적 파일은 DB 조회 없이 통과하고, 헤더 뱃지 카운트는 HTML 렌더링 시에만
+    inject_badge_counts에서 계산합니다. (API/폴링 요청에서는 사용자 조회 1회만 발생)
+    """
+    if request.endpoint in ('static', 'favicon'):
+        g.user = None
+        return
     user_id = session.get('user_id')
     g.user = db.session.get(User, user_id) if user_id else None
-    if g.user:
-        g.unread_count = len(MatchManager.get_unread_notifications(g.user.user_id))
-        g.unread_blind_count = BlindMatchManager.get_unread_blind_count(g.user.user_id)
-    else:
-        g.unread_count = 0
-        g.unread_blind_count = 0
+
+@app.context_processor
+def inject_badge_counts():
+    """헤더 뱃지 (안 읽은 알림 수, 블라인드 매칭 알림 수) - 사용자별 짧은 TTL 캐시 (badge_cache.py)"""
+    user = g.get('user')
+    if not user:
+        return {'unread_count': 0, 'unread_blind_count': 0}
+    unread_count, unread_blind_count = BadgeCache.get(user.user_id)
+    return {'unread_count': unread_count, 'unread_blind_count': unread_blind_count}
 
 # --- 로그인 및 회원가입 (Auth) ---
 @app.route('/register', methods=['GET', 'POST'])
@@ -433,6 +559,7 @@ def register():
                         if guest_log and guest_log.user_id is None:
                             guest_log.user_id = new_user.user_id
                     db.session.commit()
+                    MatchManager.notify_profile_changed(new_user.user_id)
             flash("회원가입이 완료되었습니다! 로그인해주세요.", "success")
             return redirect(url_for('login'))
         except Exception as e:
@@ -487,6 +614,7 @@ def login():
                         if guest_log and guest_log.user_id is None:
                             guest_log.user_id = user.user_id
                     db.session.commit()
+                    MatchManager.notify_profile_changed(user.user_id)
             return redirect(url_for('home'))
         
         if user:
@@ -508,7 +636,7 @@ def suspended():
 # --- 라우팅 컨트롤러 (Routing Controllers) ---
 @app.route('/')
 def home():
-    # unread_count is now handled by @before_request and available in `g`
+    # unread_count is injected at render time by inject_badge_counts (badge_cache.py)
     return render_template('index.html', user=g.user)
 
 @app.route('/result')
@@ -751,6 +879,7 @@ def set_representative(result_id):
         PersonalityResult.query.filter_by(user_id=g.user.user_id).update({'is_representative': False})
         target.is_representative = True
         db.session.commit()
+        MatchManager.notify_profile_changed(g.user.user_id)
 
         flash("대표 프로필이 변경되었습니다.", "success")
     except Exception as e:
@@ -786,8 +915,13 @@ def download_result_json():
 def upload_chat():
     if request.method == 'POST':
         current_user_id = g.user.user_id if getattr(g, 'user', None) else None
-        file = request.files.get('file')
-        target_name = request.form.get('target_name')
+        try:
+            # 폼 파싱 중 .txt 파일은 스트리밍으로 저장/검사되며, 크기 초과나 형식 오류는 본문을 다 받기 전에 중단됨
+            file = request.files.get('file')
+            target_name = request.form.get('target_name')
+        except UploadRejected as e:
+            flash(str(e), "danger")
+            return redirect(request.url)
 
         # 1. JSON 파일 직접 업로드 처리
         if file and file.filename.endswith('.json'):
@@ -865,7 +999,9 @@ def upload_chat():
                 db.session.add(new_profile)
                 db.session.commit()
 
-                if not current_user_id:
+                if current_user_id:
+                    MatchManager.notify_profile_changed(current_user_id)
+                else:
                     session['guest_result_id'] = new_profile.result_id
 
                 flash("결과 파일이 성공적으로 로드되었습니다!", "success")
@@ -877,133 +1013,124 @@ def upload_chat():
                 return redirect(request.url)
 
         # 2. 텍스트 파일 업로드 및 분석
-        if not target_name:
-            flash("분석 대상자 이름을 입력해주세요.", "danger")
-            return redirect(request.url)
+        # 대상자 이름이 비었거나 파일에 없으면 분석 후 대화 참여자 목록에서 선택 (analysis_status)
+        target_name = (target_name or '').strip()
 
         if file and file.filename.endswith('.txt'):
             filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            save_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(save_path)
-
             try:
-                # 파싱 실행
-                rows, quality = analyzer.parse_target_rows(save_path, target_name)
-
-                if not rows:
-                    raise ValueError(f"'{target_name}'님과의 대화 내역을 찾을 수 없습니다.")
+                upload = finish_upload(file, app.config['UPLOAD_FOLDER'])
+            except UploadRejected as e:
+                flash(str(e), "danger")
+                return redirect(request.url)
+            save_path, file_hash = upload.path, upload.file_hash
 
-                # ChatLog 생성
-                new_log = ChatLog(
-                    user_id=current_user_id,
-                    file_name=filename,
-                    file_path=save_path,
-                    target_name=target_name,
-                    process_status='PROCESSING'
-                )
-                db.session.add(new_log)
-                db.session.flush()
+            try:
+                if upload.speakers is not None:
+                    # 업로드 중 파싱한 결과를 캐시에 넣어 워커가 파일을 다시 읽지 않게 함
+                    if not upload.speakers.roster(1):
+                        AnalysisPipeline.remove_file(save_path)
+                        flash("대화 내역에서 분석 가능한 메시지를 찾을 수 없습니다.", "danger")
+                        return redirect(request.url)
+                    AnalysisPipeline.cache_speakers(file_hash, upload.speakers, target_name)
+
+                # 분석 작업 등록 (LLM 호출은 워커가 처리)
+                job = AnalysisPipeline.enqueue(current_user_id, filename, save_path, target_name, file_hash)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.exception("분석 작업 등록 실패")
+                AnalysisPipeline.remove_file(save_path)
+                flash(f"분석 중 오류 발생: {str(e)}", "danger")
+                return redirect(request.url)
 
-                # 분석 실행
-                signals = analyzer.compute_numeric_signals(rows)
-                samples = analyzer.sample_texts_for_llm(rows, 120, 18000)
+            if not current_user_id:
+                session['guest_job_code'] = job.job_code
 
-                from openai import OpenAI
-                client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-                profile = analyzer.call_llm_profile(client, os.environ.get("OPENAI_MODEL"), {
-                    "samples": samples, "numeric_signals": signals
-                })
+            mode = config_class.ANALYSIS_WORKER_MODE
+            if mode == 'inline':
+                # 기존 동기 방식: 이 요청에서 바로 분석
+                claimed = AnalysisPipeline.claim(job.job_id, f"inline:{os.getpid()}")
+                if claimed is not None:
+                    AnalysisPipeline.run_job(claimed)
+            elif mode == 'embedded':
+                AnalysisPipeline.start_embedded(app)
 
-                # [보장 장치] big5.reasons가 비어있으면 기본 설명 생성
-                if not profile.get('big5', {}).get('reasons'):
-                    big5_reasons = []
-                    big5_data = profile.get('big5', {}).get('scores_0_100', {})
-                    trait_names = {
-                        'openness': '개방성',
-                        'conscientiousness': '성실성',
-                        'extraversion': '외향성',
-                        'agreeableness': '우호성',
-                        'neuroticism': '신경성'
-                    }
-                    for trait_key, trait_kr in trait_names.items():
-                        score = big5_data.get(trait_key, 50)
-                        if score >= 70:
-                            level = '높음'
-                        elif score >= 40:
-                            level = '보통'
-                        else:
-                            level = '낮음'
-                        big5_reasons.append(f"{trait_kr}: {level} (점수: {score})")
-                    profile['big5']['reasons'] = big5_reasons
+            return redirect(url_for('analysis_status', job_code=job.job_code))
 
-                if current_user_id:
-                    PersonalityResult.query.filter_by(user_id=current_user_id).update({'is_representative': False})
+    return render_template('upload.html')
 
-                # 전체 구조 저장 (meta/llm_profile/parse_quality 포함)
-                from dataclasses import asdict
-                full_report_data = {
-                    "meta": {
-                        "user_id": current_user_id,
-                        "speaker_name": target_name,
-                        "generated_at_utc": datetime.utcnow().isoformat() + "Z"
-                    },
-                    "parse_quality": asdict(quality),
-                    "llm_profile": profile
-                }
+def _can_view_analysis_job(job):
+    """분석 작업 조회 권한: 관리자, 본인 작업, 또는 이 세션에서 업로드한 비회원 작업"""
+    if session.get('is_admin'):
+        return True
+    if g.user and job.user_id == g.user.user_id:
+        return True
+    return job.user_id is None and session.get('guest_job_code') == job.job_code
+
+def _remember_guest_result(job):
+    """비회원 작업이 완료되면 결과 조회 권한(guest_result_id)을 세션에 기록"""
+    if job.user_id is None and job.result_id and session.get('guest_job_code') == job.job_code:
+        session['guest_result_id'] = job.result_id
+        session.pop('guest_job_code', None)
+
+@app.route('/analysis/<job_code>')
+def analysis_status(job_code):
+    """분석 진행 상태 페이지 (완료 시 결과 페이지로 이동)"""
+    status = AnalysisPipeline.get_status(job_code)
+    if status is None or not _can_view_analysis_job(status['job']):
+        flash("존재하지 않거나 접근 권한이 없는 분석 작업입니다.", "danger")
+        return redirect(url_for('upload_chat'))
 
-                # 회원 정보가 있다면 meta에 추가
-                if g.user:
-                    full_report_data['meta']['birth_date'] = g.user.birth_date.strftime('%Y-%m-%d') if g.user.birth_date else None
-                    full_report_data['meta']['created_at'] = g.user.created_at.isoformat() + "Z" if g.user.created_at else None
-                
+    if status['status'] == AnalysisJobStatus.COMPLETED.value:
+        _remember_guest_result(status['job'])
+        flash("분석이 완료되었습니다!", "success")
+        return redirect(url_for('view_result', result_id=status['result_id']))
 
-                new_profile = PersonalityResult(
-                    user_id=current_user_id,
-                    log_id=new_log.log_id,
-                    is_representative=True if current_user_id else False,
-                    openness=float(profile['big5']['scores_0_100']['openness']),
-                    conscientiousness=float(profile['big5']['scores_0_100']['conscientiousness']),
-                    extraversion=float(profile['big5']['scores_0_100']['extraversion']),
-                    agreeableness=float(profile['big5']['scores_0_100']['agreeableness']),
-                    neuroticism=float(profile['big5']['scores_0_100']['neuroticism']),
-                    big5_confidence=float(profile.get('big5', {}).get('confidence', 0.0)),
+    return render_template('analysis_status.html', job_code=job_code, status=status)
 
-                    line_count_at_analysis=quality.parsed_lines,
+@app.route('/api/analysis/<job_code>')
+def api_analysis_status(job_code):
+    """[API] 분석 작업 상태 조회 (상태 페이지 폴링용)"""
+    status = AnalysisPipeline.get_status(job_code)
+    if status is None or not _can_view_analysis_job(status['job']):
+        return jsonify({'success': False, 'message': '분석 작업을 찾을 수 없습니다.'}), 404
 
-                    mbti_prediction=profile['mbti']['type'],
-                    mbti_confidence=float(profile.get('mbti', {}).get('confidence', 0.0)),
+    result_url = None
+    if status['status'] == AnalysisJobStatus.COMPLETED.value:
+        _remember_guest_result(status['job'])
+        result_url = url_for('view_result', result_id=status['result_id'])
 
-                    socionics_prediction=profile['socionics']['type'],
-                    socionics_confidence=float(profile.get('socionics', {}).get('confidence', 0.0)),
-
-                    summary_text=profile['summary']['one_paragraph'],
-                    reasoning_text=json.dumps(profile.get('mbti', {}).get('reasons', [])),
-                    full_report_json=full_report_data
-                )
-
-                new_log.process_status = 'COMPLETED'
-                db.session.add(new_profile)
-                db.session.commit()
+    return jsonify({
+        'success': True,
+        'status': status['status'],
+        'queue_position': status['queue_position'],
+        'error': status['error'],
+        'speakers': status['speakers'],
+        'result_url': result_url
+    })
 
-                if not current_user_id:
-                    session['guest_result_id'] = new_profile.result_id
+@app.route('/analysis/<job_code>/speaker', methods=['POST'])
+def select_analysis_speaker(job_code):
+    """화자 선택 대기 중인 분석 작업의 대상자를 지정하고 분석을 재개합니다."""
+    job = AnalysisJob.query.filter_by(job_code=job_code).first()
+    if job is None or not _can_view_analysis_job(job):
+        flash("존재하지 않거나 접근 권한이 없는 분석 작업입니다.", "danger")
+        return redirect(url_for('upload_chat'))
 
-                flash("분석이 완료되었습니다!", "success")
-                return redirect(url_for('view_result', result_id=new_profile.result_id))
+    result = AnalysisPipeline.select_speaker(job, request.form.get('speaker_name', ''))
+    if not result['success']:
+        flash(result['message'], "warning")
+        return redirect(url_for('analysis_status', job_code=job_code))
 
-            except Exception as e:
-                db.session.rollback()
-                flash(f"분석 중 오류 발생: {str(e)}", "danger")
-            finally:
-                # 안전한 파일 삭제
-                try:
-                    if os.path.exists(save_path):
-                        os.remove(save_path)
-                except Exception as cleanup_error:
-                    app.logger.warning(f"Warning: 임시 파일 삭제 실패: {cleanup_error}")
+    mode = config_class.ANALYSIS_WORKER_MODE
+    if mode == 'inline':
+        claimed = AnalysisPipeline.claim(job.job_id, f"inline:{os.getpid()}")
+        if claimed is not None:
+            AnalysisPipeline.run_job(claimed)
+    elif mode == 'embedded':
+        AnalysisPipeline.start_embedded(app)
 
-    return render_template('upload.html')
+    return redirect(url_for('analysis_status', job_code=job_code))
 
 # --- 매칭 및 인박스 (Matching & Inbox) ---
 
@@ -1035,11 +1162,17 @@ def start_matching():
                 'parsed_lines': latest_result.line_count_at_analysis
             }
 
+        # 선택적 나이 필터 (?min_age=20&max_age=30)
+        min_age = request.args.get('min_age', type=int)
+        max_age = request.args.get('max_age', type=int)
+        age_range = (min_age, max_age) if min_age is not None or max_age is not None else None
+
         # 현재 사용자의 프로필 JSON 데이터를 matcher에 전달
         candidates = MatchManager.get_matching_candidates(
             my_user_id=g.user.user_id,
             current_user_profile_json=current_profile,
-            limit=30
+            limit=30,
+            age_range=age_range
         )
         # [진단용 로그] AVD에서 접속 시 후보자 수가 0명인지 확인하기 위함
         app.logger.info(f"[MATCHING_LOG] User {g.user.user_id} found {len(candidates)} candidates.")
@@ -1149,22 +1282,9 @@ def match_inbox():
             'status': req.status
         })
 
-    # 4. 성사된 매칭 목록
+    # 4. 성사된 매칭 목록 (안 읽은 메시지 수, 마지막 메시지 미리보기 포함)
     successful_matches = MatchManager.get_successful_matches(g.user.user_id)
 
-    # 각 매칭별 안 읽은 메시지 개수 계산
-    for match in successful_matches:
-        match['unread_count'] = Message.query.filter_by(
-            request_id=match['request_id'],
-            sender_id=match['user_id'], # 상대방 ID
-            is_read=False
-        ).count()
-
-        # 마지막 메시지 조회 (대화 미리보기용)
-        last_msg = Message.query.filter_by(request_id=match['request_id'])\
-            .order_by(Message.created_at.desc()).first()
-        match['last_message'] = last_msg.content if last_msg else "대화를 시작해보세요."
-
     # 5. 시스템 알림
     alerts = MatchManager.get_unread_notifications(g.user.user_id)
 
@@ -1175,34 +1295,40 @@ def match_inbox():
                            requests=received_requests,
                            sent_requests=sent_requests,
                            matches=successful_matches,
-                           alerts=alerts)
+                           alerts=alerts,
+                           inbox_version=InboxVersion.current(g.user.user_id))
 
 @app.route('/api/inbox/updates')
 @login_required
 def inbox_updates():
-    """인박스 실시간 업데이트를 위한 API (Polling용) - 매칭 상태 변경 감지 포함"""
+    """
+    인박스 실시간 업데이트를 위한 API (Polling용) - 매칭 상태 변경 감지 포함
+    - If-None-Match: 인박스 버전(ETag)이 같으면 본문 없이 304
+    - since_version & wait: 버전이 since_version과 같으면 최대 wait초(INBOX_LONG_POLL_SECONDS 이하) 대기 후
+      변경이 없으면 304 (롱폴링)
+    """
     user_id = g.user.user_id
+    version = g.user.inbox_version or 0  # load_user가 조회한 행 (추가 쿼리 없음)
+
+    since_version = request.args.get('since_version', type=int)
+    if since_version is not None and since_version == version:
+        wait = max(0, min(request.args.get('wait', 0, type=int), config_class.INBOX_LONG_POLL_SECONDS))
+        # 롱폴링 비활성화(wait=0): 방금 조회한 버전 그대로 즉시 304
+        changed = InboxVersion.wait_for_change(user_id, since_version, wait) if wait else None
+        if changed is None:
+            return _inbox_not_modified(user_id, version)
+        version = changed
+    elif since_version is None and request.if_none_match.contains_weak(_inbox_etag(user_id, version)):
+        return _inbox_not_modified(user_id, version)
+
     successful_matches = MatchManager.get_successful_matches(user_id)
 
-    updates = []
-    for match in successful_matches:
-        # 안 읽은 메시지 개수
-        unread_count = Message.query.filter_by(
-            request_id=match['request_id'],
-            sender_id=match['user_id'], # 상대방 ID
-            is_read=False
-        ).count()
-
-        # 마지막 메시지
-        last_msg = Message.query.filter_by(request_id=match['request_id'])\
-            .order_by(Message.created_at.desc()).first()
-        last_message_content = last_msg.content if last_msg else "대화를 시작해보세요."
-
-        updates.append({
-            'request_id': match['request_id'],
-            'unread_count': unread_count,
-            'last_message': last_message_content
-        })
+    # 안 읽은 메시지 수와 마지막 메시지는 MatchRequest의 역정규화 컬럼에서 바로 읽음
+    updates = [{
+        'request_id': match['request_id'],
+        'unread_count': match['unread_count'],
+        'last_message': match['last_message']
+    } for match in successful_matches]
 
     # 받은 매칭 신청 수 (PENDING만 — COUNT 쿼리로 가볍게)
     received_count = MatchRequest.query.filter_by(
@@ -1223,13 +1349,26 @@ def inbox_updates():
         user_id=user_id, is_read=False
     ).count() > 0
 
-    return jsonify({
+    response = jsonify({
         'updates': updates,
         'received_count': received_count,
         'sent_statuses': sent_statuses,
         'match_statuses': match_statuses,
-        'has_new_alerts': has_new_alerts
+        'has_new_alerts': has_new_alerts,
+        'version': version
     })
+    response.set_etag(_inbox_etag(user_id, version), weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _inbox_etag(user_id, version):
+    return f"inbox-{user_id}-{version}"
+
+def _inbox_not_modified(user_id, version):
+    response = app.response_class(status=304)
+    response.set_etag(_inbox_etag(user_id, version), weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/match/detail/<int:request_id>')
 @login_required
@@ -1758,6 +1897,7 @@ def admin_toggle_ban(user_id):
 
     user.is_banned = not user.is_banned
     db.session.commit()
+    MatchManager.notify_profile_changed(user.user_id)
 
     status_msg = "정지되었습니다." if user.is_banned else "정지가 해제되었습니다."
     return {'success': True, 'message': f"사용자 {user.nickname}님이 {status_msg}", 'is_banned': user.is_banned}
@@ -1840,6 +1980,7 @@ def admin_delete_user(user_id):
 
         db.session.delete(user)
         db.session.commit()
+        MatchManager.notify_user_removed(user_id)
         flash(f"사용자 '{username}' (ID: {user_id}) 삭제 완료.", "success")
     except Exception as e:
         db.session.rollback()
@@ -2048,6 +2189,7 @@ def _create_dummy_user_in_db(name, mbti, socionics, big5, activity_lines):
         )
         db.session.add(new_result)
         db.session.commit()
+        MatchManager.notify_profile_changed(new_user.user_id)
 
         return {'success': True, 'user_id': new_user.user_id, 'message': f'더미 사용자 "{name}" 생성 완료'}
 
@@ -2212,6 +2354,7 @@ def admin_delete_dummy(dummy_id):
         nickname = user.nickname or user.username
         db.session.delete(user)  # CASCADE로 연관 데이터 자동 삭제
         db.session.commit()
+        MatchManager.notify_user_removed(dummy_id)
 
         return {'success': True, 'message': f'더미 사용자 "{nickname}" (ID: {dummy_id}) 삭제 완료'}
 
@@ -2260,6 +2403,7 @@ def admin_delete_bulk_dummies():
             return {'success': False, 'message': '삭제할 더미 사용자가 없습니다.'}
 
         deleted_count = 0
+        deleted_ids = []
         from extensions import MatchRequest
 
         for user in targets:
@@ -2270,10 +2414,13 @@ def admin_delete_bulk_dummies():
             MatchRequest.query.filter((MatchRequest.sender_id==user.user_id) | (MatchRequest.receiver_id==user.user_id)).delete()
 
             # User 삭제
+            deleted_ids.append(user.user_id)
             db.session.delete(user)
             deleted_count += 1
 
         db.session.commit()
+        for deleted_id in deleted_ids:
+            MatchManager.notify_user_removed(deleted_id)
 
         return {
             'success': True,
@@ -2303,6 +2450,7 @@ def admin_system_config():
             # Update known keys
             if 'hide_dummies' in data:
                 update_system_config('hide_dummies', bool(data['hide_dummies']))
+                RecommendationCache.mark_all_stale()
 
             if 'log_level' in data:
                 new_level = int(data['log_level'])
@@ -2351,15 +2499,19 @@ def admin_reset_dummies():
         from extensions import MatchRequest
 
         deleted_count = 0
+        deleted_ids = []
         for user in dummies:
              # 연관 데이터 먼저 삭제
             PersonalityResult.query.filter_by(user_id=user.user_id).delete()
             MatchRequest.query.filter((MatchRequest.sender_id==user.user_id) | (MatchRequest.receiver_id==user.user_id)).delete()
 
+            deleted_ids.append(user.user_id)
             db.session.delete(user)
             deleted_count += 1
 
         db.session.commit()
+        for deleted_id in deleted_ids:
+            MatchManager.notify_user_removed(deleted_id)
         app.logger.warning(f"[System] Admin reset {deleted_count} dummy users.")
 
         return {'success': True, 'message': f'총 {deleted_count}명의 더미 사용자가 완전히 초기화되었습니다.'}
@@ -2402,10 +2554,21 @@ def chat_room(request_id):
     # 템플릿의 API 호출이 깨지지 않도록 request_id 변수에 match_code를 담아 넘깁니다
     return render_template('chat.html', request_id=req.match_code, partner=partner)
 
+# 채팅 메시지 조회 단위 (첫 로드 / 이전 대화 페이지)
+CHAT_PAGE_SIZE = 50
+CHAT_WEEKDAYS = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
+
 @app.route('/api/chat/<string:request_id>/messages')
 @login_required
 def get_chat_messages(request_id):
-    """메시지 목록 조회 (Polling용)"""
+    """
+    메시지 목록 조회 (Polling용, 커서 기반)
+    - after_id: 해당 ID 이후의 새 메시지만 반환 (주기적 폴링)
+    - before_id: 해당 ID 이전 메시지를 CHAT_PAGE_SIZE개 반환 (이전 대화 불러오기)
+    - latest=1: 최근 CHAT_PAGE_SIZE개 반환 (웹 첫 로드)
+    - 아무 파라미터도 없으면 기존 응답 그대로 전체 대화 + 날짜 구분선(is_system) 반환 (Android 앱 호환)
+    커서/latest 응답에는 구분선이 없으며, 클라이언트가 date_label 변화로 삽입합니다.
+    """
     try:
         req = MatchRequest.query.filter_by(match_code=request_id).first()
         if not req and request_id.isdigit():
@@ -2416,55 +2579,83 @@ def get_chat_messages(request_id):
             return jsonify({'error': 'Not found'}), 404
 
         real_request_id = req.request_id
+        my_id = g.user.user_id
 
-        if req.sender_id != g.user.user_id and req.receiver_id != g.user.user_id:
+        if req.sender_id != my_id and req.receiver_id != my_id:
             return jsonify({'error': 'Unauthorized'}), 403
 
-        messages = Message.query.filter_by(request_id=real_request_id).order_by(Message.created_at.asc()).all()
+        after_id = request.args.get('after_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        legacy = after_id is None and before_id is None and not request.args.get('latest')
 
-        # 읽음 처리 (상대방이 보낸 메시지)
-        unread_exist = False
-        for m in messages:
-            if m.sender_id != g.user.user_id and not m.is_read:
-                m.is_read = True
-                unread_exist = True
-        if unread_exist:
+        query = Message.query.filter(Message.request_id == real_request_id)
+        has_more = False
+        if after_id is not None:
+            messages = query.filter(Message.id > after_id).order_by(Message.id.asc()).all()
+        elif legacy:
+            messages = query.order_by(Message.id.asc()).all()
+        else:
+            if before_id is not None:
+                query = query.filter(Message.id < before_id)
+            page = query.order_by(Message.id.desc()).limit(CHAT_PAGE_SIZE + 1).all()
+            has_more = len(page) > CHAT_PAGE_SIZE
+            messages = list(reversed(page[:CHAT_PAGE_SIZE]))
+
+        # 읽음 처리 (상대방이 보낸 메시지): 최신 구간을 조회한 경우에만 한 번의 UPDATE로 처리
+        if before_id is None and any(m.sender_id != my_id and not m.is_read for m in messages):
+            marked = Message.query.filter(
+                Message.request_id == real_request_id,
+                Message.sender_id != my_id,
+                Message.is_read == False,
+                Message.id <= messages[-1].id
+            ).update({Message.is_read: True}, synchronize_session=False)
+            MatchManager.record_read(req, my_id, marked)
+            InboxVersion.bump(my_id)
             db.session.commit()
+            InboxVersion.notify(my_id)
 
-        msg_list = []
-        WEEKDAYS = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
-        last_date_str = None
+        # 상대방이 읽은 내 메시지의 마지막 ID (내 메시지의 '1' 표시 갱신용)
+        partner_read_id = db.session.query(db.func.max(Message.id)).filter(
+            Message.request_id == real_request_id,
+            Message.sender_id == my_id,
+            Message.is_read == True
+        ).scalar() or 0
 
+        msg_list = []
+        last_date_label = None
         for m in messages:
             # KST 시간 변환
             kst_time = m.created_at + timedelta(hours=9) if m.created_at else datetime.utcnow() + timedelta(hours=9)
-            current_date_str = kst_time.strftime('%Y년 %m월 %d일')
+            date_label = f"{kst_time.strftime('%Y년 %m월 %d일')} {CHAT_WEEKDAYS[kst_time.weekday()]}"
 
-            # 날짜 구분선 삽입
-            if current_date_str != last_date_str:
-                weekday_str = WEEKDAYS[kst_time.weekday()]
+            # 날짜 구분선 삽입 (파라미터 없는 기존 응답만)
+            if legacy and date_label != last_date_label:
                 msg_list.append({
                     'id': f'date-{m.id}',
                     'sender_id': 0,
-                    'content': f"{current_date_str} {weekday_str}",
+                    'content': date_label,
                     'is_system': True,
                     'created_at': '',
+                    'date_label': date_label,
                     'is_me': False,
                     'is_read': True
                 })
-                last_date_str = current_date_str
+                last_date_label = date_label
 
+            is_me = m.sender_id == my_id
             msg_list.append({
                 'id': m.id,
                 'sender_id': m.sender_id,
                 'content': m.content,
                 'is_system': False,
                 'created_at': kst_time.strftime('%H:%M'),
-                'is_me': m.sender_id == g.user.user_id,
-                'is_read': m.is_read
+                'date_label': date_label,
+                'is_me': is_me,
+                # 커밋 후 객체 재조회를 피하기 위해 읽음 여부를 직접 계산 (최신 구간의 상대 메시지는 위에서 읽음 처리됨)
+                'is_read': m.id <= partner_read_id if is_me else (before_id is None or m.is_read)
             })
 
-        return jsonify({'messages': msg_list})
+        return jsonify({'messages': msg_list, 'has_more': has_more, 'partner_read_id': partner_read_id})
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"API Chat messages error: {e}")
@@ -2491,7 +2682,14 @@ def send_chat_message(request_id):
 
         msg = Message(request_id=real_request_id, sender_id=g.user.user_id, content=content)
         db.session.add(msg)
+        db.session.flush()
+        MatchManager.record_message(req, msg)  # 상대방 안 읽은 수 / 마지막 메시지 (같은 트랜잭션)
+        InboxVersion.bump(req.sender_id, req.receiver_id)
         db.session.commit()
+
+        # 실시간 푸시: 채팅방 구독자와 양쪽 인박스에 갱신 신호
+        realtime.publish(f"chat:{req.match_code}", message_id=msg.id)
+        InboxVersion.notify(req.sender_id, req.receiver_id)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -2566,19 +2764,35 @@ def validate_conditions(user, profile, conditions):
 
     return True, "조건을 모두 만족합니다."
 
+def get_display_names(user_ids):
+    """user_id -> 표시 이름(닉네임 또는 아이디) 맵을 한 번의 쿼리로 조회합니다."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    rows = db.session.query(User.user_id, User.nickname, User.username)\
+        .filter(User.user_id.in_(user_ids)).all()
+    return {uid: nickname or username for uid, nickname, username in rows}
+
 @app.route('/groups')
 @login_required
 def group_lobby():
     """그룹 채팅방 로비 (목록)"""
     rooms = GroupChatRoom.query.order_by(GroupChatRoom.created_at.desc()).all()
-    joined_rooms = [p.room_id for p in GroupChatParticipant.query.filter_by(user_id=g.user.user_id).all()]
+    joined_rooms = {room_id for (room_id,) in db.session.query(GroupChatParticipant.room_id)
+                    .filter_by(user_id=g.user.user_id)}
     profile = PersonalityResult.query.filter_by(user_id=g.user.user_id, is_representative=True).first()
 
+    # 방별 참여 인원 (GROUP BY 한 번)
+    participant_counts = dict(
+        db.session.query(GroupChatParticipant.room_id, db.func.count(GroupChatParticipant.id))
+        .group_by(GroupChatParticipant.room_id).all()
+    )
+
     room_data = []
     for r in rooms:
         is_joined = r.id in joined_rooms
         can_join, reason = validate_conditions(g.user, profile, r.conditions)
-        participant_count = GroupChatParticipant.query.filter_by(room_id=r.id).count()
+        participant_count = participant_counts.get(r.id, 0)
 
         room_data.append({
             'id': r.id,
@@ -2771,7 +2985,12 @@ def group_delete(room_code):
 @app.route('/api/groups/<room_code>/messages')
 @login_required
 def get_group_chat_messages(room_code):
-    """그룹 채팅방 메시지 목록 조회 (Polling용)"""
+    """
+    그룹 채팅방 메시지 목록 조회 (Polling용, 커서 기반)
+    - after_id / before_id / latest=1 / 파라미터 없음(전체 + 날짜 구분선): 1:1 채팅(get_chat_messages)과 동일
+    - read_pointers: 참여자별 마지막 읽은 메시지 ID (정렬됨). 클라이언트는 이미 받은 메시지의
+      안 읽은 수를 이 값으로 다시 계산하므로, 폴링마다 전체 메시지를 다시 받을 필요가 없습니다.
+    """
     try:
         room = GroupChatRoom.query.filter_by(room_code=room_code).first()
         if not room:
@@ -2781,60 +3000,79 @@ def get_group_chat_messages(room_code):
         if not participant:
             return jsonify({'error': 'Unauthorized'}), 403
 
-        messages = GroupChatMessage.query.filter_by(room_id=room_id).order_by(GroupChatMessage.created_at.asc()).all()
+        after_id = request.args.get('after_id', type=int)
+        before_id = request.args.get('before_id', type=int)
+        legacy = after_id is None and before_id is None and not request.args.get('latest')
 
-        # 메시지를 조회할 때 나의 마지막 읽은 지점 업데이트
-        if messages:
+        query = GroupChatMessage.query.filter(GroupChatMessage.room_id == room_id)
+        has_more = False
+        if after_id is not None:
+            messages = query.filter(GroupChatMessage.id > after_id).order_by(GroupChatMessage.id.asc()).all()
+        elif legacy:
+            messages = query.order_by(GroupChatMessage.id.asc()).all()
+        else:
+            if before_id is not None:
+                query = query.filter(GroupChatMessage.id < before_id)
+            page = query.order_by(GroupChatMessage.id.desc()).limit(CHAT_PAGE_SIZE + 1).all()
+            has_more = len(page) > CHAT_PAGE_SIZE
+            messages = list(reversed(page[:CHAT_PAGE_SIZE]))
+
+        # 메시지를 조회할 때 나의 마지막 읽은 지점 업데이트 (최신 구간을 조회한 경우만)
+        # (커밋은 응답 생성 후에: 먼저 커밋하면 조회한 메시지가 만료되어 메시지마다 다시 로드됨)
+        read_updated = False
+        if messages and before_id is None:
             max_msg_id = messages[-1].id
-            if participant.last_read_message_id < max_msg_id:
+            if (participant.last_read_message_id or 0) < max_msg_id:
                 participant.last_read_message_id = max_msg_id
-                db.session.commit()
+                read_updated = True
+
+        # 안 읽은 수 = 마지막 읽은 ID가 메시지 ID보다 작은 참여자 수
+        # 정렬된 읽음 지점에서 이분 탐색 -> 메시지당 O(log P)
+        read_pointers = sorted(
+            last_read or 0 for (last_read,) in db.session.query(GroupChatParticipant.last_read_message_id)
+            .filter(GroupChatParticipant.room_id == room_id)
+        )
 
-        # 안 읽은 카운트 계산을 위한 데이터 준비
-        all_participants = GroupChatParticipant.query.filter_by(room_id=room_id).all()
-        read_thresholds = [p.last_read_message_id for p in all_participants]
-        total_participants = len(read_thresholds)
+        # 발신자 표시 이름 (메시지 수와 무관하게 쿼리 한 번)
+        sender_names = get_display_names(m.sender_id for m in messages)
 
         msg_list = []
-        WEEKDAYS = ["월요일", "화요일", "수요일", "목요일", "금요일", "토요일", "일요일"]
-        last_date_str = None
-
+        last_date_label = None
         for m in messages:
-            sender = User.query.get(m.sender_id)
-            read_count = sum(1 for threshold in read_thresholds if threshold >= m.id)
-            unread_count = total_participants - read_count
-
             # KST 시간 변환
             kst_time = m.created_at + timedelta(hours=9) if m.created_at else datetime.utcnow() + timedelta(hours=9)
-            current_date_str = kst_time.strftime('%Y년 %m월 %d일')
+            date_label = f"{kst_time.strftime('%Y년 %m월 %d일')} {CHAT_WEEKDAYS[kst_time.weekday()]}"
 
-            # 날짜가 바뀌면 날짜 구분선(시스템 메시지) 삽입
-            if current_date_str != last_date_str:
-                weekday_str = WEEKDAYS[kst_time.weekday()]
+            # 날짜 구분선(시스템 메시지) 삽입 (파라미터 없는 기존 응답만)
+            if legacy and date_label != last_date_label:
                 msg_list.append({
                     'id': f'date-{m.id}',
                     'sender_id': 0,
                     'sender_nickname': 'System',
-                    'content': f"{current_date_str} {weekday_str}",
+                    'content': date_label,
                     'is_system': True,
                     'unread_count': 0,
                     'created_at': '',
+                    'date_label': date_label,
                     'is_me': False
                 })
-                last_date_str = current_date_str
+                last_date_label = date_label
 
             msg_list.append({
                 'id': m.id,
                 'sender_id': m.sender_id,
-                'sender_nickname': sender.nickname or sender.username if sender else '알 수 없음',
+                'sender_nickname': sender_names.get(m.sender_id, '알 수 없음'),
                 'content': m.content,
                 'is_system': m.is_system,
-                'unread_count': unread_count if unread_count > 0 else 0,
+                'unread_count': bisect.bisect_left(read_pointers, m.id),
                 'created_at': kst_time.strftime('%H:%M'),
+                'date_label': date_label,
                 'is_me': m.sender_id == g.user.user_id
             })
 
-        return jsonify({'messages': msg_list})
+        if read_updated:
+            db.session.commit()
+        return jsonify({'messages': msg_list, 'has_more': has_more, 'read_pointers': read_pointers})
     except Exception as e:
         db.session.rollback()
         app.logger.error(f"API Group messages error: {e}")
@@ -2860,6 +3098,7 @@ def send_group_chat_message(room_code):
         msg = GroupChatMessage(room_id=room_id, sender_id=g.user.user_id, content=content)
         db.session.add(msg)
         db.session.commit()
+        realtime.publish(f"group:{room.room_code}", message_id=msg.id)
         return jsonify({'success': True})
     except Exception as e:
         db.session.rollback()
@@ -2881,22 +3120,26 @@ def get_group_chat_participants(room_code):
         total_p = len(participants)
         threshold = (total_p // 2) + 1
 
+        # 참여자 수와 무관하게 고정 쿼리 수: 표시 이름 1회 + 강퇴 득표 GROUP BY 1회 + 내 투표 1회
+        names = get_display_names(p.user_id for p in participants)
+        vote_counts = dict(
+            db.session.query(GroupChatKickVote.target_id, db.func.count(GroupChatKickVote.id))
+            .filter_by(room_id=room_id).group_by(GroupChatKickVote.target_id).all()
+        )
+        my_votes = {target_id for (target_id,) in db.session.query(GroupChatKickVote.target_id)
+                    .filter_by(room_id=room_id, voter_id=g.user.user_id)}
+
         res = []
         for p in participants:
-            u = User.query.get(p.user_id)
-            if u:
-                votes = GroupChatKickVote.query.filter_by(room_id=room_id, target_id=p.user_id).count()
-                my_vote = GroupChatKickVote.query.filter_by(room_id=room_id,
-                                                            target_id=p.user_id,
-                                                            voter_id=g.user.user_id).first() is not None
+            if p.user_id in names:
                 res.append({
-                    'user_id': u.user_id,
-                    'nickname': u.nickname or u.username,
-                    'is_me': u.user_id == g.user.user_id,
-                    'is_creator': u.user_id == room.creator_id,
-                    'votes': votes,
+                    'user_id': p.user_id,
+                    'nickname': names[p.user_id],
+                    'is_me': p.user_id == g.user.user_id,
+                    'is_creator': p.user_id == room.creator_id,
+                    'votes': vote_counts.get(p.user_id, 0),
                     'threshold': threshold,
-                    'voted_by_me': my_vote
+                    'voted_by_me': p.user_id in my_votes
                 })
         return jsonify({'participants': res})
     except Exception as e:
@@ -3109,7 +3352,9 @@ def api_get_blind_chat_messages(match_code):
     for msg in unread_messages:
         msg.is_read = True
     if unread_messages:
+        BlindMatchManager.record_read(match, g.user.user_id, len(unread_messages))
         db.session.commit()
+        BadgeCache.invalidate(g.user.user_id)
 
     messages = BlindMatchMessage.query.filter_by(match_id=match.id).order_by(BlindMatchMessage.created_at.asc()).all()
     msg_list = []
@@ -3142,7 +3387,11 @@ def api_send_blind_chat_message(match_code):
 
     msg = BlindMatchMessage(match_id=match.id, sender_id=g.user.user_id, content=content)
     db.session.add(msg)
+    db.session.flush()
+    BlindMatchManager.record_message(match, msg)  # 상대방 안 읽은 수 / 마지막 메시지 (같은 트랜잭션)
     db.session.commit()
+    BadgeCache.invalidate(match.user1_id if match.user2_id == g.user.user_id else match.user2_id)
+    realtime.publish(f"blind:{match.match_code}", message_id=msg.id)
     return jsonify({'success': True})
 
 def schedule_system_jobs():
@@ -3166,6 +3415,38 @@ def schedule_system_jobs():
         
         app.logger.info("-> 'timeout_inactive_matches' 작업이 6시간 간격으로 등록되었습니다.")
 
+    if not scheduler.get_job('resync_population_stats'):
+        scheduler.add_job(id='resync_population_stats',
+                          func=PopulationStatsService.resync_job,
+                          trigger='interval',
+                          minutes=10, args=[app])
+
+        app.logger.info("-> 'resync_population_stats' 작업이 10분 간격으로 등록되었습니다.")
+
+    if config_class.CANDIDATE_STORE_ENABLED and not scheduler.get_job('resync_candidate_store'):
+        scheduler.add_job(id='resync_candidate_store',
+                          func=CandidateStore.resync_job,
+                          trigger='interval',
+                          minutes=10, args=[app])
+
+        app.logger.info("-> 'resync_candidate_store' 작업이 10분 간격으로 등록되었습니다.")
+
+    if config_class.RECOMMENDATION_CACHE_ENABLED and not scheduler.get_job('refresh_recommendations'):
+        scheduler.add_job(id='refresh_recommendations',
+                          func=MatchManager.refresh_recommendations_job,
+                          trigger='interval',
+                          minutes=5, args=[app])
+
+        app.logger.info("-> 'refresh_recommendations' 작업이 5분 간격으로 등록되었습니다.")
+
+    if not scheduler.get_job('requeue_stale_analysis_jobs'):
+        scheduler.add_job(id='requeue_stale_analysis_jobs',
+                          func=AnalysisPipeline.requeue_stale_job,
+                          trigger='interval',
+                          minutes=5, args=[app])
+
+        app.logger.info("-> 'requeue_stale_analysis_jobs' 작업이 5분 간격으로 등록되었습니다.")
+
 if __name__ == '__main__':
     import sys
 
@@ -3182,4 +3463,12 @@ if __name__ == '__main__':
         with app.app_context():
             schedule_system_jobs()
 
-    app.run(host=config_class.RUN_HOST, port=config_class.RUN_PORT, use_reloader=app.debug)
\ No newline at end of file
+        # 분석 워커 스레드 (embedded 모드, 리로더 자식 프로세스에서만 시작)
+        if config_class.ANALYSIS_WORKER_MODE == 'embedded':
+            AnalysisPipeline.start_embedded(app)
+
+    if realtime.is_enabled():
+        # Socket.IO 서버로 실행 (WebSocket 처리 포함)
+        realtime.socketio.run(app, host=config_class.RUN_HOST, port=config_class.RUN_PORT, use_reloader=app.debug)
+    else:
+        app.run(host=config_class.RUN_HOST, port=config_class.RUN_PORT, use_reloader=app.debug)
\ No newline at end of file
@@ -0,0 +1,82 @@
+# badge_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 헤더 알림 뱃지 카운트 캐시
+======================================================================
+
+[시스템 개요]
+상단 내비게이션의 뱃지(안 읽은 알림 수, 블라인드 매칭 알림 수)는 HTML 페이지를 렌더링할 때만
+필요합니다. 요청마다 계산하지 않고, 템플릿 렌더링 시점(context processor)에 조회하며
+사용자별로 BADGE_CACHE_TTL_SECONDS 동안 재사용합니다.
+
+[무효화]
+알림 생성/읽음, 블라인드 매칭 요청/응답/메시지 등 뱃지 값이 바뀌는 쓰기 작업 직후
+BadgeCache.invalidate(user_id)를 호출하면 다음 렌더링에서 즉시 다시 계산합니다.
+캐시는 프로세스(워커)별이므로, 다른 워커의 쓰기는 최대 TTL만큼 늦게 반영됩니다.
+
+[사용법]
+  unread_count, unread_blind_count = BadgeCache.get(user_id)
+  BadgeCache.invalidate(sender_id, receiver_id)
+"""
+
+import os
+import logging
+import threading
+import time
+
+from config import config_by_name
+
+logger = logging.getLogger(__name__)
+
+env = os.getenv('FLASK_ENV', 'development')
+cfg = config_by_name[env]
+
+# 캐시 항목이 이 수를 넘으면 만료된 항목을 정리
+_MAX_ENTRIES = 10000
+
+
+class BadgeCache:
+    """사용자별 (안 읽은 알림 수, 블라인드 알림 수) TTL 캐시 (프로세스 내부)"""
+
+    _lock = threading.Lock()
+    _entries = {}  # user_id -> (만료 시각, (unread_count, unread_blind_count))
+
+    @classmethod
+    def get(cls, user_id):
+        """뱃지 카운트를 반환합니다. 캐시가 없거나 만료되었으면 COUNT 쿼리로 다시 계산합니다."""
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        counts = cls._compute(user_id)
+        ttl = cfg.BADGE_CACHE_TTL_SECONDS
+        if ttl > 0:
+            with cls._lock:
+                if len(cls._entries) >= _MAX_ENTRIES:
+                    cls._entries = {uid: e for uid, e in cls._entries.items() if e[0] > now}
+                cls._entries[user_id] = (now + ttl, counts)
+        return counts
+
+    @classmethod
+    def invalidate(cls, *user_ids):
+        """사용자들의 캐시된 뱃지 카운트를 버립니다. (쓰기 작업 직후 호출)"""
+        with cls._lock:
+            for user_id in user_ids:
+                cls._entries.pop(user_id, None)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries = {}
+
+    @staticmethod
+    def _compute(user_id):
+        # 순환 import 방지 (매니저들이 invalidate를 위해 이 모듈을 import)
+        from match_manager import MatchManager
+        from blind_match_manager import BlindMatchManager
+
+        return (MatchManager.count_unread_notifications(user_id),
+                BlindMatchManager.get_unread_blind_count(user_id))
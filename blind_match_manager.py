@@ -27,8 +27,10 @@ from extensions import (
     Notification, MatchRequest, BlindMatchStatus, BlindMatchAnalytics,
     BlindMatchQueue, BlindQueueStatus
 )
-from match_manager import MatchManager
-from sqlalchemy import or_, and_
+from match_manager import MatchManager, message_preview, NO_MESSAGE_PREVIEW
+from badge_cache import BadgeCache
+from inbox_version import InboxVersion
+from sqlalchemy import or_, and_, case
 
 # --- 로거 설정 ---
 logger = logging.getLogger(__name__)
@@ -144,22 +146,19 @@ class BlindMatchManager:
             # 4. 매칭 점수 계산 (기존 MatchManager 로직 재활용)
             weights = cls._get_weights_for_mode(mode)
             
-            scored_candidates = MatchManager._calculate_match_scores(
+            # 5. 점수(내림) -> 가입일(오름) 기준 상위 limit명만 상세 데이터와 함께 반환
+            top_candidates = MatchManager._calculate_match_scores(
                 my_user_id=user_id,
                 candidates=candidates,
                 current_user_profile_json=my_profile.full_report_json,
-                weights=weights
-            )
-
-            # 5. 최종 정렬 및 필터링
-            sorted_candidates = sorted(
-                scored_candidates, 
-                key=lambda x: (-x.get('match_score', 0), x.get('created_at', datetime.utcnow()))
+                weights=weights,
+                limit=limit,
+                tiebreakers=('created_at',)
             )
 
             # 최종 후보에서 민감 정보 제거
             final_candidates = []
-            for cand in sorted_candidates[:limit]:
+            for cand in top_candidates:
                 final_candidates.append({
                     'user_id': cand['user_id'],
                     'match_score': cand.get('match_score', 0),
@@ -256,7 +255,10 @@ class BlindMatchManager:
             )
             db.session.add(notification)
 
+            InboxVersion.bump(receiver_id)
             db.session.commit()
+            BadgeCache.invalidate(receiver_id)
+            InboxVersion.notify(receiver_id)
             logger.info(f"블라인드 매칭 요청(ID: {new_blind_match.id}) 생성 성공.")
             return {"success": True, "message": "블라인드 매칭 요청을 성공적으로 보냈습니다."}
 
@@ -344,7 +346,10 @@ class BlindMatchManager:
                 related_entity_id=match.id
             )
             db.session.add(notification)
+            InboxVersion.bump(sender_id)
             db.session.commit()
+            BadgeCache.invalidate(match.user1_id, match.user2_id)
+            InboxVersion.notify(sender_id)
 
             logger.info(f"블라인드 매칭(ID: {request_id}) 상태 변경 -> {match.status.value}")
             return {"success": True, "message": response_msg}
@@ -380,36 +385,8 @@ class BlindMatchManager:
             if not matches_with_partner:
                 return {"success": True, "data": {'active': [], 'completed': []}}
 
-            match_ids = [match.id for match, _ in matches_with_partner]
-
-            # 2. 마지막 메시지 일괄 조회 (최적화)
-            last_message_subquery = db.session.query(
-                BlindMatchMessage.match_id,
-                db.func.max(BlindMatchMessage.created_at).label('max_created_at')
-            ).filter(BlindMatchMessage.match_id.in_(match_ids)).group_by(BlindMatchMessage.match_id).subquery()
-
-            last_messages_q = db.session.query(
-                BlindMatchMessage.match_id,
-                BlindMatchMessage.content
-            ).join(
-                last_message_subquery,
-                (BlindMatchMessage.match_id == last_message_subquery.c.match_id) &
-                (BlindMatchMessage.created_at == last_message_subquery.c.max_created_at)
-            ).all()
-            last_messages_map = {match_id: content for match_id, content in last_messages_q}
-
-            # 3. 안 읽은 메시지 수 일괄 조회 (최적화)
-            unread_counts_q = db.session.query(
-                BlindMatchMessage.match_id,
-                db.func.count(BlindMatchMessage.id)
-            ).filter(
-                BlindMatchMessage.match_id.in_(match_ids),
-                BlindMatchMessage.sender_id != user_id,
-                BlindMatchMessage.is_read == False
-            ).group_by(BlindMatchMessage.match_id).all()
-            unread_counts_map = {match_id: count for match_id, count in unread_counts_q}
-
-            # 4. 결과 데이터 구조화
+            # 2. 결과 데이터 구조화
+            # (마지막 메시지와 안 읽은 메시지 수는 BlindMatch의 역정규화 컬럼 사용: record_message/record_read)
             result = {
                 'active': [],
                 'completed': []
@@ -425,8 +402,8 @@ class BlindMatchManager:
                     'partner_nickname': partner_nickname if match.status == BlindMatchStatus.REVEALED else "블라인드 사용자",
                     'status': match.status.value,
                     'updated_at': match.updated_at.isoformat(),
-                    'last_message': last_messages_map.get(match.id, "대화를 시작해보세요."),
-                    'unread_count': unread_counts_map.get(match.id, 0)
+                    'last_message': match.last_message_preview or NO_MESSAGE_PREVIEW,
+                    'unread_count': match.user1_unread_count if match.user1_id == user_id else match.user2_unread_count
                 }
 
                 if match.status in [BlindMatchStatus.ACTIVE, BlindMatchStatus.REVEAL_REQUESTED_BY_1, BlindMatchStatus.REVEAL_REQUESTED_BY_2]:
@@ -484,7 +461,10 @@ class BlindMatchManager:
             )
             db.session.add(notification)
 
+            InboxVersion.bump(receiver_id)
             db.session.commit()
+            BadgeCache.invalidate(sender_id, receiver_id)
+            InboxVersion.notify(receiver_id)
             logger.info(f"블라인드 매칭(ID: {match_id})에서 일반 매칭 요청(ID: {match_request_result.get('request_id')})으로 전환 성공.")
 
             return {"success": True, "message": "프로필을 성공적으로 보냈습니다. 상대방의 응답을 기다려주세요."}
@@ -522,7 +502,10 @@ class BlindMatchManager:
             )
             db.session.add(notification)
 
+            InboxVersion.bump(partner_id)
             db.session.commit()
+            BadgeCache.invalidate(user_id, partner_id)
+            InboxVersion.notify(partner_id)
 
             cls.analyze_completed_match(match.id)
 
@@ -534,6 +517,34 @@ class BlindMatchManager:
             logger.exception(f"블라인드 매칭 종료 처리 중 DB 오류 발생 (Match ID: {match_id})")
             return {"success": False, "message": "서버 오류로 인해 처리하지 못했습니다."}
 
+    @classmethod
+    def record_message(cls, match, message):
+        """
+        [대화 요약 갱신] 메시지 저장 시 상대방의 안 읽은 수와 마지막 메시지를 갱신합니다.
+        message는 flush되어 id가 있어야 하며, 커밋은 호출 측 트랜잭션에서 수행합니다.
+        """
+        unread_col = BlindMatch.user2_unread_count if message.sender_id == match.user1_id \
+            else BlindMatch.user1_unread_count
+        BlindMatch.query.filter_by(id=match.id).update({
+            unread_col: unread_col + 1,
+            BlindMatch.last_message_id: message.id,
+            BlindMatch.last_message_preview: message_preview(message.content),
+            BlindMatch.last_message_at: message.created_at or datetime.utcnow(),
+            BlindMatch.updated_at: BlindMatch.updated_at,  # 상태 변경 시각 유지 (목록 정렬/분석에 사용)
+        }, synchronize_session=False)
+
+    @classmethod
+    def record_read(cls, match, reader_id, count):
+        """[대화 요약 갱신] reader_id가 메시지 count개를 읽었을 때 안 읽은 수를 차감합니다. (커밋은 호출 측)"""
+        if count <= 0:
+            return
+        unread_col = BlindMatch.user1_unread_count if reader_id == match.user1_id \
+            else BlindMatch.user2_unread_count
+        BlindMatch.query.filter_by(id=match.id).update({
+            unread_col: case((unread_col > count, unread_col - count), else_=0),
+            BlindMatch.updated_at: BlindMatch.updated_at,
+        }, synchronize_session=False)
+
     @classmethod
     def get_unread_blind_count(cls, user_id):
         """
@@ -541,35 +552,23 @@ class BlindMatchManager:
         (받은 요청 + 활성 대화의 안 읽은 메시지)
         """
         try:
-            # 1. 받은 요청 수 (내가 user2_id이고 상태가 PENDING)
-            pending_received_count = db.session.query(BlindMatch.id).filter(
-                BlindMatch.user2_id == user_id,
-                BlindMatch.status == BlindMatchStatus.PENDING
-            ).count()
-
-            # 2. 활성 대화의 안 읽은 메시지 총합
-            # 먼저 내가 참여중인 활성 대화 ID 목록을 가져옴
-            active_match_ids_q = db.session.query(BlindMatch.id).filter(
-                or_(BlindMatch.user1_id == user_id, BlindMatch.user2_id == user_id),
-                BlindMatch.status.in_([
-                    BlindMatchStatus.ACTIVE, 
-                    BlindMatchStatus.REVEAL_REQUESTED_BY_1, 
-                    BlindMatchStatus.REVEAL_REQUESTED_BY_2
-                ])
-            )
-            
-            active_match_ids = [m[0] for m in active_match_ids_q.all()]
-            
-            unread_message_count = 0
-            if active_match_ids:
-                # 해당 대화들에서 내가 받기만 한(sender가 내가 아닌) 안 읽은 메시지 수
-                unread_message_count = db.session.query(BlindMatchMessage.id).filter(
-                    BlindMatchMessage.match_id.in_(active_match_ids),
-                    BlindMatchMessage.sender_id != user_id,
-                    BlindMatchMessage.is_read == False
-                ).count()
-
-            return pending_received_count + unread_message_count
+            # 받은 요청 수(내가 user2_id이고 PENDING) + 활성 대화의 내 안 읽은 메시지 수를 한 번의 집계로 계산
+            active_states = [
+                BlindMatchStatus.ACTIVE,
+                BlindMatchStatus.REVEAL_REQUESTED_BY_1,
+                BlindMatchStatus.REVEAL_REQUESTED_BY_2
+            ]
+            my_unread = case((BlindMatch.user1_id == user_id, BlindMatch.user1_unread_count),
+                             else_=BlindMatch.user2_unread_count)
+            total = db.session.query(db.func.sum(case(
+                ((BlindMatch.user2_id == user_id) & (BlindMatch.status == BlindMatchStatus.PENDING), 1),
+                (BlindMatch.status.in_(active_states), my_unread),
+                else_=0
+            ))).filter(
+                or_(BlindMatch.user1_id == user_id, BlindMatch.user2_id == user_id)
+            ).scalar()
+
+            return int(total or 0)
         except Exception as e:
             logger.exception(f"사용자 {user_id}의 안 읽은 블라인드 매칭 카운트 조회 중 오류 발생")
             return 0
@@ -0,0 +1,239 @@
+# candidate_index.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 대규모 후보군용 근사 최근접 이웃 사전 필터 (ANN Prefilter)
+======================================================================
+
+[시스템 개요]
+유사성(50%)은 Big5 Z-Score 5차원 벡터의 코사인 유사도이므로, 단위 벡터로 정규화하면
+"코사인이 큰 후보 = 유클리드 거리가 가까운 후보"가 됩니다. (cos = 1 - d² / 2)
+본 모듈은 후보 저장소 스냅샷(candidate_store.CandidateSnapshot)을 MBTI 유형별 16(+1)개
+버킷으로 나누고, 버킷마다 KD-Tree(scipy.spatial.cKDTree)를 구성합니다.
+
+[조회 절차]
+1. 재채점 후보 수 budget을 버킷별로 나눕니다. 타겟과의 MBTI 궁합이 높은 버킷일수록
+   더 많이 할당합니다. (할당량 ∝ exp(CHEMISTRY_SHARPNESS * 궁합))
+2. 각 버킷에서 할당량만큼 타겟과 가까운(코사인이 큰) 후보를 조회합니다.
+3. 모인 후보는 호출 측에서 HybridMatcher 공식으로 정확히 재채점(rerank)합니다.
+
+budget(CANDIDATE_INDEX_BUDGET)이 클수록 재현율이 높고 지연 시간이 늘어납니다.
+후보 수가 CANDIDATE_INDEX_MIN_POOL 미만이면 전수 채점이 더 빠르므로 사용하지 않습니다.
+(합성 데이터 상위 30명 기준: 10만 명 budget 300 ≈ 재현율 0.82, 800 ≈ 0.99 / 30만 명 800 ≈ 0.95)
+
+[재현율 리포트]
+  python candidate_index.py --n 100000 --budget 300 --k 30 --trials 20
+  (합성 데이터에서 전수 채점 상위 k명 대비 재현율과 지연 시간을 출력)
+"""
+
+import argparse
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import matcher
+
+# 기본 재채점 후보 수 / 인덱스 사용 최소 후보 수
+DEFAULT_BUDGET = 800
+DEFAULT_MIN_POOL = 20000
+# 버킷별 할당량을 MBTI 궁합 쪽으로 얼마나 몰아줄지 (0이면 균등)
+CHEMISTRY_SHARPNESS = 6.0
+# 요청 필터(allowed)로 빠질 행을 감안한 조회 수 확대 상한 (할당량의 배수)
+MAX_QUERY_INFLATION = 4
+# 확대 조회 후에도 할당량을 못 채우면 허용 행 전수 거리 계산으로 대체할 최대 버킷 크기
+BRUTE_FORCE_BUCKET = 4096
+
+
+class CandidateIndex:
+    """스냅샷 하나에 대한 MBTI 버킷별 KD-Tree 인덱스 (불변)"""
+
+    _cache_lock = threading.Lock()
+    _cache = None  # (스냅샷 객체 id, version, CandidateIndex)
+
+    def __init__(self, big5_z: np.ndarray, mbti_codes: np.ndarray, include: Optional[np.ndarray] = None):
+        """
+        big5_z: (N, 5) Z-Score 행렬, mbti_codes: (N,) uint8 코드
+        include: 인덱스에 넣을 행 마스크 (예: 정지 계정 제외). None이면 전체.
+        """
+        z = np.asarray(big5_z, dtype=np.float64)
+        norms = np.linalg.norm(z, axis=1)
+        base = np.ones(z.shape[0], dtype=bool) if include is None else np.asarray(include, dtype=bool)
+
+        # Zero Vector(코사인 0)는 거리로 표현할 수 없으므로 항상 재채점 대상에 포함
+        self.zero_rows = np.flatnonzero(base & (norms == 0))
+
+        self.buckets = {}  # code -> (행 번호 배열, cKDTree)
+        unit = np.zeros_like(z)
+        nonzero = norms > 0
+        unit[nonzero] = z[nonzero] / norms[nonzero, None]
+        for code in np.unique(np.asarray(mbti_codes)[base & nonzero]):
+            rows = np.flatnonzero(base & nonzero & (mbti_codes == code))
+            self.buckets[int(code)] = (rows, cKDTree(unit[rows]))
+
+    @classmethod
+    def for_snapshot(cls, snap) -> "CandidateIndex":
+        """스냅샷별로 한 번만 인덱스를 만들고 재사용합니다. (정지 계정은 인덱스에서 제외)"""
+        with cls._cache_lock:
+            cached = cls._cache
+            if cached is not None and cached[0] == id(snap) and cached[1] == snap.version:
+                return cached[2]
+        index = cls(snap.big5_z, snap.mbti_codes, include=~np.asarray(snap.is_banned))
+        with cls._cache_lock:
+            cls._cache = (id(snap), snap.version, index)
+        return index
+
+    def prefilter(self, target_z: np.ndarray, target_mbti_code: int, budget: int = DEFAULT_BUDGET,
+                  allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        재채점할 후보 행 번호(오름차순)를 반환합니다. (약 budget명 + Zero Vector 후보)
+        allowed: 요청 단위 필터 마스크 (제외 사용자, 더미 숨김 등). None이면 전체 허용.
+        """
+        target_z = np.asarray(target_z, dtype=np.float64)
+        t_norm = np.linalg.norm(target_z)
+        # 타겟이 Zero Vector면 모든 유사성이 동일(0.5)하므로 버킷 안에서는 아무 후보나 같습니다.
+        target_unit = target_z / t_norm if t_norm > 0 else None
+
+        # 궁합이 높은 버킷일수록 더 많은 이웃을 가져옵니다. (버킷별 할당량 ∝ exp(sharpness * 궁합))
+        codes = list(self.buckets)
+        if not codes:
+            selected = np.zeros(0, dtype=np.intp)
+        else:
+            chem = matcher.RelationshipBrain.CHEMISTRY_TABLE[target_mbti_code, codes].astype(float)
+            share = np.exp(CHEMISTRY_SHARPNESS * chem)
+            quota = np.ceil(budget * share / share.sum()).astype(int)
+
+            picked = []
+            for code, k in zip(codes, quota):
+                found = self._query_bucket(code, target_unit, int(k), allowed)
+                if found.size:
+                    picked.append(found)
+            selected = np.concatenate(picked) if picked else np.zeros(0, dtype=np.intp)
+
+        zero_rows = self.zero_rows if allowed is None else self.zero_rows[allowed[self.zero_rows]]
+        return np.union1d(selected, zero_rows)
+
+    def _query_bucket(self, code, target_unit, k, allowed):
+        """
+        버킷 하나에서 허용된 행 중 타겟과 가까운 최대 k개를 반환합니다.
+        필터로 빠질 비율만큼 조회 수를 늘리되 MAX_QUERY_INFLATION배로 제한하고 (대량 제외 시 버킷 전체 조회 방지),
+        그래도 k개를 못 채우면 작은 버킷(BRUTE_FORCE_BUCKET 이하)만 허용 행 전수 거리 계산으로 채웁니다.
+        """
+        rows, tree = self.buckets[code]
+        if k <= 0:
+            return np.zeros(0, dtype=np.intp)
+        if allowed is None:
+            allowed_count = rows.size
+        else:
+            allowed_count = int(np.count_nonzero(allowed[rows]))
+            if allowed_count == 0:
+                return np.zeros(0, dtype=np.intp)
+        k = min(k, allowed_count)
+
+        max_k = min(rows.size, k * MAX_QUERY_INFLATION)
+        query_k = min(max_k, -(-k * rows.size // allowed_count))  # 허용 비율로 기대값 보정
+        while True:
+            if target_unit is None:
+                found = rows[:query_k]
+            else:
+                _, idx = tree.query(target_unit, k=query_k)
+                found = rows[np.atleast_1d(idx)]
+            if allowed is not None:
+                found = found[allowed[found]]
+            if found.size >= k or query_k >= max_k:
+                break
+            query_k = max_k  # 기대값보다 적게 남으면 상한까지 한 번 더 조회
+
+        if found.size < k and rows.size <= BRUTE_FORCE_BUCKET:
+            mask = allowed[rows]
+            if target_unit is None:
+                return rows[mask][:k]
+            d2 = ((tree.data[mask] - target_unit) ** 2).sum(axis=1)
+            nearest = np.argpartition(d2, k - 1)[:k] if k < d2.size else np.arange(d2.size)
+            return rows[mask][nearest]
+        return found[:k]
+
+
+# ----------------------------
+# 재현율 리포트 (Recall Report)
+# ----------------------------
+def _synthetic_pool(n, rng):
+    """실제 분포와 비슷한 합성 후보군 (Big5 정규분포, 유형 균등)"""
+    big5 = np.clip(rng.normal(50, 15, size=(n, 5)), 0, 100)
+    mbti = rng.integers(0, 16, size=n).astype(np.uint8)
+    socio = rng.integers(0, 16, size=n).astype(np.uint8)
+    mbti_conf = rng.uniform(0.3, 1.0, size=n)
+    socio_conf = rng.uniform(0.3, 1.0, size=n)
+    lines = rng.integers(0, 3000, size=n)
+    return big5, mbti, socio, mbti_conf, socio_conf, lines
+
+
+def recall_report(n=100000, budget=DEFAULT_BUDGET, k=30, trials=20, seed=0):
+    """합성 데이터에서 전수 채점 대비 상위 k명 재현율과 평균 지연 시간(ms)을 측정합니다."""
+    rng = np.random.default_rng(seed)
+    big5, mbti, socio, mbti_conf, socio_conf, lines = _synthetic_pool(n, rng)
+    types = matcher.RelationshipBrain.MBTI_TYPES
+    socio_types = matcher.RelationshipBrain.SOCIONICS_TYPES
+
+    hybrid = matcher.HybridMatcher([matcher.UserVector(i, '', types[mbti[i]], 0.0, big5[i], 0.0, 'UNK', 0.0)
+                                    for i in range(min(n, 2000))])
+    big5_z = hybrid.normalize_matrix(big5).astype(np.float32)
+
+    t0 = time.perf_counter()
+    index = CandidateIndex(big5_z, mbti)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    recalls, brute_ms, ann_ms = [], [], []
+    for _ in range(trials):
+        t = rng.integers(0, n)
+        target = matcher.UserVector('t', 't', types[mbti[t]], float(mbti_conf[t]), big5[t], 0.5,
+                                    socio_types[socio[t]], float(socio_conf[t]), int(lines[t]))
+        allowed = np.ones(n, dtype=bool)
+        allowed[t] = False
+
+        t0 = time.perf_counter()
+        rows = np.flatnonzero(allowed)
+        scores = hybrid.score_columns(target, big5_z[rows], mbti[rows], socio[rows],
+                                      mbti_conf[rows], socio_conf[rows], lines[rows])
+        exact = set(rows[matcher.top_k_indices(scores['total_score'], k)].tolist())
+        brute_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        rows = index.prefilter(hybrid.normalize_matrix(target.big5_raw),
+                               matcher.RelationshipBrain.mbti_code(target.mbti_type), budget, allowed)
+        scores = hybrid.score_columns(target, big5_z[rows], mbti[rows], socio[rows],
+                                      mbti_conf[rows], socio_conf[rows], lines[rows])
+        approx = set(rows[matcher.top_k_indices(scores['total_score'], k)].tolist())
+        ann_ms.append((time.perf_counter() - t0) * 1000)
+
+        recalls.append(len(exact & approx) / float(k))
+
+    return {
+        "n": n, "budget": budget, "k": k, "trials": trials,
+        "build_ms": round(build_ms, 2),
+        "recall_mean": round(float(np.mean(recalls)), 4),
+        "recall_min": round(float(np.min(recalls)), 4),
+        "brute_ms": round(float(np.mean(brute_ms)), 3),
+        "ann_ms": round(float(np.mean(ann_ms)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EchoMind ANN 사전 필터 재현율 리포트")
+    parser.add_argument("--n", type=int, default=100000, help="합성 후보 수")
+    parser.add_argument("--budget", type=int, nargs='+', default=[300, DEFAULT_BUDGET, 1500], help="재채점 후보 수 (여러 개 지정 가능)")
+    parser.add_argument("--k", type=int, default=30, help="비교할 상위 후보 수")
+    parser.add_argument("--trials", type=int, default=20, help="반복 횟수 (무작위 타겟)")
+    args = parser.parse_args()
+
+    print(f"{'budget':>7} {'recall':>8} {'min':>6} {'brute(ms)':>10} {'ann(ms)':>8} {'build(ms)':>10}")
+    for budget in args.budget:
+        r = recall_report(args.n, budget, args.k, args.trials)
+        print(f"{r['budget']:>7} {r['recall_mean']:>8.3f} {r['recall_min']:>6.2f} "
+              f"{r['brute_ms']:>10.2f} {r['ann_ms']:>8.2f} {r['build_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+# candidate_store.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 매칭 후보 열 지향 저장소 (Columnar Candidate Store)
+======================================================================
+
+[시스템 개요]
+/matching 요청마다 PersonalityResult와 User를 조인하고 전체 JSON 리포트를 다시 읽어
+UserVector를 만드는 대신, 대표 프로필 전체를 프로세스 메모리에 열(struct-of-arrays)
+형태로 보관합니다. 매칭 요청은 배열 마스킹과 인덱싱만으로 채점하고,
+최종 상위 후보의 표시용 정보만 DB에서 읽습니다.
+
+[저장 구조] (행 i = 후보 1명)
+- big5_raw, big5_z : float32 (N, 5)  원점수 / 저장소 모집단 기준 Z-Score
+- mbti_codes, socio_codes : uint8    RelationshipBrain 테이블 인덱스 (16 = 알 수 없음)
+- mbti_conf, socio_conf : float32
+- line_counts : int32                분석 당시 대화 라인 수
+- birth_ord : int32                  생년월일 date.toordinal() (0 = 없음)
+- created_ts : float64               가입일 타임스탬프 (inf = 없음)
+- is_banned, is_dummy : bool
+
+[정합성]
+- 스냅샷(CandidateSnapshot)은 불변이며 갱신 시 새 배열을 만들어 참조만 교체합니다(copy-on-write).
+  요청은 시작 시점에 잡은 스냅샷 하나만 읽으므로 중간에 갱신이 일어나도 일관된 데이터를 봅니다.
+- version은 갱신마다 1씩 증가합니다.
+- 업로드/대표 변경/정지/삭제 시 MatchManager.notify_* 훅을 통해 해당 사용자 행만 갱신하며,
+  CANDIDATE_STORE_RESYNC_SECONDS가 지난 스냅샷은 DB에서 전체를 다시 적재합니다.
+
+[워커 간 공유] (CANDIDATE_SNAPSHOT_DIR 설정 시)
+- 스냅샷을 발행한 프로세스가 배열을 버전별 디렉터리(v0000000012-<pid>/*.npy)에 기록하고,
+  CURRENT 포인터 파일을 os.replace로 원자적으로 교체합니다.
+- 모든 워커는 CURRENT가 가리키는 파일을 np.load(mmap_mode='r')로 읽기 전용 매핑하므로
+  페이지 캐시 한 벌을 공유하며, 워커를 늘려도 메모리가 늘지 않습니다.
+- 발행은 .lock 파일(fcntl.flock)로 직렬화되고, 새로 뜬 워커는 DB 조회 없이 기존 스냅샷을 매핑합니다.
+- 디렉터리를 쓸 수 없거나 fcntl이 없는 환경에서는 프로세스 메모리 스냅샷으로 동작합니다.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import matcher
+from config import config_by_name
+from population_stats import BIG5_COLUMNS, PopulationStatsService, shrink_stats
+
+logger = logging.getLogger(__name__)
+
+env = os.getenv('FLASK_ENV', 'development')
+cfg = config_by_name[env]
+
+# 전체 재적재 주기 (초)
+CANDIDATE_STORE_RESYNC_SECONDS = 600
+# CURRENT 포인터 확인 주기 (초) 및 디스크에 남겨 둘 스냅샷 버전 수
+SNAPSHOT_CHECK_SECONDS = 2.0
+SNAPSHOT_KEEP_VERSIONS = 3
+
+SNAPSHOT_ARRAYS = (
+    'user_ids', 'big5_raw', 'big5_z', 'mbti_codes', 'socio_codes', 'mbti_conf', 'socio_conf',
+    'line_counts', 'birth_ord', 'created_ts', 'is_banned', 'is_dummy'
+)
+
+
+@dataclass(frozen=True, eq=False)
+class CandidateSnapshot:
+    """특정 시점의 후보 전체를 열 배열로 담은 불변 스냅샷."""
+
+    version: int
+    user_ids: np.ndarray
+    big5_raw: np.ndarray
+    big5_z: np.ndarray
+    mbti_codes: np.ndarray
+    socio_codes: np.ndarray
+    mbti_conf: np.ndarray
+    socio_conf: np.ndarray
+    line_counts: np.ndarray
+    birth_ord: np.ndarray
+    created_ts: np.ndarray
+    is_banned: np.ndarray
+    is_dummy: np.ndarray
+    mbti_types: Tuple[str, ...]       # 설명 패널용 원본 유형 문자열
+    socio_types: Tuple[str, ...]
+    stats_mean: np.ndarray            # big5_z 산출에 쓴 모집단 통계 (정지 계정 제외)
+    stats_std: np.ndarray
+    row_of: Dict[int, int] = field(default_factory=dict)  # user_id -> 행 번호
+    built_at: float = 0.0             # 생성 시각 (time.time, 프로세스 간 비교용)
+
+    def __len__(self):
+        return int(self.user_ids.shape[0])
+
+    def user_vector(self, row: int, birth_date=None, created_at=None) -> matcher.UserVector:
+        """행 하나를 matcher.UserVector로 복원 (상위 후보 설명 생성용)"""
+        return matcher.UserVector(
+            user_id=int(self.user_ids[row]),
+            name='Unknown',
+            mbti_type=self.mbti_types[row],
+            mbti_conf=float(self.mbti_conf[row]),
+            big5_raw=self.big5_raw[row].astype(float),
+            big5_conf=0.0,
+            socionics_type=self.socio_types[row],
+            socionics_conf=float(self.socio_conf[row]),
+            line_count=int(self.line_counts[row]),
+            birth_date=birth_date,
+            created_at=created_at
+        )
+
+
+def _columns_from_rows(rows):
+    """DB 조회 결과(튜플 목록)를 열 사전으로 변환"""
+    n = len(rows)
+    cols = {
+        'user_ids': np.zeros(n, dtype=np.int64),
+        'big5_raw': np.zeros((n, 5), dtype=np.float32),
+        'mbti_codes': np.zeros(n, dtype=np.uint8),
+        'socio_codes': np.zeros(n, dtype=np.uint8),
+        'mbti_conf': np.zeros(n, dtype=np.float32),
+        'socio_conf': np.zeros(n, dtype=np.float32),
+        'line_counts': np.zeros(n, dtype=np.int32),
+        'birth_ord': np.zeros(n, dtype=np.int32),
+        'created_ts': np.zeros(n, dtype=np.float64),
+        'is_banned': np.zeros(n, dtype=bool),
+        'is_dummy': np.zeros(n, dtype=bool),
+        'mbti_types': [],
+        'socio_types': [],
+    }
+    for i, r in enumerate(rows):
+        (user_id, o, c, e, a, ne, mbti, mbti_conf, socio, socio_conf,
+         line_count, birth_date, created_at, is_banned, is_dummy) = r
+        mbti = mbti or 'UNKNOWN'
+        socio = socio or 'Unknown'
+        cols['user_ids'][i] = user_id
+        cols['big5_raw'][i] = [50.0 if v is None else v for v in (o, c, e, a, ne)]
+        cols['mbti_codes'][i] = matcher.RelationshipBrain.mbti_code(mbti)
+        cols['socio_codes'][i] = matcher.RelationshipBrain.socionics_code(socio)
+        cols['mbti_conf'][i] = mbti_conf or 0.0
+        cols['socio_conf'][i] = socio_conf or 0.0
+        cols['line_counts'][i] = line_count or 0
+        cols['birth_ord'][i] = birth_date.toordinal() if birth_date else 0
+        cols['created_ts'][i] = matcher.sort_timestamp(created_at)
+        cols['is_banned'][i] = bool(is_banned)
+        cols['is_dummy'][i] = bool(is_dummy)
+        cols['mbti_types'].append(mbti)
+        cols['socio_types'].append(socio)
+    return cols
+
+
+def _unique_rows(rows):
+    """대표 프로필이 중복된 사용자는 첫 행만 남깁니다."""
+    seen = set()
+    unique_rows = []
+    for r in rows:
+        if r[0] in seen:
+            continue
+        seen.add(r[0])
+        unique_rows.append(r)
+    return unique_rows
+
+
+def _build_snapshot(version, cols, built_at=None, stats=None):
+    """
+    열 사전으로부터 모집단 통계와 Z-Score를 계산해 불변 스냅샷을 만듭니다.
+    stats=(평균, 표준편차)를 주면 행 집합 대신 해당 통계로 정규화합니다.
+    """
+    raw = cols['big5_raw'].astype(float)
+    if stats is not None:
+        mean, std = stats
+    else:
+        active = raw[~cols['is_banned']]
+        if active.shape[0]:
+            mean, std = shrink_stats(active.shape[0], active.mean(axis=0), active.std(axis=0))
+        else:
+            mean, std = shrink_stats(0, np.zeros(5), np.zeros(5))
+    big5_z = np.clip((raw - mean) / std, -3.0, 3.0).astype(np.float32)
+
+    arrays = {k: v for k, v in cols.items() if isinstance(v, np.ndarray)}
+    for arr in list(arrays.values()) + [big5_z]:
+        arr.setflags(write=False)
+
+    return CandidateSnapshot(
+        version=version,
+        big5_z=big5_z,
+        mbti_types=tuple(cols['mbti_types']),
+        socio_types=tuple(cols['socio_types']),
+        stats_mean=mean,
+        stats_std=std,
+        row_of={int(uid): i for i, uid in enumerate(cols['user_ids'])},
+        built_at=time.time() if built_at is None else built_at,
+        **arrays
+    )
+
+
+def snapshot_from_rows(rows, stats=None):
+    """
+    CandidateStore.scoring_query()로 조회한 행으로 임시 스냅샷(version 0)을 만듭니다.
+    저장소를 쓰지 않는 DB 경로가 같은 열 배열 채점 로직을 쓰기 위한 용도입니다.
+    """
+    return _build_snapshot(0, _columns_from_rows(_unique_rows(rows)), stats=stats)
+
+
+def _write_snapshot_files(base_dir, snap):
+    """스냅샷을 버전 디렉터리에 기록하고 CURRENT 포인터를 원자적으로 교체합니다. (디렉터리 이름 반환)"""
+    name = f"v{snap.version:010d}-{os.getpid()}"
+    tmp_dir = os.path.join(base_dir, f".tmp-{name}")
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    for key in SNAPSHOT_ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{key}.npy"), getattr(snap, key))
+    meta = {
+        'version': snap.version,
+        'built_at': snap.built_at,
+        'mbti_types': list(snap.mbti_types),
+        'socio_types': list(snap.socio_types),
+        'stats_mean': snap.stats_mean.tolist(),
+        'stats_std': snap.stats_std.tolist(),
+    }
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    os.replace(tmp_dir, os.path.join(base_dir, name))
+
+    pointer_tmp = os.path.join(base_dir, f".CURRENT.{os.getpid()}.tmp")
+    with open(pointer_tmp, 'w', encoding='utf-8') as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(base_dir, 'CURRENT'))
+    return name
+
+
+def _read_current(base_dir):
+    """CURRENT 포인터가 가리키는 스냅샷 디렉터리 이름 (없으면 None)"""
+    try:
+        with open(os.path.join(base_dir, 'CURRENT'), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _load_snapshot_files(base_dir, name):
+    """스냅샷 디렉터리를 읽기 전용 메모리 매핑으로 불러옵니다."""
+    path = os.path.join(base_dir, name)
+    with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode='r') for key in SNAPSHOT_ARRAYS}
+
+    return CandidateSnapshot(
+        version=meta['version'],
+        mbti_types=tuple(meta['mbti_types']),
+        socio_types=tuple(meta['socio_types']),
+        stats_mean=np.array(meta['stats_mean']),
+        stats_std=np.array(meta['stats_std']),
+        row_of={int(uid): i for i, uid in enumerate(arrays['user_ids'])},
+        built_at=meta['built_at'],
+        **arrays
+    )
+
+
+def _remove_old_snapshots(base_dir, keep_name):
+    """최근 SNAPSHOT_KEEP_VERSIONS개를 제외한 스냅샷 디렉터리를 정리합니다.
+    (이미 매핑한 워커는 파일이 지워져도 기존 매핑을 계속 읽을 수 있습니다)"""
+    names = sorted(n for n in os.listdir(base_dir) if n.startswith('v'))
+    for name in names[:-SNAPSHOT_KEEP_VERSIONS]:
+        if name != keep_name:
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+
+class CandidateStore:
+    """
+    프로세스 단위 후보 저장소.
+    snapshot()은 현재 스냅샷을 반환하고, refresh_user/remove_user/rebuild는 새 스냅샷으로 교체합니다.
+    모든 DB 접근 메서드는 Flask 애플리케이션 컨텍스트 안에서 호출해야 합니다.
+    """
+
+    _lock = threading.RLock()
+    _snapshot: Optional[CandidateSnapshot] = None
+    _version = 0
+    _current_name = None   # 매핑 중인 스냅샷 디렉터리 이름
+    _checked_at = 0.0      # 마지막 CURRENT 확인 시각 (time.monotonic)
+    _disk_disabled = False
+
+    @staticmethod
+    def scoring_query():
+        """채점에 필요한 타입 열만 조회하는 쿼리 (full_report_json 제외, 대표 프로필 기준)"""
+        from extensions import db, User, PersonalityResult
+
+        return db.session.query(
+            PersonalityResult.user_id,
+            *[getattr(PersonalityResult, c) for c in BIG5_COLUMNS],
+            PersonalityResult.mbti_prediction,
+            PersonalityResult.mbti_confidence,
+            PersonalityResult.socionics_prediction,
+            PersonalityResult.socionics_confidence,
+            PersonalityResult.line_count_at_analysis,
+            User.birth_date,
+            User.created_at,
+            User.is_banned,
+            User.is_dummy
+        ).join(User, PersonalityResult.user_id == User.user_id)\
+         .filter(PersonalityResult.is_representative == True)
+
+    # ------------------------------------------------------------------
+    # 디스크 스냅샷 (워커 간 공유)
+    # ------------------------------------------------------------------
+    @classmethod
+    def _snapshot_dir(cls):
+        if cls._disk_disabled or fcntl is None:
+            return None
+        return getattr(cfg, 'CANDIDATE_SNAPSHOT_DIR', None) or None
+
+    @classmethod
+    @contextmanager
+    def _publish_lock(cls):
+        """스냅샷 발행 구간 잠금 (스레드 잠금 + 디스크 사용 시 프로세스 간 파일 잠금)"""
+        with cls._lock:
+            base_dir = cls._snapshot_dir()
+            if base_dir is None:
+                yield
+                return
+            os.makedirs(base_dir, exist_ok=True)
+            with open(os.path.join(base_dir, '.lock'), 'a+') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @classmethod
+    def _sync_from_disk(cls, force=False):
+        """CURRENT가 다른 프로세스의 새 스냅샷을 가리키면 매핑을 교체합니다."""
+        base_dir = cls._snapshot_dir()
+        if base_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - cls._checked_at < SNAPSHOT_CHECK_SECONDS:
+            return
+        cls._checked_at = now
+
+        try:
+            name = _read_current(base_dir)
+            if name is None or name == cls._current_name:
+                return
+            snap = _load_snapshot_files(base_dir, name)
+        except Exception:
+            logger.exception("[CandidateStore] 공유 스냅샷 매핑 실패")
+            return
+
+        with cls._lock:
+            if cls._snapshot is None or snap.version > cls._snapshot.version:
+                cls._snapshot = snap
+                cls._current_name = name
+                cls._version = max(cls._version, snap.version)
+
+    @classmethod
+    def _publish(cls, cols, built_at=None):
+        """새 스냅샷을 만들어 교체합니다. (_publish_lock 안에서 호출)"""
+        cls._version += 1
+        # DB 경로/인박스/블라인드 매칭과 같은 모집단 통계로 정규화 (조회 실패 시 스냅샷 행 기준으로 대체)
+        snap = _build_snapshot(cls._version, cols, built_at, stats=PopulationStatsService.snapshot())
+
+        base_dir = cls._snapshot_dir()
+        if base_dir is not None:
+            try:
+                name = _write_snapshot_files(base_dir, snap)
+                snap = _load_snapshot_files(base_dir, name)
+                cls._current_name = name
+                _remove_old_snapshots(base_dir, name)
+            except OSError:
+                logger.exception("[CandidateStore] 공유 스냅샷 기록 실패 - 프로세스 메모리 모드로 전환합니다.")
+                cls._disk_disabled = True
+
+        cls._snapshot = snap
+        return snap
+
+    # ------------------------------------------------------------------
+    # 조회 / 갱신
+    # ------------------------------------------------------------------
+    @classmethod
+    def rebuild(cls):
+        """DB에서 대표 프로필 전체를 다시 읽어 스냅샷을 새로 만듭니다."""
+        unique_rows = _unique_rows(cls.scoring_query().all())
+
+        with cls._publish_lock():
+            cls._sync_from_disk(force=True)
+            snap = cls._publish(_columns_from_rows(unique_rows))
+        logger.info(f"[CandidateStore] 후보 저장소 재적재 완료 ({len(snap)}명, version={snap.version})")
+        return len(snap)
+
+    @classmethod
+    def _is_stale(cls, snap):
+        return snap is None or time.time() - snap.built_at > CANDIDATE_STORE_RESYNC_SECONDS
+
+    @classmethod
+    def snapshot(cls) -> Optional[CandidateSnapshot]:
+        """현재 스냅샷 (적재 전이거나 재동기화 주기가 지났으면 DB에서 다시 적재). 실패 시 None."""
+        cls._sync_from_disk()
+        snap = cls._snapshot
+        if cls._is_stale(snap):
+            try:
+                # 다른 워커가 먼저 재적재했을 수 있으므로 잠금 후 한 번 더 확인
+                with cls._publish_lock():
+                    cls._sync_from_disk(force=True)
+                    stale = cls._is_stale(cls._snapshot)
+                if stale:
+                    cls.rebuild()
+            except Exception:
+                logger.exception("[CandidateStore] 후보 저장소 적재 실패")
+                return snap
+            snap = cls._snapshot
+        return snap
+
+    @classmethod
+    def _replace_row(cls, user_id, row):
+        """user_id 행을 row로 교체/추가하거나 row가 None이면 제거한 새 스냅샷을 발행합니다."""
+        with cls._publish_lock():
+            cls._sync_from_disk(force=True)
+            snap = cls._snapshot
+            if snap is None:
+                return  # 아직 적재 전이면 첫 snapshot()에서 전체를 읽음
+
+            cols = {k: getattr(snap, k) for k in SNAPSHOT_ARRAYS if k != 'big5_z'}
+            cols['mbti_types'] = list(snap.mbti_types)
+            cols['socio_types'] = list(snap.socio_types)
+
+            idx = snap.row_of.get(int(user_id))
+            if idx is not None:
+                cols = {k: (np.delete(v, idx, axis=0) if isinstance(v, np.ndarray) else v[:idx] + v[idx + 1:])
+                        for k, v in cols.items()}
+            if row is not None:
+                new = _columns_from_rows([row])
+                cols = {k: (np.concatenate([v, new[k]]) if isinstance(v, np.ndarray) else v + new[k])
+                        for k, v in cols.items()}
+            elif idx is None:
+                return  # 제거할 행도 추가할 행도 없음
+
+            # 부분 갱신은 전체 재적재 시각(built_at)을 이어받습니다.
+            cls._publish(cols, built_at=snap.built_at)
+
+    @classmethod
+    def refresh_user(cls, user_id):
+        """사용자의 대표 프로필/계정 상태 변경을 저장소에 반영합니다."""
+        if user_id is None:
+            return
+        try:
+            from extensions import PersonalityResult
+            row = cls.scoring_query().filter(PersonalityResult.user_id == user_id).first()
+            cls._replace_row(user_id, row)
+        except Exception:
+            logger.exception(f"[CandidateStore] 사용자 행 갱신 실패 (user_id={user_id})")
+
+    @classmethod
+    def remove_user(cls, user_id):
+        """삭제된 사용자를 저장소에서 제거합니다."""
+        try:
+            cls._replace_row(user_id, None)
+        except Exception:
+            logger.exception(f"[CandidateStore] 사용자 행 제거 실패 (user_id={user_id})")
+
+    @classmethod
+    def resync_job(cls, app):
+        """[스케줄러] 주기적으로 후보 저장소를 DB와 재동기화합니다."""
+        with app.app_context():
+            try:
+                cls.rebuild()
+            except Exception:
+                logger.exception("[CandidateStore] 주기적 재동기화 실패")
@@ -63,6 +63,55 @@ class Config:
     ALLOWED_EXTENSIONS = {'txt', 'json'}
     JSON_AS_ASCII = False
 
+    # 매칭 후보 메모리 저장소 (candidate_store.py) 사용 여부
+    CANDIDATE_STORE_ENABLED = os.environ.get('CANDIDATE_STORE_ENABLED', 'true').lower() == 'true'
+    # 워커 간 공유 스냅샷(.npy 메모리 매핑) 디렉터리 (빈 값이면 워커별 메모리 스냅샷 사용)
+    CANDIDATE_SNAPSHOT_DIR = os.environ.get('CANDIDATE_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'data', 'candidate_snapshot'))
+    # 대규모 후보군 ANN 사전 필터 (candidate_index.py): 후보가 MIN_POOL명 이상일 때만 사용
+    # BUDGET이 클수록 재현율이 높고 느려집니다. (python candidate_index.py 로 재현율 확인)
+    CANDIDATE_INDEX_ENABLED = os.environ.get('CANDIDATE_INDEX_ENABLED', 'true').lower() == 'true'
+    CANDIDATE_INDEX_BUDGET = int(os.environ.get('CANDIDATE_INDEX_BUDGET', 800))
+    CANDIDATE_INDEX_MIN_POOL = int(os.environ.get('CANDIDATE_INDEX_MIN_POOL', 20000))
+    # 사용자별 추천 목록 사전 계산 (recommendation_cache.py, user_recommendations 테이블)
+    RECOMMENDATION_CACHE_ENABLED = os.environ.get('RECOMMENDATION_CACHE_ENABLED', 'true').lower() == 'true'
+    # 헤더 알림 뱃지 카운트 캐시 유지 시간 (badge_cache.py, 0이면 캐시 사용 안 함)
+    BADGE_CACHE_TTL_SECONDS = float(os.environ.get('BADGE_CACHE_TTL_SECONDS', 5))
+    # /api/inbox/updates 롱폴링 최대 대기 시간 (초). 기본 0: 대기 없이 즉시 ETag/304 응답 (클라이언트는 5초 간격 폴링)
+    # 대기 중에는 워커를 점유하므로 스레드/비동기 워커(gunicorn --threads, gevent, eventlet)로 배포할 때만 켜세요.
+    # (기본 배포인 gunicorn 단일 sync 워커에서 켜면 대기 요청 하나가 전체 서버를 막습니다)
+    INBOX_LONG_POLL_SECONDS = int(os.environ.get('INBOX_LONG_POLL_SECONDS', 0))
+
+    # 채팅 로그 분석 작업 대기열 (analysis_pipeline.py)
+    # embedded: 웹 프로세스 내부 워커 스레드 / external: python analysis_worker.py 별도 실행 / inline: 요청 안에서 동기 처리
+    ANALYSIS_WORKER_MODE = os.environ.get('ANALYSIS_WORKER_MODE', 'embedded').lower()
+    # 프로세스당 동시 분석 수 (LLM 동시 호출 수 상한)
+    ANALYSIS_WORKER_CONCURRENCY = int(os.environ.get('ANALYSIS_WORKER_CONCURRENCY', 2))
+    # 새 작업 확인 주기 (초, 같은 프로세스에서 등록된 작업은 즉시 처리)
+    ANALYSIS_POLL_INTERVAL_SECONDS = float(os.environ.get('ANALYSIS_POLL_INTERVAL_SECONDS', 2))
+    # 처리 중인 워커가 작업의 heartbeat_at을 갱신하는 주기 (초)
+    ANALYSIS_HEARTBEAT_SECONDS = float(os.environ.get('ANALYSIS_HEARTBEAT_SECONDS', 30))
+    # RUNNING 작업의 하트비트가 이 시간 동안 없으면 워커 중단으로 보고 재등록 (최대 ANALYSIS_MAX_ATTEMPTS회 시도)
+    # 총 처리 시간과는 무관하므로 오래 걸리는 분석(map-reduce, 느린 LLM 응답)은 재등록되지 않음
+    ANALYSIS_JOB_TIMEOUT_SECONDS = int(os.environ.get('ANALYSIS_JOB_TIMEOUT_SECONDS', 180))
+    ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', 2))
+    # 대상자 이름이 없거나 파일에 없을 때 화자 선택을 기다리는 최대 시간 (지나면 실패 처리, 업로드 파일 삭제)
+    ANALYSIS_SPEAKER_WAIT_HOURS = float(os.environ.get('ANALYSIS_SPEAKER_WAIT_HOURS', 24))
+    # 파싱 결과 / LLM 프로파일 내용 주소 캐시 (analysis_cache.py, 워커 간 공유 SQLite 파일)
+    ANALYSIS_CACHE_ENABLED = os.environ.get('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+    ANALYSIS_CACHE_PATH = os.environ.get('ANALYSIS_CACHE_PATH', os.path.join(BASE_DIR, 'data', 'analysis_cache.sqlite3'))
+    ANALYSIS_CACHE_MAX_MB = float(os.environ.get('ANALYSIS_CACHE_MAX_MB', 256))
+    # 대용량 대화 맵리듀스 분석: 대상자 메시지가 이 수 이상이면 시간순 구간 요약 후 최종 프로파일 (0이면 사용 안 함)
+    ANALYSIS_MAP_REDUCE_MIN_MESSAGES = int(os.environ.get('ANALYSIS_MAP_REDUCE_MIN_MESSAGES', 0))
+    # 작업 하나당 동시 구간 요약 LLM 호출 수
+    ANALYSIS_MAP_REDUCE_CONCURRENCY = int(os.environ.get('ANALYSIS_MAP_REDUCE_CONCURRENCY', 4))
+
+    # 실시간 채팅 푸시 (realtime.py, Flask-SocketIO 설치 시에만 동작 / 미설치 시 폴링)
+    REALTIME_ENABLED = os.environ.get('REALTIME_ENABLED', 'true').lower() == 'true'
+    # 여러 워커 간 이벤트 전파용 브로커 (예: redis://localhost:6379/0). 비우면 프로세스 내부 큐
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+    # eventlet / gevent / threading (비우면 설치된 라이브러리로 자동 선택)
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', '')
+
     # 세션 및 쿠키 설정
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
@@ -10,6 +10,7 @@ SQLAlchemy 인스턴스 및 모든 ORM 모델을 정의합니다.
 
 from datetime import datetime
 import random
+import secrets
 from flask_sqlalchemy import SQLAlchemy
 from enum import Enum
 
@@ -38,6 +39,14 @@ class BlindQueueStatus(Enum):
     CANCELLED = "CANCELLED"    # 사용자가 취소
     EXPIRED = "EXPIRED"      # 타임아웃
 
+class AnalysisJobStatus(Enum):
+    """채팅 로그 분석 작업 상태 (analysis_pipeline.py)"""
+    QUEUED = "QUEUED"        # 대기열에서 워커를 기다리는 중
+    RUNNING = "RUNNING"      # 워커가 선점하여 분석 중
+    COMPLETED = "COMPLETED"  # 분석 완료 (result_id 기록)
+    FAILED = "FAILED"        # 분석 실패 (error_message 기록)
+    AWAITING_SPEAKER = "AWAITING_SPEAKER"  # 대상자 이름이 없거나 맞지 않아 화자 선택 대기 (speaker_roster 기록)
+
 
 # --- 데이터베이스 모델 (Database Models) ---
 class User(db.Model):
@@ -52,6 +61,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_banned = db.Column(db.Boolean, default=False) # 계정 정지 여부
     is_dummy = db.Column(db.Boolean, default=False)  # 더미 사용자 여부 (시뮬레이션용)
+    # 인박스 변경 버전: 새 메시지/알림/매칭 상태 변경 시 증가 (inbox_version.py, /api/inbox/updates ETag)
+    inbox_version = db.Column(db.Integer, default=0, nullable=False)
 
 class ChatLog(db.Model):
     __tablename__ = 'chat_logs'
@@ -60,9 +71,36 @@ class ChatLog(db.Model):
     file_name = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(255), nullable=False)
     target_name = db.Column(db.String(100), nullable=False) # 분석 대상자 이름
+    file_hash = db.Column(db.String(64), nullable=True)  # 업로드 파일 SHA-256 (analysis_cache.py 캐시 키)
     process_status = db.Column(db.Enum('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='process_status_enum'), default='PENDING')
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
 
+def generate_job_code():
+    """분석 작업 상태 조회용 추측 불가능한 코드 생성 (비회원은 이 코드로만 결과에 접근)"""
+    return secrets.token_urlsafe(16)
+
+class AnalysisJob(db.Model):
+    """채팅 로그 분석 작업 대기열 (analysis_pipeline.py 참고)"""
+    __tablename__ = 'analysis_jobs'
+    job_id = db.Column(db.Integer, primary_key=True)
+    job_code = db.Column(db.String(32), unique=True, nullable=False, default=generate_job_code)
+    log_id = db.Column(db.Integer, db.ForeignKey('chat_logs.log_id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=True)
+    status = db.Column(db.Enum(AnalysisJobStatus), nullable=False, default=AnalysisJobStatus.QUEUED)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    worker_id = db.Column(db.String(100), nullable=True)  # 선점한 워커 (host:pid:thread)
+    error_message = db.Column(db.String(500), nullable=True)
+    speaker_roster = db.Column(db.JSON, nullable=True)  # [{"name", "message_count"}] (파일 내 화자 목록)
+    result_id = db.Column(db.Integer, db.ForeignKey('personality_results.result_id', ondelete='SET NULL'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # 처리 중인 워커가 주기적으로 갱신 (중단 감지)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_analysis_jobs_status_created', 'status', 'created_at'),
+    )
+
 class PersonalityResult(db.Model):
     __tablename__ = 'personality_results'
     result_id = db.Column(db.Integer, primary_key=True)
@@ -92,6 +130,10 @@ class PersonalityResult(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_personality_results_user_rep', 'user_id', 'is_representative'),
+    )
+
 def generate_match_code():
     # 1:1 매칭 채팅방 10자리 난수 코드 생성
     return str(random.randint(1000000000, 9999999999))
@@ -106,6 +148,34 @@ class MatchRequest(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # 대화 요약 (역정규화): 메시지 전송/읽음 시 같은 트랜잭션에서 갱신 (MatchManager.record_message/record_read)
+    sender_unread_count = db.Column(db.Integer, default=0, nullable=False)    # sender가 안 읽은 메시지 수
+    receiver_unread_count = db.Column(db.Integer, default=0, nullable=False)  # receiver가 안 읽은 메시지 수
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_preview = db.Column(db.String(200), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_match_requests_sender_status', 'sender_id', 'status'),
+        db.Index('ix_match_requests_receiver_status', 'receiver_id', 'status'),
+    )
+
+class UserRecommendation(db.Model):
+    """사용자별 사전 계산된 매칭 추천 목록 (recommendation_cache.py 참고)"""
+    __tablename__ = 'user_recommendations'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    rank_order = db.Column(db.Integer, nullable=False)  # 0부터 시작하는 추천 순위
+    match_score = db.Column(db.Integer, default=0)
+    is_stale = db.Column(db.Boolean, default=False)  # 프로필 변경/매칭 종료 등으로 재계산 필요
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_user_recommendations_user_rank', 'user_id', 'rank_order'),
+        db.Index('ix_user_recommendations_candidate', 'candidate_id'),
+    )
+
 class Notification(db.Model):
     __tablename__ = 'notifications'
     notification_id = db.Column(db.Integer, primary_key=True)
@@ -116,6 +186,10 @@ class Notification(db.Model):
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_notifications_user_read', 'user_id', 'is_read'),
+    )
+
 class Message(db.Model):
     __tablename__ = 'messages'
     id = db.Column(db.Integer, primary_key=True)
@@ -125,6 +199,11 @@ class Message(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_messages_request_created', 'request_id', 'created_at'),
+        db.Index('ix_messages_request_sender_read', 'request_id', 'sender_id', 'is_read'),
+    )
+
 def generate_room_code():
     # 10자리 난수 생성 (예: 4928103945)
     return str(random.randint(1000000000, 9999999999))
@@ -161,6 +240,10 @@ class GroupChatMessage(db.Model):
     is_system = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_group_chat_messages_room_id', 'room_id', 'id'),
+    )
+
 class GroupChatKickVote(db.Model):
     __tablename__ = 'group_chat_kick_votes'
     id = db.Column(db.Integer, primary_key=True)
@@ -199,6 +282,13 @@ class BlindMatch(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     activated_at = db.Column(db.DateTime, nullable=True) # ACTIVE 상태가 된 시간
 
+    # 대화 요약 (역정규화): 메시지 전송/읽음 시 같은 트랜잭션에서 갱신 (BlindMatchManager.record_message/record_read)
+    user1_unread_count = db.Column(db.Integer, default=0, nullable=False)
+    user2_unread_count = db.Column(db.Integer, default=0, nullable=False)
+    last_message_id = db.Column(db.Integer, nullable=True)
+    last_message_preview = db.Column(db.String(200), nullable=True)
+    last_message_at = db.Column(db.DateTime, nullable=True)
+
     # Foreign key relationships
     user1 = db.relationship('User', foreign_keys=[user1_id])
     user2 = db.relationship('User', foreign_keys=[user2_id])
@@ -223,6 +313,10 @@ class BlindMatchMessage(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_read = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_blind_match_messages_match_created', 'match_id', 'created_at'),
+    )
+
 class UserActivityLog(db.Model):
     __tablename__ = 'user_activity_logs'
     id = db.Column(db.Integer, primary_key=True)
@@ -235,6 +329,10 @@ class UserActivityLog(db.Model):
 
     user = db.relationship('User', backref=db.backref('activity_logs', lazy=True))
 
+    __table_args__ = (
+        db.Index('ix_user_activity_logs_user_timestamp', 'user_id', 'timestamp'),
+    )
+
     def __repr__(self):
         return f'<UserActivityLog {self.user_id} - {self.activity_type}>'
 
@@ -167,6 +167,56 @@ def check_flask_app():
         print_traceback(e)
         return False
 
+# 자주 실행되는 조회와 반드시 사용해야 하는 인덱스 (extensions.py __table_args__ 참고)
+HOT_QUERY_PLANS = [
+    ('ix_messages_request_created',
+     "SELECT * FROM messages WHERE request_id = 1 ORDER BY created_at DESC LIMIT 1"),
+    ('ix_messages_request_sender_read',
+     "SELECT COUNT(*) FROM messages WHERE request_id = 1 AND sender_id = 2 AND is_read = 0"),
+    ('ix_notifications_user_read',
+     "SELECT * FROM notifications WHERE user_id = 1 AND is_read = 0 ORDER BY created_at DESC"),
+    ('ix_match_requests_sender_status',
+     "SELECT * FROM match_requests WHERE sender_id = 1 AND status = 'PENDING'"),
+    ('ix_match_requests_receiver_status',
+     "SELECT * FROM match_requests WHERE receiver_id = 1 AND status = 'PENDING'"),
+    ('ix_personality_results_user_rep',
+     "SELECT * FROM personality_results WHERE user_id = 1 AND is_representative = 1"),
+    ('ix_group_chat_messages_room_id',
+     "SELECT * FROM group_chat_messages WHERE room_id = 1 AND id > 0 ORDER BY id"),
+    ('ix_blind_match_messages_match_created',
+     "SELECT * FROM blind_match_messages WHERE match_id = 1 ORDER BY created_at"),
+    ('ix_user_activity_logs_user_timestamp',
+     "SELECT * FROM user_activity_logs WHERE user_id = 1 AND timestamp >= '2026-01-01' "
+     "ORDER BY timestamp DESC LIMIT 20"),
+]
+
+def check_query_plans():
+    """모델 정의로 만든 SQLite 메모리 DB에서 핫 쿼리의 실행 계획이 지정 인덱스를 타는지 검증"""
+    try:
+        import sqlalchemy
+        from sqlalchemy import text
+        from extensions import db
+
+        engine = sqlalchemy.create_engine('sqlite://')
+        db.metadata.create_all(engine)
+
+        failed = []
+        with engine.connect() as conn:
+            for index_name, sql in HOT_QUERY_PLANS:
+                plan = ' '.join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+                if index_name not in plan:
+                    failed.append(f"{index_name} ({plan})")
+
+        if failed:
+            print_result("Query Plan Check", False, f"- Hot queries not using expected index: {'; '.join(failed)}")
+            return False
+        print_result("Query Plan Check", True, f"- {len(HOT_QUERY_PLANS)} hot queries use their composite indexes")
+        return True
+    except Exception as e:
+        print_result("Query Plan Check", False, "- Query plan check crashed")
+        print_traceback(e)
+        return False
+
 def check_system():
     if not os.path.exists('uploads'):
         try:
@@ -241,6 +291,7 @@ if __name__ == "__main__":
     passed = True
     passed &= check_syntax()
     passed &= check_dependencies()
+    passed &= check_query_plans()
     passed &= check_env()
     
     if passed:
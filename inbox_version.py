@@ -0,0 +1,100 @@
+# inbox_version.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 사용자별 인박스 변경 버전 (조건부 요청 / 롱폴링)
+======================================================================
+
+[시스템 개요]
+/api/inbox/updates 응답(성사된 매칭의 안 읽은 수/마지막 메시지, 받은/보낸 신청 상태,
+새 알림 여부)이 바뀌는 쓰기 작업마다 users.inbox_version을 1 증가시킵니다.
+클라이언트는 마지막으로 받은 버전을 ETag(If-None-Match) 또는 since_version으로 보내고,
+버전이 같으면 서버는 본문을 만들지 않고 304를 응답하거나(조건부 요청),
+최대 INBOX_LONG_POLL_SECONDS 동안 변경을 기다립니다(롱폴링, 기본값 0이면 사용 안 함).
+버전은 load_user가 이미 조회한 User 행에 들어 있으므로, 변경 없는 폴링은 추가 쿼리가 없습니다.
+
+[갱신 규칙]
+- bump(): 쓰기 작업과 같은 트랜잭션에서 버전 증가 (커밋 전에 호출)
+- notify(): 커밋 후 호출. 같은 프로세스의 롱폴링 대기를 즉시 깨우고 실시간 푸시(inbox:<user_id>)를 보냅니다.
+  다른 워커에서 대기 중인 요청은 CHECK_INTERVAL_SECONDS마다 DB 버전을 확인해 깨어납니다.
+
+[사용법]
+  InboxVersion.bump(sender_id, receiver_id)
+  db.session.commit()
+  InboxVersion.notify(sender_id, receiver_id)
+"""
+
+import logging
+import threading
+import time
+
+import realtime
+
+logger = logging.getLogger(__name__)
+
+# 롱폴링 대기 중 DB 버전을 다시 확인하는 주기 (다른 워커에서 발생한 변경 감지용, 초)
+CHECK_INTERVAL_SECONDS = 3.0
+
+
+class InboxVersion:
+    """users.inbox_version 증가/대기 헬퍼"""
+
+    _cond = threading.Condition()
+    _signals = {}  # user_id -> 이 프로세스에서 notify된 횟수
+
+    @classmethod
+    def bump(cls, *user_ids):
+        """사용자들의 인박스 버전을 증가시킵니다. (호출 측 트랜잭션에서 실행, 커밋은 호출 측)"""
+        from extensions import User
+
+        user_ids = {int(uid) for uid in user_ids if uid is not None}
+        if not user_ids:
+            return
+        User.query.filter(User.user_id.in_(user_ids))\
+            .update({User.inbox_version: User.inbox_version + 1}, synchronize_session=False)
+
+    @classmethod
+    def notify(cls, *user_ids):
+        """커밋 후 호출: 대기 중인 롱폴링 요청을 깨우고 실시간 푸시를 보냅니다."""
+        user_ids = {int(uid) for uid in user_ids if uid is not None}
+        if not user_ids:
+            return
+        with cls._cond:
+            for uid in user_ids:
+                cls._signals[uid] = cls._signals.get(uid, 0) + 1
+            cls._cond.notify_all()
+        for uid in user_ids:
+            realtime.publish(f"inbox:{uid}")
+
+    @classmethod
+    def current(cls, user_id):
+        """DB의 현재 버전을 조회합니다."""
+        from extensions import db, User
+
+        return db.session.query(User.inbox_version).filter(User.user_id == user_id).scalar() or 0
+
+    @classmethod
+    def wait_for_change(cls, user_id, since_version, timeout):
+        """
+        버전이 since_version과 달라질 때까지 최대 timeout초 대기합니다.
+        변경되면 새 버전을, 시간이 다 되면 None을 반환합니다.
+        대기 중에는 DB 연결을 반납합니다. (세션 트랜잭션 종료)
+        """
+        from extensions import db
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with cls._cond:
+                seen = cls._signals.get(user_id, 0)
+            db.session.rollback()  # 스냅샷 해제 + 연결 반납 (REPEATABLE READ에서도 최신 버전을 보도록)
+            version = cls.current(user_id)
+            db.session.rollback()
+            if version != since_version:
+                return version
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with cls._cond:
+                cls._cond.wait_for(lambda: cls._signals.get(user_id, 0) != seen,
+                                   timeout=min(remaining, CHECK_INTERVAL_SECONDS))
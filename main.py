@@ -25,37 +25,80 @@ Env (.env):
 
 Usage:
   python main.py --file sample_chat.txt --name "홍길동" --user_id "u_123" --out profile.json
+
+Batch (parse in a process pool, async LLM calls under --jobs / --rpm, resumable JSONL output):
+  python main.py --batch-dir exports/ --name "홍길동" --jobs 16 --rpm 120 --out profiles.jsonl
+  python main.py --manifest exports.jsonl --batch-dir exports/ --out profiles.jsonl
+  (manifest에 같은 파일의 여러 화자를 적으면 파일은 한 번만 파싱합니다)
+
+Speaker roster:
+  python main.py --file sample_chat.txt --list-speakers
 """
 
 import argparse
+import asyncio
 import json
 import os
 import re
-from dataclasses import dataclass, asdict
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, asdict, field
 from datetime import datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from openai import OpenAI
 
 
+# ----------------------------
+# Cache versions (analysis_cache.py)
+# ----------------------------
+# parse_target_rows / 정제 규칙을 바꾸면 PARSER_VERSION을,
+# call_llm_profile 프롬프트나 계약을 바꾸면 PROFILE_PROMPT_VERSION을 올리십시오.
+PARSER_VERSION = "1"
+PROFILE_PROMPT_VERSION = "1"
+
+
 # ----------------------------
 # Kakao parsing patterns
 # ----------------------------
-LINE_PATTERNS = [
-    re.compile(r"^\[(?P<name>.+?)\]\s+\[(?P<time>.+?)\]\s+(?P<msg>.+)$"),
-    re.compile(r"^(?P<time>\d{4}\.\s*\d{1,2}\.\s*\d{1,2}\.\s*.+?),\s*(?P<name>[^:]+?)\s*:\s*(?P<msg>.*)$"),
-    re.compile(r"^(?P<time>\d{4}년\s*\d{1,2}월\s*\d{1,2}일\s*(?:오전|오후)\s*\d{1,2}:\d{1,2}),\s*(?P<name>[^:]+?)\s*:\s*(?P<msg>.*)$"),
-]
+# 내보내기 형식별 메시지 시작 줄 패턴
+# - pc:        "[이름] [오후 3:12] 메시지"              ('['로 시작)
+# - mobile_en: "2024. 1. 5. 오후 3:12, 이름 : 메시지"    (숫자로 시작, 4자리 연도 뒤 '.')
+# - mobile_ko: "2024년 1월 5일 오후 3:12, 이름 : 메시지"  (숫자로 시작, 4자리 연도 뒤 '년')
+# 첫 글자/연도 뒤 글자가 서로 달라 한 줄에 두 패턴이 동시에 맞는 경우는 없습니다.
+EXPORT_FORMATS = {
+    "pc": re.compile(r"^\[(?P<name>.+?)\]\s+\[(?P<time>.+?)\]\s+(?P<msg>.+)$"),
+    "mobile_en": re.compile(r"^(?P<time>\d{4}\.\s*\d{1,2}\.\s*\d{1,2}\.\s*.+?),\s*(?P<name>[^:]+?)\s*:\s*(?P<msg>.*)$"),
+    "mobile_ko": re.compile(r"^(?P<time>\d{4}년\s*\d{1,2}월\s*\d{1,2}일\s*(?:오전|오후)\s*\d{1,2}:\d{1,2}),\s*(?P<name>[^:]+?)\s*:\s*(?P<msg>.*)$"),
+}
+LINE_PATTERNS = list(EXPORT_FORMATS.values())
+# 숫자로 시작하는 형식 (날짜 구분선도 숫자로 시작)
+_DIGIT_FORMATS = ("mobile_en", "mobile_ko")
+# 형식 판별에 사용할 앞부분 줄 수
+SNIFF_LINES = 300
+# 파일을 줄 묶음으로 읽는 단위 (문자 수 기준, readlines hint)
+# 묶음이 크면 한 번에 살아 있는 메시지 객체가 많아져 순환 GC 비용이 커지므로 수백 줄 단위로 유지
+READ_BATCH_CHARS = 16 * 1024
+
+# 카카오톡 날짜 구분선 (예: "2025년 12월 2일 화요일")과 상단 메타 정보
+RE_DATE_DIVIDER = re.compile(r"^\d{4}년\s*\d{1,2}월\s*\d{1,2}일")
+META_PREFIX = "저장한 날짜 :"
+META_SUBSTR = "카카오톡 대화"
 
 SYSTEM_SKIP_SUBSTR = [
     "사진", "이모티콘", "동영상", "삭제된 메시지입니다", "파일", "보이스톡", "통화",
     "송금", "입금", "출금",
 ]
 
+# SYSTEM_SKIP_SUBSTR 중 하나라도 포함하는지 (부분 문자열 10여 개를 차례로 찾는 대신 한 번에 검사)
+RE_SYSTEM_SKIP = re.compile("|".join(map(re.escape, SYSTEM_SKIP_SUBSTR)))
+
 RE_URL = re.compile(r"https?://\S+")
 RE_LAUGH = re.compile(r"[ㅋㅎ]{2,}")
 RE_CRY = re.compile(r"[ㅠㅜ]{2,}")
+# 두 문자 집합이 겹치지 않으므로 RE_LAUGH -> RE_CRY 순차 치환과 같은 결과
+RE_LAUGH_CRY = re.compile(r"[ㅋㅎ]{2,}|[ㅠㅜ]{2,}")
 RE_SPACES = re.compile(r"\s+")
 
 RE_PHONE = re.compile(r"(01[016789])[-.\s]?\d{3,4}[-.\s]?\d{4}")
@@ -86,13 +129,13 @@ def looks_like_system_message(text: str) -> bool:
     t = text.strip()
     if not t:
         return True
-    return any(s in t for s in SYSTEM_SKIP_SUBSTR)
+    return RE_SYSTEM_SKIP.search(t) is not None
 
 
 def clean_text_ko(text: str) -> str:
-    text = RE_URL.sub(" ", text)
-    text = RE_LAUGH.sub(" ", text)
-    text = RE_CRY.sub(" ", text)
+    if "http" in text:
+        text = RE_URL.sub(" ", text)
+    text = RE_LAUGH_CRY.sub(" ", text)
     text = RE_SPACES.sub(" ", text).strip()
     return text
 
@@ -100,118 +143,286 @@ def clean_text_ko(text: str) -> str:
 def mask_pii(text: str) -> Tuple[str, int]:
     hits = 0
 
-    new = RE_PHONE.sub("[전화번호]", text)
-    if new != text:
+    text, n = RE_PHONE.subn("[전화번호]", text)
+    if n:
         hits += 1
-    text = new
 
-    new = RE_EMAIL.sub("[이메일]", text)
-    if new != text:
-        hits += 1
-    text = new
+    if "@" in text:
+        text, n = RE_EMAIL.subn("[이메일]", text)
+        if n:
+            hits += 1
 
-    new = RE_KR_ID.sub("[주민번호]", text)
-    if new != text:
+    text, n = RE_KR_ID.subn("[주민번호]", text)
+    if n:
         hits += 1
-    text = new
 
     return text, hits
 
 
 # ----------------------------
-# Parse TXT and filter only target user
+# Parse TXT (single pass, per-speaker buffers)
 # ----------------------------
-def parse_target_rows(filepath: str, target_name: str) -> Tuple[List[Dict[str, str]], ParseQuality]:
-    total_lines = parsed = failed = filtered_system = empty_text = pii_hits_total = 0
-    rows: List[Dict[str, str]] = []
-
+def normalize_speaker(name: str) -> str:
     # [NEW] Case-insensitive comparison target
-    norm_target = target_name.strip().lower()
-
-    current_speaker = None
-    current_msg = []
-
-    def flush_msg():
-        nonlocal parsed, filtered_system, empty_text, pii_hits_total
-        # [NEW] Check speaker name case-insensitively
-        if current_speaker and current_speaker.strip().lower() == norm_target and current_msg:
-            full_text = "\n".join(current_msg).strip()
-            if not full_text:
-                empty_text += 1
-                return
-            if looks_like_system_message(full_text):
-                filtered_system += 1
-                return
-            
-            cleaned = clean_text_ko(full_text)
-            if not cleaned:
-                empty_text += 1
-                return
-                
-            masked, hits = mask_pii(cleaned)
-            pii_hits_total += hits
+    return (name or "").strip().lower()
 
-            rows.append({"text": masked})
-            parsed += 1
 
-    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            total_lines += 1
+@dataclass
+class _LineStats:
+    total_lines: int = 0
+    parse_failed_lines: int = 0
+
+
+@dataclass
+class _SpeakerBuffer:
+    rows: List[Dict[str, str]] = field(default_factory=list)
+    filtered_system: int = 0
+    empty_text: int = 0
+    pii_hits: int = 0
+
+    def add(self, msg_lines: List[str]):
+        full_text = "\n".join(msg_lines).strip()
+        if not full_text:
+            self.empty_text += 1
+            return
+        if looks_like_system_message(full_text):
+            self.filtered_system += 1
+            return
+
+        cleaned = clean_text_ko(full_text)
+        if not cleaned:
+            self.empty_text += 1
+            return
+
+        masked, hits = mask_pii(cleaned)
+        self.pii_hits += hits
+        self.rows.append({"text": masked})
+
+    def quality(self, stats: _LineStats) -> ParseQuality:
+        return ParseQuality(
+            total_lines=stats.total_lines,
+            parsed_lines=len(self.rows),
+            parse_failed_lines=stats.parse_failed_lines,
+            filtered_system_lines=self.filtered_system,
+            empty_text_lines=self.empty_text,
+            pii_masked_hits=self.pii_hits,
+        )
+
+
+def sniff_export_format(lines: List[str]) -> Optional[str]:
+    """앞부분 줄에서 가장 많이 맞는 내보내기 형식 이름을 반환합니다. (판별 불가 시 None)"""
+    counts = dict.fromkeys(EXPORT_FORMATS, 0)
+    for line in lines:
+        for name, pat in EXPORT_FORMATS.items():
+            if pat.match(line):
+                counts[name] += 1
+                break
+    best = max(counts, key=counts.get)
+    return best if counts[best] else None
+
+
+def _digit_patterns(fmt: Optional[str]) -> List[re.Pattern]:
+    """숫자로 시작하는 줄에 시도할 패턴 (판별된 형식을 먼저, 나머지는 형식이 섞인 파일 대비)"""
+    names = sorted(_DIGIT_FORMATS, key=lambda n: n != fmt)
+    return [EXPORT_FORMATS[n] for n in names]
+
+
+class MessageSplitter:
+    """
+    줄 묶음을 받아 완성된 (화자, 메시지 줄 목록)을 순서대로 돌려주는 푸시 방식 분리기입니다. (줄 통계는 stats에 누적)
+    파일 읽기와 업로드 스트림(upload_stream.py)이 같은 규칙으로 파싱하도록 공용으로 사용합니다.
+    앞 SNIFF_LINES줄로 형식을 판별하고, 각 줄은 첫 글자('[' / 숫자)로 맞을 수 있는 패턴만 시도합니다.
+    """
+
+    def __init__(self, stats: _LineStats):
+        self.stats = stats
+        self.fmt: Optional[str] = None
+        self._head: Optional[List[str]] = []  # 형식 판별 전까지 모아 두는 줄 (판별 후 None)
+        self._speaker: Optional[str] = None
+        self._msg: List[str] = []
+        self._names: Dict[str, str] = {}  # 원본 이름 -> 공백 제거 이름 (화자 수만큼만 strip)
+        self._digit_matches = []
+
+    def feed(self, lines: List[str]) -> List[Tuple[str, List[str]]]:
+        """줄 목록(끝의 '\\n'은 있어도 되고 없어도 됨)을 처리하고 이번에 완성된 메시지를 반환합니다."""
+        if self._head is not None:
+            self._head.extend(lines)
+            if len(self._head) < SNIFF_LINES:
+                return []
+            lines = self._sniff()
+        return self._split(lines)
+
+    def close(self) -> List[Tuple[str, List[str]]]:
+        """남은 줄과 마지막 메시지를 반환합니다."""
+        out = self._split(self._sniff()) if self._head is not None else []
+        # Catch the very last message in the file
+        if self._speaker is not None:
+            out.append((self._speaker, self._msg))
+            self._speaker, self._msg = None, []
+        return out
+
+    def _sniff(self) -> List[str]:
+        head, self._head = self._head, None
+        self.fmt = sniff_export_format(line.rstrip("\n") for line in head[:SNIFF_LINES])
+        self._digit_matches = [pat.match for pat in _digit_patterns(self.fmt)]
+        return head
+
+    def _split(self, lines: List[str]) -> List[Tuple[str, List[str]]]:
+        out = []
+        current_speaker, current_msg = self._speaker, self._msg
+        speaker_names = self._names
+        bracket_match = EXPORT_FORMATS["pc"].match
+        digit_matches = self._digit_matches
+        divider_match = RE_DATE_DIVIDER.match
+        failed = 0
+
+        for raw in lines:
             line = raw.rstrip("\n")
-            
+
             # Allow empty lines within multiline message, otherwise mark failed
             if not line.strip():
                 if current_speaker is not None:
-                    current_msg.append("") 
+                    current_msg.append("")
                 else:
                     failed += 1
                 continue
 
-            # Check if this line starts a new message
+            # Check if this line starts a new message (first-character dispatch before any regex)
+            first = line[0]
             m = None
-            for pat in LINE_PATTERNS:
-                m = pat.match(line)
-                if m:
-                    break
+            if first == "[":
+                m = bracket_match(line)
+            elif first.isdigit():
+                for match in digit_matches:
+                    m = match(line)
+                    if m:
+                        break
 
             if m:
-                # Append the previous accumulated message
-                flush_msg()
-                
+                # Emit the previous accumulated message
+                if current_speaker is not None:
+                    out.append((current_speaker, current_msg))
+
                 # Start recording a new message
-                speaker = m.group("name").strip()
-                text = m.group("msg")
-                
-                current_speaker = speaker
-                current_msg = [text]
+                name, msg = m.group("name", "msg")
+                current_speaker = speaker_names.get(name)
+                if current_speaker is None:
+                    current_speaker = speaker_names[name] = name.strip()
+                current_msg = [msg]
+                continue
+
+            # Ignore top info metadata or pure date dividers from Kakao
+            # e.g., "2025년 12월 2일 화요일" (Kakao daily divider string format roughly)
+            if (line.startswith(META_PREFIX) or META_SUBSTR in line
+                    or (first.isdigit() and divider_match(line))):
+                failed += 1
+                continue
+
+            # If we have an active speaker, treat as a multiline continuation
+            if current_speaker is not None:
+                current_msg.append(line)
             else:
-                # Ignore top info metadata or pure date dividers from Kakao
-                is_meta = line.startswith("저장한 날짜 :") or "카카오톡 대화" in line
-                # e.g., "2025년 12월 2일 화요일" (Kakao daily divider string format roughly)
-                is_divider = bool(re.match(r"^\d{4}년\s*\d{1,2}월\s*\d{1,2}일\s*.*$", line))
-                
-                if is_meta or is_divider:
-                    failed += 1
-                    continue
-                
-                # If we have an active speaker, treat as a multiline continuation
-                if current_speaker is not None:
-                    current_msg.append(line)
-                else:
-                    failed += 1
+                failed += 1
 
-    # Catch the very last message in the file
-    flush_msg()
+        self._speaker, self._msg = current_speaker, current_msg
+        self.stats.total_lines += len(lines)
+        self.stats.parse_failed_lines += failed
+        return out
 
-    quality = ParseQuality(
-        total_lines=total_lines,
-        parsed_lines=parsed,
-        parse_failed_lines=failed,
-        filtered_system_lines=filtered_system,
-        empty_text_lines=empty_text,
-        pii_masked_hits=pii_hits_total,
-    )
-    return rows, quality
+
+def _read_line_batches(filepath: str) -> Iterator[List[str]]:
+    with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            lines = f.readlines(READ_BATCH_CHARS)
+            if not lines:
+                return
+            yield lines
+
+
+def _iter_messages(filepath: str, stats: _LineStats) -> Iterator[Tuple[str, List[str]]]:
+    """파일을 한 번 읽으며 (화자, 메시지 줄 목록)을 순서대로 돌려줍니다. (줄 통계는 stats에 누적)"""
+    splitter = MessageSplitter(stats)
+    for lines in _read_line_batches(filepath):
+        yield from splitter.feed(lines)
+    yield from splitter.close()
+
+
+def parse_target_rows(filepath: str, target_name: str) -> Tuple[List[Dict[str, str]], ParseQuality]:
+    """대상자 한 명의 메시지만 정제하여 반환합니다."""
+    stats = _LineStats()
+    buffer = _SpeakerBuffer()
+    norm_target = normalize_speaker(target_name)
+    is_target: Dict[str, bool] = {}  # 화자별 비교 결과 (메시지마다 정규화하지 않음)
+
+    for speaker, msg_lines in _iter_messages(filepath, stats):
+        matched = is_target.get(speaker)
+        if matched is None:
+            matched = is_target[speaker] = bool(speaker) and normalize_speaker(speaker) == norm_target
+        if matched:
+            buffer.add(msg_lines)
+
+    return buffer.rows, buffer.quality(stats)
+
+
+@dataclass
+class SpeakerParse:
+    """parse_all_speakers 결과: 화자별 정제 메시지 (키: normalize_speaker 이름)"""
+    stats: _LineStats
+    buffers: Dict[str, _SpeakerBuffer]
+    display_names: Dict[str, str]
+
+    def roster(self, limit: int = 0) -> List[Dict[str, object]]:
+        """메시지 수 내림차순 화자 목록 [{"name", "message_count"}] (분석 가능한 메시지가 없는 화자 제외)"""
+        keys = sorted((k for k, b in self.buffers.items() if b.rows),
+                      key=lambda k: (-len(self.buffers[k].rows), k))
+        if limit:
+            keys = keys[:limit]
+        return [{"name": self.display_names[k], "message_count": len(self.buffers[k].rows)} for k in keys]
+
+    def for_speaker(self, name: str) -> Tuple[List[Dict[str, str]], ParseQuality]:
+        """parse_target_rows(filepath, name)와 같은 결과를 파일을 다시 읽지 않고 반환합니다."""
+        buffer = self.buffers.get(normalize_speaker(name)) or _SpeakerBuffer()
+        return buffer.rows, buffer.quality(self.stats)
+
+
+class SpeakerStreamParser:
+    """줄 묶음을 받는 대로 모든 화자의 메시지를 정제합니다. (업로드 스트림 파싱용, close()로 SpeakerParse 반환)"""
+
+    def __init__(self):
+        self.stats = _LineStats()
+        self.splitter = MessageSplitter(self.stats)
+        self._buffers: Dict[str, _SpeakerBuffer] = {}
+        self._display_names: Dict[str, str] = {}
+        self._by_speaker: Dict[str, _SpeakerBuffer] = {}  # 원본 이름 -> 버퍼 (메시지마다 정규화하지 않음)
+
+    def feed(self, lines: List[str]):
+        self._add(self.splitter.feed(lines))
+
+    def close(self) -> SpeakerParse:
+        self._add(self.splitter.close())
+        return SpeakerParse(stats=self.stats, buffers=self._buffers, display_names=self._display_names)
+
+    def _add(self, messages: List[Tuple[str, List[str]]]):
+        by_speaker = self._by_speaker
+        for speaker, msg_lines in messages:
+            if not speaker:
+                continue
+            buffer = by_speaker.get(speaker)
+            if buffer is None:
+                key = normalize_speaker(speaker)
+                if key not in self._buffers:
+                    self._buffers[key] = _SpeakerBuffer()
+                    self._display_names[key] = speaker
+                buffer = by_speaker[speaker] = self._buffers[key]
+            buffer.add(msg_lines)
+
+
+def parse_all_speakers(filepath: str) -> SpeakerParse:
+    """파일을 한 번만 읽어 모든 화자의 메시지를 정제합니다. (화자 선택 / 여러 참여자 동시 분석용)"""
+    parser = SpeakerStreamParser()
+    for lines in _read_line_batches(filepath):
+        parser.feed(lines)
+    return parser.close()
 
 
 # ----------------------------
@@ -259,6 +470,18 @@ def sample_texts_for_llm(rows: List[Dict[str, str]], max_msgs: int, max_chars: i
     return out
 
 
+def build_llm_input(rows: List[Dict[str, str]], max_msgs: int, max_chars: int) -> Dict[str, object]:
+    return {
+        "samples": sample_texts_for_llm(rows, max_msgs=max_msgs, max_chars=max_chars),
+        "numeric_signals": compute_numeric_signals(rows),
+        "constraints": {
+            "no_quotes": True,
+            "no_pii": True,
+            "avoid_room_dependent_style": True
+        }
+    }
+
+
 # ----------------------------
 # LLM call (SDK-compatible, no response_format)
 # ----------------------------
@@ -328,13 +551,8 @@ def _extract_json_object(raw: str) -> Dict[str, object]:
     )
 
 
-def call_llm_profile(client: OpenAI, model: str, llm_input: Dict[str, object]) -> Dict[str, object]:
-    """
-    response_format(json_schema)을 지원하지 않는 SDK에서도 동작하는 버전.
-    - JSON Schema 강제 대신: 프롬프트로 'JSON만' 반환하도록 강제
-    - 출력 텍스트를 추출 후 json.loads 파싱
-    """
-
+def build_profile_messages(llm_input: Dict[str, object]) -> List[Dict[str, str]]:
+    """call_llm_profile / acall_llm_profile 공통 프롬프트 (JSON 계약 + 시스템 지침)"""
     json_contract = {
         "summary": {
             "one_paragraph": "string",
@@ -386,21 +604,29 @@ def call_llm_profile(client: OpenAI, model: str, llm_input: Dict[str, object]) -
         "- Big5 점수(scores)와 confidence 값은 영단어(Forty-Five 등)나 문자열이 아닌, 반드시 순수한 숫자(Number) 타입으로 반환하십시오."
     )
 
+    if "chunk_summaries" in llm_input:
+        # 맵리듀스 입력: 전체 대화를 시간순 구간별로 요약한 결과가 함께 제공됨
+        system += (
+            "\n\n구간 요약(chunk_summaries) 활용:\n"
+            "- input.chunk_summaries는 대화 전체를 시간순 구간으로 나누어 요약한 것입니다.\n"
+            "- 전반적 경향은 구간 요약을, 구체적 표현 습관은 samples를 근거로 판단하고 "
+            "구간 간 변화가 크면 caveats에 언급하십시오."
+        )
+
     user = {
         "task": "Infer MBTI/Big5/Socionics from chat samples + numeric signals.",
         "json_contract": json_contract,
         "input": llm_input
     }
 
-    # IMPORTANT: response_format 제거 (SDK 호환)
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": json.dumps(user, ensure_ascii=False)}
-        ]
-    )
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": json.dumps(user, ensure_ascii=False)}
+    ]
 
+
+def parse_profile_response(resp) -> Dict[str, object]:
+    """LLM 응답 객체에서 프로필 JSON을 추출하고 필수 키를 검증합니다."""
     raw = _extract_responses_text(resp)
     obj = _extract_json_object(raw)
 
@@ -412,27 +638,379 @@ def call_llm_profile(client: OpenAI, model: str, llm_input: Dict[str, object]) -
     return obj
 
 
+def call_llm_profile(client: OpenAI, model: str, llm_input: Dict[str, object]) -> Dict[str, object]:
+    """
+    response_format(json_schema)을 지원하지 않는 SDK에서도 동작하는 버전.
+    - JSON Schema 강제 대신: 프롬프트로 'JSON만' 반환하도록 강제
+    - 출력 텍스트를 추출 후 json.loads 파싱
+    """
+    # IMPORTANT: response_format 제거 (SDK 호환)
+    resp = client.chat.completions.create(
+        model=model,
+        messages=build_profile_messages(llm_input)
+    )
+    return parse_profile_response(resp)
+
+
+# ----------------------------
+# Map-reduce for large exports (chunk summaries -> final profile)
+# ----------------------------
+MAP_REDUCE_MAX_CHUNKS = 24        # 구간 수 상한 (대화가 길수록 구간당 메시지 수가 늘어남)
+MAP_REDUCE_MIN_CHUNK_MSGS = 200   # 구간당 최소 메시지 수
+MAP_REDUCE_CHUNK_MSGS = 150       # 구간 요약에 보낼 샘플 수
+MAP_REDUCE_CHUNK_CHARS = 6000
+MAP_REDUCE_FINAL_MSGS = 60        # 최종 호출에 함께 보낼 전체 샘플 (구간 요약과 합쳐 기존 입력 크기 이내)
+MAP_REDUCE_FINAL_CHARS = 8000
+
+
+def plan_chunks(rows: List[Dict[str, str]], max_chunks: int = MAP_REDUCE_MAX_CHUNKS) -> List[List[str]]:
+    """rows를 시간순 연속 구간으로 나누고, 구간별 요약용 샘플 텍스트를 만듭니다. (LLM 호출 없음, 결정적)"""
+    n = len(rows)
+    if n == 0:
+        return []
+    chunk_size = max(MAP_REDUCE_MIN_CHUNK_MSGS, -(-n // max(1, max_chunks)))
+    return [
+        sample_texts_for_llm(rows[start:start + chunk_size], MAP_REDUCE_CHUNK_MSGS, MAP_REDUCE_CHUNK_CHARS)
+        for start in range(0, n, chunk_size)
+    ]
+
+
+def build_chunk_messages(texts: List[str], part: int, total: int) -> List[Dict[str, str]]:
+    system = (
+        "당신은 대화 구간 요약 도우미입니다.\n"
+        "- 한 사람의 메시지 일부(정제·마스킹됨)를 보고 대화 성향을 한국어로 요약하십시오.\n"
+        "- 원문 문장을 인용하거나 개인정보를 추측하지 마십시오.\n"
+        "- 반드시 JSON 객체 하나만 출력하십시오: "
+        "{\"summary\": \"3~5문장\", \"patterns\": [\"관찰된 특징\", \"...\"]}"
+    )
+    user = {"part": f"{part}/{total}", "messages": texts}
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": json.dumps(user, ensure_ascii=False)}
+    ]
+
+
+def _parse_chunk_summary(resp, part: int) -> Dict[str, object]:
+    obj = _extract_json_object(_extract_responses_text(resp))
+    return {"part": part, "summary": str(obj.get("summary", "")), "patterns": list(obj.get("patterns", []))[:5]}
+
+
+def summarize_chunk(client: OpenAI, model: str, texts: List[str], part: int, total: int) -> Dict[str, object]:
+    resp = client.chat.completions.create(model=model, messages=build_chunk_messages(texts, part, total))
+    return _parse_chunk_summary(resp, part)
+
+
+async def asummarize_chunk(create, model: str, texts: List[str], part: int, total: int) -> Dict[str, object]:
+    resp = await create(model=model, messages=build_chunk_messages(texts, part, total))
+    return _parse_chunk_summary(resp, part)
+
+
+def summarize_chunks(client: OpenAI, model: str, chunks: List[List[str]], concurrency: int,
+                     summarize=None) -> List[Dict[str, object]]:
+    """
+    구간들을 최대 concurrency개씩 동시에 요약합니다. (순서 유지)
+    summarize(texts, part, total)를 넘기면 캐시 등을 거쳐 호출할 수 있습니다.
+    """
+    total = len(chunks)
+    summarize = summarize or (lambda texts, part, total: summarize_chunk(client, model, texts, part, total))
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, total))) as pool:
+        return list(pool.map(lambda args: summarize(args[1], args[0] + 1, total), enumerate(chunks)))
+
+
+def build_reduce_input(rows: List[Dict[str, str]], chunk_summaries: List[Dict[str, object]]) -> Dict[str, object]:
+    """구간 요약 + 전체 샘플(축소) + 수치 신호로 최종 call_llm_profile 입력을 만듭니다."""
+    llm_input = build_llm_input(rows, MAP_REDUCE_FINAL_MSGS, MAP_REDUCE_FINAL_CHARS)
+    llm_input["chunk_summaries"] = chunk_summaries
+    return llm_input
+
+
+async def acall_llm_profile(create, model: str, llm_input: Dict[str, object]) -> Dict[str, object]:
+    """call_llm_profile의 비동기 버전 (create: make_async_create()가 반환한 코루틴 함수)"""
+    resp = await create(model=model, messages=build_profile_messages(llm_input))
+    return parse_profile_response(resp)
+
+
+def make_async_create(api_key: str):
+    """
+    chat.completions.create 코루틴 함수를 반환합니다.
+    AsyncOpenAI가 없는 구형 SDK에서는 동기 클라이언트를 스레드에서 실행합니다.
+    """
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        client = OpenAI(api_key=api_key)
+
+        async def create(**kwargs):
+            return await asyncio.to_thread(client.chat.completions.create, **kwargs)
+        return create
+
+    return AsyncOpenAI(api_key=api_key).chat.completions.create
+
+
+# ----------------------------
+# Batch mode (process-pool parsing + async LLM calls)
+# ----------------------------
+@dataclass
+class BatchTask:
+    file: str
+    name: str
+    user_id: str
+
+    @property
+    def key(self) -> str:
+        # 체크포인트 키: 같은 파일이라도 대상자가 다르면 별도 작업
+        return f"{self.file}::{self.name.strip().lower()}"
+
+
+class AsyncRateLimiter:
+    """분당 요청 수 제한 (요청 시작 시각을 균등 간격으로 배치, 0이면 제한 없음)"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+
+def discover_batch_tasks(batch_dir: str, name: str, manifest: str) -> List[BatchTask]:
+    """
+    manifest(JSONL: {"file", "name", "user_id"})가 있으면 그 목록을,
+    없으면 batch_dir의 모든 .txt 파일을 --name 대상으로 처리합니다. (user_id 기본값: 파일명)
+    """
+    tasks: List[BatchTask] = []
+    if manifest:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                path = item["file"]
+                if batch_dir and not os.path.isabs(path):
+                    path = os.path.join(batch_dir, path)
+                tasks.append(BatchTask(file=path, name=item["name"],
+                                       user_id=str(item.get("user_id") or os.path.splitext(os.path.basename(path))[0])))
+        return tasks
+
+    if not name:
+        raise SystemExit("--batch-dir 사용 시 --name 또는 --manifest가 필요합니다.")
+    for entry in sorted(os.listdir(batch_dir)):
+        if entry.lower().endswith(".txt"):
+            tasks.append(BatchTask(file=os.path.join(batch_dir, entry), name=name,
+                                   user_id=os.path.splitext(entry)[0]))
+    return tasks
+
+
+def load_checkpoint(out_path: str) -> set:
+    """출력 JSONL에서 이미 끝난 작업(ok/skipped)의 키를 읽습니다. (error는 다시 시도)"""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 중단 시점에 잘린 마지막 줄
+            if rec.get("status") in ("ok", "skipped") and rec.get("key"):
+                done.add(rec["key"])
+    return done
+
+
+def _build_batch_input(rows: List[Dict[str, str]], quality: ParseQuality, min_msgs: int, max_msgs: int,
+                       max_chars: int, map_reduce_min: int = 0) -> Dict[str, object]:
+    """
+    화자 한 명의 LLM 입력을 만듭니다.
+    map_reduce_min > 0이고 메시지가 그 이상이면 구간 요약용 샘플(chunks)도 함께 만듭니다.
+    """
+    out = {"parse_quality": asdict(quality), "message_count": len(rows)}
+    if len(rows) < min_msgs:
+        out["skipped"] = f"분석 가능한 발화가 부족합니다: {len(rows)}개 (< {min_msgs})"
+    elif map_reduce_min and len(rows) >= map_reduce_min:
+        out["chunks"] = plan_chunks(rows)
+        out["llm_input"] = build_reduce_input(rows, [])
+    else:
+        out["llm_input"] = build_llm_input(rows, max_msgs, max_chars)
+    return out
+
+
+def _parse_batch_file(path: str, names: List[str], min_msgs: int, max_msgs: int, max_chars: int,
+                      map_reduce_min: int = 0) -> Dict[str, Dict[str, object]]:
+    """
+    [프로세스 풀] 파일 하나를 한 번만 읽어 names 각각의 LLM 입력을 만듭니다. (CPU 작업만 수행)
+    반환: normalize_speaker(name) -> 입력 또는 {"error"} / {"skipped"}
+    """
+    keys = {normalize_speaker(n) for n in names}
+    try:
+        if len(keys) == 1:
+            parsed = {next(iter(keys)): parse_target_rows(path, names[0])}
+        else:
+            speakers = parse_all_speakers(path)
+            parsed = {k: speakers.for_speaker(k) for k in keys}
+    except Exception as e:
+        return {k: {"error": f"parse failed: {e}"} for k in keys}
+    return {k: _build_batch_input(rows, quality, min_msgs, max_msgs, max_chars, map_reduce_min)
+            for k, (rows, quality) in parsed.items()}
+
+
+async def run_batch(tasks: List[BatchTask], out_path: str, model: str, api_key: str,
+                    jobs: int, rpm: float, parse_workers: int, retries: int,
+                    min_msgs: int, max_msgs: int, max_chars: int, map_reduce_min: int = 0) -> Dict[str, int]:
+    """
+    파싱은 프로세스 풀에서, LLM 호출은 asyncio로 최대 jobs개 동시 + 분당 rpm개로 실행합니다.
+    (맵리듀스 구간 요약 호출도 같은 동시성/속도 제한을 공유)
+    결과는 끝나는 순서대로 out_path(JSONL)에 한 줄씩 추가되며, 재실행 시 끝난 작업은 건너뜁니다.
+    """
+    done = load_checkpoint(out_path)
+    pending = [t for t in tasks if t.key not in done]
+    counts = {"total": len(tasks), "resumed": len(tasks) - len(pending), "ok": 0, "skipped": 0, "error": 0}
+    if not pending:
+        return counts
+
+    # 같은 파일의 여러 화자는 파일을 한 번만 파싱
+    names_by_file: Dict[str, List[str]] = {}
+    for t in pending:
+        names_by_file.setdefault(t.file, []).append(t.name)
+    parse_futures: Dict[str, asyncio.Future] = {}
+
+    loop = asyncio.get_running_loop()
+    create = make_async_create(api_key)
+    limiter = AsyncRateLimiter(rpm)
+    llm_slots = asyncio.Semaphore(max(1, jobs))
+
+    with ProcessPoolExecutor(max_workers=parse_workers or None) as pool, \
+            open(out_path, "a", encoding="utf-8") as out:
+
+        def write(record: Dict[str, object]):
+            # 한 줄 단위로 즉시 기록 (중단되어도 끝난 작업은 보존)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts[record["status"]] += 1
+
+        async def call_llm(fn, *args):
+            # 호출 하나당 동시성 슬롯 1개 + 속도 제한, 실패 시 지수 백오프로 재시도
+            for attempt in range(retries + 1):
+                async with llm_slots:
+                    await limiter.wait()
+                    try:
+                        return await fn(*args)
+                    except Exception:
+                        if attempt == retries:
+                            raise
+                await asyncio.sleep(2 ** attempt)
+
+        async def process(task: BatchTask):
+            base = {
+                "key": task.key,
+                "meta": {
+                    "source": "kakao_export_txt",
+                    "file": task.file,
+                    "speaker_name": task.name,
+                    "user_id": task.user_id,
+                    "model": model
+                }
+            }
+            if task.file not in parse_futures:
+                parse_futures[task.file] = loop.run_in_executor(
+                    pool, _parse_batch_file, task.file, names_by_file[task.file],
+                    min_msgs, max_msgs, max_chars, map_reduce_min)
+            parsed = (await parse_futures[task.file])[normalize_speaker(task.name)]
+            if "error" in parsed or "skipped" in parsed:
+                status = "error" if "error" in parsed else "skipped"
+                write(dict(base, status=status, reason=parsed.get("error") or parsed["skipped"],
+                           parse_quality=parsed.get("parse_quality")))
+                return
+
+            try:
+                llm_input = parsed["llm_input"]
+                if "chunks" in parsed:
+                    chunks = parsed["chunks"]
+                    llm_input["chunk_summaries"] = await asyncio.gather(*(
+                        call_llm(asummarize_chunk, create, model, texts, i + 1, len(chunks))
+                        for i, texts in enumerate(chunks)
+                    ))
+                profile = await call_llm(acall_llm_profile, create, model, llm_input)
+            except Exception as e:
+                write(dict(base, status="error", reason=f"llm failed: {e}",
+                           parse_quality=parsed["parse_quality"]))
+                return
+
+            base["meta"]["generated_at_utc"] = datetime.utcnow().isoformat() + "Z"
+            write(dict(base, status="ok", parse_quality=parsed["parse_quality"], llm_profile=profile))
+
+        await asyncio.gather(*(process(t) for t in pending))
+
+    return counts
+
+
 # ----------------------------
 # CLI
 # ----------------------------
 def main():
     ap = argparse.ArgumentParser(description="Single-output LLM profiling from KakaoTalk TXT")
-    ap.add_argument("--file", required=True, help="KakaoTalk exported .txt file path")
-    ap.add_argument("--name", required=True, help="Target speaker name in the export (the uploader)")
-    ap.add_argument("--user_id", required=True, help="Your internal user id (DB PK/UUID)")
-    ap.add_argument("--out", default="", help="Output JSON path (optional)")
+    ap.add_argument("--file", help="KakaoTalk exported .txt file path")
+    ap.add_argument("--name", help="Target speaker name in the export (the uploader)")
+    ap.add_argument("--user_id", help="Your internal user id (DB PK/UUID)")
+    ap.add_argument("--out", default="", help="Output JSON path (optional, batch mode: JSONL checkpoint path)")
     ap.add_argument("--min_msgs", type=int, default=30, help="Minimum messages required (default: 30)")
     ap.add_argument("--openai_model", default=os.getenv("OPENAI_MODEL", "gpt-5-mini"))
     ap.add_argument("--max_msgs_for_llm", type=int, default=120)
     ap.add_argument("--max_chars_for_llm", type=int, default=18000)
 
+    # Batch mode
+    ap.add_argument("--batch-dir", default="", help="Profile every .txt in this directory (batch mode)")
+    ap.add_argument("--manifest", default="", help="Batch JSONL of {file, name, user_id} (overrides --name per file)")
+    ap.add_argument("--jobs", type=int, default=8, help="Concurrent LLM requests in batch mode")
+    ap.add_argument("--rpm", type=float, default=float(os.getenv("OPENAI_BATCH_RPM", 60)),
+                    help="LLM requests per minute in batch mode (0 = unlimited)")
+    ap.add_argument("--parse-workers", type=int, default=0, help="Parser processes (default: CPU count)")
+    ap.add_argument("--retries", type=int, default=2, help="LLM retries per request in batch mode")
+
+    # Map-reduce (large exports)
+    ap.add_argument("--map-reduce-min", type=int, default=0,
+                    help="Summarize time-ordered chunks first when a speaker has at least this many messages (0 = off)")
+    ap.add_argument("--chunk-concurrency", type=int, default=4, help="Concurrent chunk summaries (single-file mode)")
+    ap.add_argument("--list-speakers", action="store_true",
+                    help="Print the speaker roster of --file (message counts) and exit")
+
     args = ap.parse_args()
 
+    if args.list_speakers:
+        if not args.file:
+            ap.error("--list-speakers requires --file")
+        print(json.dumps(parse_all_speakers(args.file).roster(), ensure_ascii=False, indent=2))
+        return
+
     load_dotenv()
     api_key = os.getenv("OPENAI_API_KEY", "")
     if not api_key:
         raise SystemExit("OPENAI_API_KEY가 설정되지 않았습니다. .env 또는 환경변수로 설정하세요.")
 
+    if args.batch_dir or args.manifest:
+        tasks = discover_batch_tasks(args.batch_dir, args.name, args.manifest)
+        out_path = args.out or "profiles.jsonl"
+        started = time.monotonic()
+        counts = asyncio.run(run_batch(
+            tasks, out_path, args.openai_model, api_key,
+            jobs=args.jobs, rpm=args.rpm, parse_workers=args.parse_workers, retries=args.retries,
+            min_msgs=args.min_msgs, max_msgs=args.max_msgs_for_llm, max_chars=args.max_chars_for_llm,
+            map_reduce_min=args.map_reduce_min
+        ))
+        print(f"[OK] {out_path}: {counts} ({time.monotonic() - started:.1f}s)")
+        return
+
+    if not (args.file and args.name and args.user_id):
+        ap.error("--file, --name, --user_id are required (or use --batch-dir)")
+
     rows, quality = parse_target_rows(args.file, args.name)
     if len(rows) < args.min_msgs:
         raise SystemExit(
@@ -440,20 +1018,13 @@ def main():
             f"--name(대화명) 또는 --min_msgs를 확인하세요."
         )
 
-    signals = compute_numeric_signals(rows)
-    samples = sample_texts_for_llm(rows, max_msgs=args.max_msgs_for_llm, max_chars=args.max_chars_for_llm)
-
-    llm_input = {
-        "samples": samples,
-        "numeric_signals": signals,
-        "constraints": {
-            "no_quotes": True,
-            "no_pii": True,
-            "avoid_room_dependent_style": True
-        }
-    }
-
     client = OpenAI(api_key=api_key)
+    if args.map_reduce_min and len(rows) >= args.map_reduce_min:
+        chunks = plan_chunks(rows)
+        llm_input = build_reduce_input(rows, summarize_chunks(client, args.openai_model, chunks, args.chunk_concurrency))
+    else:
+        llm_input = build_llm_input(rows, args.max_msgs_for_llm, args.max_chars_for_llm)
+
     profile = call_llm_profile(client=client, model=args.openai_model, llm_input=llm_input)
 
     out_obj = {
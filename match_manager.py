@@ -39,128 +39,347 @@
 """
 
 import os
+import copy
 import json
 import logging
+import threading
 import numpy as np
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 from config import config_by_name
 import matcher
+from population_stats import PopulationStatsService
+from candidate_store import CandidateStore, snapshot_from_rows
+from candidate_index import CandidateIndex
+from recommendation_cache import RecommendationCache, RECOMMENDATION_TOP_N
+from badge_cache import BadgeCache
+from inbox_version import InboxVersion
 
 # 환경 변수로부터 현재 실행 모드(development/production) 로드
 env = os.getenv('FLASK_ENV', 'development')
 cfg = config_by_name[env]
 
+# 대화 목록 미리보기 길이 (MatchRequest/BlindMatch.last_message_preview 컬럼 크기 이하)
+MESSAGE_PREVIEW_LENGTH = 100
+NO_MESSAGE_PREVIEW = "대화를 시작해보세요."
+
+
+def message_preview(content):
+    """대화 목록용 미리보기 문자열 (이스케이프된 본문을 자를 때 끝에 걸린 HTML 엔티티 조각 제거)"""
+    if not content or len(content) <= MESSAGE_PREVIEW_LENGTH:
+        return content
+    preview = content[:MESSAGE_PREVIEW_LENGTH]
+    amp = preview.rfind('&')
+    if amp != -1 and ';' not in preview[amp:]:
+        preview = preview[:amp]
+    return preview
+
+
 class MatchManager:
     """
     사용자 간 매칭 및 알림 시스템을 전담 관리하는 클래스입니다.
     SQLAlchemy ORM을 사용하여 비즈니스 로직을 수행합니다.
     """
 
+    # 백그라운드 추천 목록 재계산 중인 사용자 (같은 사용자 중복 실행 방지)
+    _refreshing = set()
+    _refreshing_lock = threading.Lock()
+
     @classmethod
-    def get_matching_candidates(cls, my_user_id, current_user_profile_json=None, limit=5):
+    def get_matching_candidates(cls, my_user_id, current_user_profile_json=None, limit=5, use_cache=True,
+                                age_range=None):
         """
         [조회] 나에게 맞는 매칭 후보 리스트를 가져옵니다.
-        Hybrid Mode: candidates_db (File) + personality_results (DB) 병합
+        사전 계산된 추천 목록(recommendation_cache.py)이 유효하면 그 후보만 다시 채점하고,
+        없거나 오래되었으면 전체 후보를 실시간 채점한 뒤 목록을 다시 저장합니다.
+        age_range: (최소 나이, 최대 나이) 만 나이 필터. 지정 시 추천 목록 캐시를 쓰지 않습니다.
         """
-        from extensions import db, User, PersonalityResult, MatchRequest
+        from extensions import db, MatchRequest
         from sqlalchemy import or_
         from utils_system import get_system_config
         
         sys_conf = get_system_config()
         hide_dummies = sys_conf.get('hide_dummies', False)
         
-        candidates = []
-        seen_user_ids = set()
         excluded_user_ids = {str(my_user_id)}
 
         try:
-            # 0. 제외할 유저 ID 수집
-            active_matches = MatchRequest.query.filter(
+            # 0. 제외할 유저 ID 수집 (메모리 저장소/추천 목록용, DB 경로는 SQL 안티 조인으로 처리)
+            active_matches = db.session.query(MatchRequest.sender_id, MatchRequest.receiver_id).filter(
                 or_(MatchRequest.sender_id == my_user_id, MatchRequest.receiver_id == my_user_id),
                 ~MatchRequest.status.in_(['REJECTED', 'CANCELLED'])
             ).all()
 
-            for req in active_matches:
-                excluded_user_ids.add(str(req.sender_id))
-                excluded_user_ids.add(str(req.receiver_id))
+            for sender_id, receiver_id in active_matches:
+                excluded_user_ids.add(str(sender_id))
+                excluded_user_ids.add(str(receiver_id))
 
         except Exception as e:
             logger.exception("Error fetching excluded users")
 
+        if not (use_cache and age_range is None and getattr(cfg, 'RECOMMENDATION_CACHE_ENABLED', False)
+                and current_user_profile_json):
+            return cls._rank_candidates(my_user_id, current_user_profile_json, excluded_user_ids, hide_dummies,
+                                        limit, age_range=age_range)
+
+        # 사전 계산된 추천 목록: 캐시된 후보 몇십 명만 현재 데이터로 다시 채점
+        cached_ids = RecommendationCache.read(my_user_id, excluded_user_ids, hide_dummies, limit)
+        if cached_ids is not None:
+            return cls._rank_candidates(my_user_id, current_user_profile_json, excluded_user_ids, hide_dummies,
+                                        limit, only_user_ids=cached_ids)
+
+        # 목록이 없거나 오래됨: 실시간 채점 후 다시 저장
+        fresh = cls._rank_candidates(my_user_id, current_user_profile_json, excluded_user_ids, hide_dummies,
+                                     max(limit, RECOMMENDATION_TOP_N))
+        if fresh:
+            RecommendationCache.store(my_user_id, fresh)
+        return fresh[:limit]
+
+    @classmethod
+    def _rank_candidates(cls, my_user_id, current_user_profile_json, excluded_user_ids, hide_dummies, limit,
+                         only_user_ids=None, age_range=None):
+        """
+        [채점] 제외 대상을 뺀 후보를 채점해 상위 limit명을 반환합니다.
+        only_user_ids가 주어지면 해당 후보만 채점합니다. (추천 목록 캐시 적중 시)
+        메모리 후보 저장소 우선, 사용할 수 없으면 DB에서 필터링된 타입 열만 조회합니다.
+        """
+        if only_user_ids is not None and not only_user_ids:
+            return []
+
+        # 1. 메모리 후보 저장소 (열 배열 기반 채점, 실패 시 아래 DB 경로로 대체)
+        if getattr(cfg, 'CANDIDATE_STORE_ENABLED', False):
+            stored = cls._get_candidates_from_store(my_user_id, current_user_profile_json, excluded_user_ids,
+                                                    hide_dummies, limit, only_user_ids, age_range)
+            if stored is not None:
+                return stored
+
+        # 2. Database (personality_results)
+        return cls._get_candidates_from_db(my_user_id, current_user_profile_json, hide_dummies, limit,
+                                           only_user_ids, age_range)
 
-        # 2. Database (personality_results) - SQLAlchemy ORM
+    @staticmethod
+    def _birth_date_bounds(age_range, today=None):
+        """
+        (최소 나이, 최대 나이) 만 나이 범위를 생년월일 범위 (earliest, latest)로 변환합니다.
+        각 값이 None이면 해당 쪽은 제한하지 않습니다.
+        """
+        if not age_range:
+            return None, None
+        min_age, max_age = age_range
+        today = today or date.today()
+
+        def years_ago(years):
+            try:
+                return today.replace(year=today.year - years)
+            except ValueError:  # 2월 29일
+                return today.replace(year=today.year - years, day=28)
+
+        latest = years_ago(min_age) if min_age is not None else None
+        earliest = years_ago(max_age + 1) + timedelta(days=1) if max_age is not None else None
+        return earliest, latest
+
+    @classmethod
+    def _load_target_vector(cls, my_user_id, current_user_profile_json):
+        """현재 사용자 프로필 JSON을 UserVector로 변환합니다. (실패 시 None)"""
+        from extensions import User
+
+        target_user = None
+        if current_user_profile_json:
+            my_user = User.query.get(my_user_id)
+            my_birth_date = my_user.birth_date if my_user else None
+            target_user = cls._convert_json_to_user_vector(current_user_profile_json, my_user_id, my_birth_date)
+        if not target_user:
+            logger.error(f"매칭 점수 계산 실패: 현재 사용자(ID: {my_user_id})의 프로필 벡터를 생성할 수 없습니다.")
+        return target_user
+
+    @classmethod
+    def _get_candidates_from_store(cls, my_user_id, current_user_profile_json, excluded_user_ids, hide_dummies, limit,
+                                   only_user_ids=None, age_range=None):
+        """
+        [조회 - 저장소 경로] CandidateStore 스냅샷의 열 배열만으로 전체 후보(또는 only_user_ids)를 채점하고,
+        상위 limit명의 표시용 정보만 DB에서 한 번에 조회합니다.
+        저장소를 사용할 수 없으면 None을 반환합니다.
+        """
         try:
-            results = db.session.query(PersonalityResult, User)\
-                .join(User, PersonalityResult.user_id == User.user_id)\
-                .filter(PersonalityResult.is_representative == True)\
-                .all()
-
-            for p_result, user in results:
-                uid_str = str(user.user_id)
-                if uid_str in excluded_user_ids: continue
-                if uid_str in seen_user_ids: continue
-                if user.is_banned: continue
-                
-                # [System Config] 더미 숨김 처리
-                if hide_dummies and user.is_dummy:
-                    continue
-
-                try:
-                    full_report = p_result.full_report_json
-                    
-                    if isinstance(full_report, str):
-                        data = json.loads(full_report)
-                    else:
-                        data = full_report
-                    
-                    if not data: continue
-
-                    llm_profile = data.get('llm_profile', {})
-                    
-                    candidate = {
-                        'user_id': user.user_id,
-                        'username': user.username,
-                        'nickname': user.nickname or user.username,
-                        'mbti_prediction': p_result.mbti_prediction or 'Unknown',
-                        'socionics_prediction': p_result.socionics_prediction or 'Unknown',
-                        'summary_text': p_result.summary_text or '',
-                        'full_report_json': data,
-                        'line_count_at_analysis': p_result.line_count_at_analysis,
-                        'big5': llm_profile.get('big5', {}).get('scores_0_100', {}),
-                        'birth_date': user.birth_date,
-                        'created_at': user.created_at
-                    }
-                    candidates.append(candidate)
-                    seen_user_ids.add(uid_str)
-
-                except Exception as e:
-                    logger.exception(f"Error parsing db candidate {user.user_id}")
-                    
+            snap = CandidateStore.snapshot()
+            if snap is None:
+                return None
+
+            target_user = cls._load_target_vector(my_user_id, current_user_profile_json)
+            if not target_user:
+                return []
+
+            # 대상 행 선택 (정지/제외/더미 숨김/나이)
+            excluded = np.array([int(uid) for uid in excluded_user_ids], dtype=np.int64)
+            if only_user_ids is not None:
+                rows = np.array(sorted(row for row in (snap.row_of.get(int(uid)) for uid in only_user_ids)
+                                       if row is not None), dtype=np.intp)
+                keep = ~snap.is_banned[rows] & ~np.isin(snap.user_ids[rows], excluded)
+                if hide_dummies:
+                    keep &= ~snap.is_dummy[rows]
+                rows = rows[keep]
+                mask = None
+            else:
+                mask = ~snap.is_banned & ~np.isin(snap.user_ids, excluded)
+                if hide_dummies:
+                    mask &= ~snap.is_dummy
+                earliest, latest = cls._birth_date_bounds(age_range)
+                if earliest or latest:
+                    mask &= snap.birth_ord > 0
+                    if earliest:
+                        mask &= snap.birth_ord >= earliest.toordinal()
+                    if latest:
+                        mask &= snap.birth_ord <= latest.toordinal()
+                rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+
+            hybrid_matcher = matcher.HybridMatcher([], population_stats=(snap.stats_mean, snap.stats_std))
+
+            # 후보가 매우 많으면 ANN 사전 필터로 재채점 대상만 추립니다. (candidate_index.py)
+            if mask is not None and cfg.CANDIDATE_INDEX_ENABLED and rows.size >= cfg.CANDIDATE_INDEX_MIN_POOL:
+                index = CandidateIndex.for_snapshot(snap)
+                rows = index.prefilter(
+                    hybrid_matcher.normalize_matrix(target_user.big5_raw),
+                    matcher.RelationshipBrain.mbti_code(target_user.mbti_type),
+                    budget=cfg.CANDIDATE_INDEX_BUDGET,
+                    allowed=mask
+                )
+                if rows.size == 0:
+                    return []
+
+            return cls._score_snapshot_rows(snap, rows, hybrid_matcher, target_user, limit)
+
         except Exception as e:
-            logger.exception("Error in DB candidate fetching")
+            logger.exception("Error scoring candidates from store")
+            return None
+
+    @classmethod
+    def _get_candidates_from_db(cls, my_user_id, current_user_profile_json, hide_dummies, limit,
+                                only_user_ids=None, age_range=None):
+        """
+        [조회 - DB 경로] 제외/정지/더미 숨김/나이 필터를 하나의 SQL 문으로 처리하고,
+        채점에 필요한 타입 열(Big5, MBTI, 소시오닉스, 대화량)만 조회해 열 배열로 채점합니다.
+        """
+        from extensions import User, MatchRequest
+        from sqlalchemy import and_, or_, exists
+
+        try:
+            target_user = cls._load_target_vector(my_user_id, current_user_profile_json)
+            if not target_user:
+                return []
 
-        # 3. Score & Sort
-        if candidates:
-            candidates = cls._calculate_match_scores(
-                my_user_id, 
-                candidates,
-                current_user_profile_json
+            # 진행 중인 매칭 요청이 있는 상대 제외 (NOT EXISTS 안티 조인)
+            active_request = exists().where(
+                ~MatchRequest.status.in_(['REJECTED', 'CANCELLED']),
+                or_(
+                    and_(MatchRequest.sender_id == my_user_id, MatchRequest.receiver_id == User.user_id),
+                    and_(MatchRequest.receiver_id == my_user_id, MatchRequest.sender_id == User.user_id)
+                )
             )
-            # 3차 정렬 기준: 점수(내림) -> 나이차(오름) -> 가입일(오름)
-            # 가입일이 오래된(작은) 유저가 더 높은 순위를 가집니다.
-            candidates = sorted(candidates, key=lambda x: (-x.get('match_score', 0), x.get('age_difference', 999999), x.get('created_at', datetime.utcnow())))
-            limited_candidates = candidates[:limit]
+            query = CandidateStore.scoring_query().filter(
+                User.user_id != my_user_id,
+                User.is_banned.is_not(True),
+                ~active_request
+            )
+            if hide_dummies:
+                query = query.filter(User.is_dummy.is_not(True))
+            earliest, latest = cls._birth_date_bounds(age_range)
+            if earliest:
+                query = query.filter(User.birth_date >= earliest)
+            if latest:
+                query = query.filter(User.birth_date <= latest)
+            if only_user_ids is not None:
+                query = query.filter(User.user_id.in_(only_user_ids))
+
+            rows = query.all()
+            if not rows:
+                return []
 
-            # [최적화] 프론트엔드로 보내기 전, 불필요하게 큰 full_report_json 데이터 제거
-            # 이 데이터는 점수 계산에만 필요하고, match.html의 카드 뷰 렌더링에는 부담만 될 수 있습니다.
-            for cand in limited_candidates:
-                cand.pop('full_report_json', None)
+            # 정규화 기준은 전체 대표 프로필 모집단 통계를 공유 (조회 실패 시 후보군 기준으로 대체)
+            snap = snapshot_from_rows(rows, stats=PopulationStatsService.snapshot())
+            hybrid_matcher = matcher.HybridMatcher([], population_stats=(snap.stats_mean, snap.stats_std))
+            return cls._score_snapshot_rows(snap, np.arange(len(snap)), hybrid_matcher, target_user, limit)
 
-            return limited_candidates
-        
-        return []
+        except Exception as e:
+            logger.exception("Error in DB candidate fetching")
+            return []
+
+    @classmethod
+    def _score_snapshot_rows(cls, snap, rows, hybrid_matcher, target_user, limit):
+        """
+        스냅샷의 rows 행을 열 배열로 채점해 상위 limit명을 고르고,
+        그 후보들의 표시용 정보만 DB에서 한 번에 조회해 화면용 dict 목록을 만듭니다.
+        """
+        from extensions import db, User, PersonalityResult
+
+        # [1단계] 열 배열 채점 (스냅샷 모집단 통계로 정규화된 Z-Score 사용)
+        scores = hybrid_matcher.score_columns(
+            target_user,
+            big5_z=snap.big5_z[rows],
+            mbti_codes=snap.mbti_codes[rows],
+            socio_codes=snap.socio_codes[rows],
+            mbti_conf=snap.mbti_conf[rows],
+            socio_conf=snap.socio_conf[rows],
+            line_counts=snap.line_counts[rows],
+        )
+        match_scores = np.clip(scores['total_score'] * 100, 0, 100).astype(int)
+
+        birth_ord = snap.birth_ord[rows]
+        if target_user.birth_date:
+            age_diffs = np.where(birth_ord > 0, np.abs(birth_ord - target_user.birth_date.toordinal()),
+                                 matcher.AGE_DIFF_UNKNOWN)
+        else:
+            age_diffs = np.full(rows.size, matcher.AGE_DIFF_UNKNOWN)
+
+        # 3차 정렬 기준: 점수(내림) -> 나이차(오름) -> 가입일(오름)
+        positions = matcher.top_k_indices(match_scores, limit, (age_diffs, snap.created_ts[rows]))
+
+        # [2단계] 상위 후보 표시용 정보 일괄 조회
+        top_ids = [int(snap.user_ids[rows[pos]]) for pos in positions]
+        display_rows = db.session.query(
+            User.user_id, User.username, User.nickname, User.birth_date, User.created_at,
+            PersonalityResult.mbti_prediction, PersonalityResult.socionics_prediction,
+            PersonalityResult.summary_text, PersonalityResult.line_count_at_analysis,
+            PersonalityResult.openness, PersonalityResult.conscientiousness, PersonalityResult.extraversion,
+            PersonalityResult.agreeableness, PersonalityResult.neuroticism
+        ).join(PersonalityResult, PersonalityResult.user_id == User.user_id)\
+         .filter(User.user_id.in_(top_ids), PersonalityResult.is_representative == True)\
+         .all()
+        display_by_id = {r.user_id: r for r in display_rows}
+
+        candidates = []
+        for pos in positions:
+            row = rows[pos]
+            info = display_by_id.get(int(snap.user_ids[row]))
+            if info is None:
+                continue  # 스냅샷 이후 삭제된 사용자
+
+            candidate = {
+                'user_id': info.user_id,
+                'username': info.username,
+                'nickname': info.nickname or info.username,
+                'mbti_prediction': info.mbti_prediction or 'Unknown',
+                'socionics_prediction': info.socionics_prediction or 'Unknown',
+                'summary_text': info.summary_text or '',
+                'line_count_at_analysis': info.line_count_at_analysis,
+                'big5': {
+                    'openness': info.openness,
+                    'conscientiousness': info.conscientiousness,
+                    'extraversion': info.extraversion,
+                    'agreeableness': info.agreeableness,
+                    'neuroticism': info.neuroticism
+                },
+                'birth_date': info.birth_date,
+                'created_at': info.created_at
+            }
+            candidate_user = snap.user_vector(row, info.birth_date, info.created_at)
+            cls._fill_match_details(candidate, hybrid_matcher, target_user, candidate_user,
+                                    scores, pos, int(match_scores[pos]), int(age_diffs[pos]))
+            candidates.append(candidate)
+
+        return candidates
 
     @classmethod
     def get_successful_matches(cls, user_id):
@@ -205,7 +424,10 @@ class MatchManager:
                     'request_id': req.request_id,
                     'status': req.status,
                     'sender_id': req.sender_id,
-                    'receiver_id': req.receiver_id
+                    'receiver_id': req.receiver_id,
+                    # 역정규화된 대화 요약 (메시지 테이블 조회 없음)
+                    'unread_count': req.sender_unread_count if req.sender_id == user_id else req.receiver_unread_count,
+                    'last_message': req.last_message_preview or NO_MESSAGE_PREVIEW
                 })
             
             # 최신순 정렬
@@ -216,6 +438,39 @@ class MatchManager:
             logger.exception("Error fetching successful matches")
             return []
 
+    @classmethod
+    def record_message(cls, req, message):
+        """
+        [대화 요약 갱신] 메시지 저장 시 상대방의 안 읽은 수와 마지막 메시지를 갱신합니다.
+        message는 flush되어 id가 있어야 하며, 커밋은 호출 측 트랜잭션에서 수행합니다.
+        """
+        from extensions import MatchRequest
+
+        unread_col = MatchRequest.receiver_unread_count if message.sender_id == req.sender_id \
+            else MatchRequest.sender_unread_count
+        MatchRequest.query.filter_by(request_id=req.request_id).update({
+            unread_col: unread_col + 1,
+            MatchRequest.last_message_id: message.id,
+            MatchRequest.last_message_preview: message_preview(message.content),
+            MatchRequest.last_message_at: message.created_at or datetime.utcnow(),
+            MatchRequest.updated_at: MatchRequest.updated_at,  # 매칭 시각(matched_at) 유지
+        }, synchronize_session=False)
+
+    @classmethod
+    def record_read(cls, req, reader_id, count):
+        """[대화 요약 갱신] reader_id가 메시지 count개를 읽었을 때 안 읽은 수를 차감합니다. (커밋은 호출 측)"""
+        from extensions import MatchRequest
+        from sqlalchemy import case
+
+        if count <= 0:
+            return
+        unread_col = MatchRequest.sender_unread_count if reader_id == req.sender_id \
+            else MatchRequest.receiver_unread_count
+        MatchRequest.query.filter_by(request_id=req.request_id).update({
+            unread_col: case((unread_col > count, unread_col - count), else_=0),
+            MatchRequest.updated_at: MatchRequest.updated_at,
+        }, synchronize_session=False)
+
     @classmethod
     def request_unmatch(cls, user_id, request_id):
         """
@@ -241,8 +496,10 @@ class MatchManager:
 
             req.status = new_status
             req.updated_at = db.func.now()
+            InboxVersion.bump(req.sender_id, req.receiver_id)
             db.session.commit()
-            
+            InboxVersion.notify(req.sender_id, req.receiver_id)
+
             return {"success": True, "message": "매칭 취소를 요청했습니다. 상대방의 수락을 기다립니다."}
         
         except Exception as e:
@@ -270,7 +527,10 @@ class MatchManager:
             # Soft Delete (CANCELLED)
             req.status = 'CANCELLED'
             req.updated_at = db.func.now()
+            InboxVersion.bump(req.sender_id, req.receiver_id)
             db.session.commit()
+            InboxVersion.notify(req.sender_id, req.receiver_id)
+            cls.notify_match_closed(req.sender_id, req.receiver_id)
 
             return {"success": True, "message": "매칭 요청이 취소되었습니다."}
 
@@ -301,7 +561,11 @@ class MatchManager:
                 msg = "매칭 취소 요청을 거절했습니다."
 
             req.updated_at = db.func.now()
+            InboxVersion.bump(req.sender_id, req.receiver_id)
             db.session.commit()
+            InboxVersion.notify(req.sender_id, req.receiver_id)
+            if req.status == 'CANCELLED':
+                cls.notify_match_closed(req.sender_id, req.receiver_id)
             return {"success": True, "message": msg}
 
         except Exception as e:
@@ -330,8 +594,10 @@ class MatchManager:
 
             req.status = 'ACCEPTED'
             req.updated_at = db.func.now()
+            InboxVersion.bump(req.sender_id, req.receiver_id)
             db.session.commit()
-            
+            InboxVersion.notify(req.sender_id, req.receiver_id)
+
             return {"success": True, "message": "매칭 취소 요청이 철회되었습니다."}
         
         except Exception as e:
@@ -342,17 +608,126 @@ class MatchManager:
     def reload_candidates(cls):
         """
         [관리자] 후보군 데이터 새로고침
-        DB 모드에서는 크게 의미 없으나 호환성을 위해 유지 (DB 카운트 반환)
+        대표 프로필 모집단 통계와 후보 저장소를 DB에서 다시 적재합니다. (반영된 프로필 수 반환)
         """
-        from extensions import PersonalityResult
         try:
-            return PersonalityResult.query.filter_by(is_representative=True).count()
+            # 후보 저장소 스냅샷이 새 모집단 통계로 정규화되도록 통계를 먼저 재적재
+            count = PopulationStatsService.rebuild()
+            if getattr(cfg, 'CANDIDATE_STORE_ENABLED', False):
+                CandidateStore.rebuild()
+            return count
         except Exception as e:
             logger.exception("Error reloading candidates")
             return 0
+
+    @classmethod
+    def notify_profile_changed(cls, user_id):
+        """
+        [후보군 갱신 알림] 사용자의 대표 프로필 또는 계정 상태(정지 등)가 바뀐 뒤 호출합니다.
+        (커밋 이후에 호출해야 변경 내용이 반영됩니다)
+        """
+        PopulationStatsService.refresh_user(user_id)
+        CandidateStore.refresh_user(user_id)
+        if getattr(cfg, 'RECOMMENDATION_CACHE_ENABLED', False):
+            # 본인 목록이 있던 사용자(= /matching 이용자)만 백그라운드에서 바로 재계산, 나머지는 재계산 표시만
+            # (재계산이 실패해도 목록은 재계산 표시 상태이므로 스케줄러/다음 조회가 다시 채점)
+            if RecommendationCache.invalidate_candidate(user_id):
+                cls.refresh_recommendations_async(user_id)
+
+    @classmethod
+    def notify_user_removed(cls, user_id):
+        """[후보군 갱신 알림] 사용자가 삭제된 뒤 호출합니다."""
+        PopulationStatsService.remove_user(user_id)
+        CandidateStore.remove_user(user_id)
+        if getattr(cfg, 'RECOMMENDATION_CACHE_ENABLED', False):
+            RecommendationCache.remove_user(user_id)
+
+    @classmethod
+    def notify_match_closed(cls, *user_ids):
+        """[추천 목록 갱신 알림] 매칭이 거절/취소/삭제되어 두 사용자가 다시 서로의 후보가 될 수 있을 때 호출합니다."""
+        if getattr(cfg, 'RECOMMENDATION_CACHE_ENABLED', False):
+            RecommendationCache.mark_stale(user_ids)
+
+    @classmethod
+    def refresh_recommendations(cls, user_id):
+        """
+        [추천 목록 재계산] 사용자의 대표 프로필 기준으로 상위 후보를 실시간 채점해 저장합니다.
+        저장한 후보 수를 반환합니다. (대표 프로필이 없거나 정지된 사용자는 목록 삭제)
+        """
+        from extensions import User, PersonalityResult
+
+        try:
+            user = User.query.get(user_id)
+            profile = PersonalityResult.query.filter_by(user_id=user_id, is_representative=True).first()
+            if not user or user.is_banned or not profile or not profile.full_report_json:
+                RecommendationCache.store(user_id, [])
+                return 0
+
+            profile_json = profile.full_report_json
+            if isinstance(profile_json, str):
+                profile_json = json.loads(profile_json)
+            else:
+                # ORM 속성 값을 직접 수정하지 않도록 사본 사용
+                profile_json = copy.deepcopy(profile_json)
+            if 'parse_quality' not in profile_json:
+                profile_json['parse_quality'] = {'parsed_lines': profile.line_count_at_analysis}
+
+            candidates = cls.get_matching_candidates(user_id, profile_json, limit=RECOMMENDATION_TOP_N,
+                                                     use_cache=False)
+            RecommendationCache.store(user_id, candidates)
+            return len(candidates)
+        except Exception as e:
+            logger.exception(f"추천 목록 재계산 실패 (user_id={user_id})")
+            return 0
+
+    @classmethod
+    def refresh_recommendations_async(cls, user_id):
+        """
+        [추천 목록 재계산 예약] 요청 처리 스레드를 막지 않도록 refresh_recommendations를 별도 스레드에서 실행합니다.
+        Flask 애플리케이션 컨텍스트 안에서 호출해야 합니다.
+        """
+        from flask import current_app
+
+        with cls._refreshing_lock:
+            if user_id in cls._refreshing:
+                return
+            cls._refreshing.add(user_id)
+        app = current_app._get_current_object()
+
+        def run():
+            try:
+                with app.app_context():
+                    cls.refresh_recommendations(user_id)
+            finally:
+                with cls._refreshing_lock:
+                    cls._refreshing.discard(user_id)
+
+        threading.Thread(target=run, name=f"recommendation-refresh-{user_id}", daemon=True).start()
+
+    @classmethod
+    def refresh_recommendations_job(cls, app):
+        """[스케줄러] 재계산 표시되었거나 오래된 추천 목록을 미리 다시 계산합니다."""
+        with app.app_context():
+            try:
+                targets = RecommendationCache.refresh_targets()
+                for user_id in targets:
+                    cls.refresh_recommendations(user_id)
+                if targets:
+                    logger.info(f"[Recommendation] 추천 목록 {len(targets)}건 재계산 완료")
+            except Exception as e:
+                logger.exception("[Recommendation] 추천 목록 주기적 재계산 실패")
     
     @classmethod
-    def _calculate_match_scores(cls, my_user_id, candidates, current_user_profile_json=None, weights=None):
+    def _calculate_match_scores(cls, my_user_id, candidates, current_user_profile_json=None, weights=None,
+                                limit=None, tiebreakers=('age_difference', 'created_at')):
+        """
+        [매칭 점수 계산]
+        - limit 미지정: 모든 후보에 점수와 상세 데이터를 채워 입력 순서 그대로 반환합니다.
+        - limit 지정 (2단계):
+          1) 숫자 점수 배열만으로 순위를 매기고 (점수 내림 -> tiebreakers 오름)
+          2) 상위 limit명에 대해서만 상세 데이터(관계 분석, 기능 스택 등)를 구성하여 정렬된 목록을 반환합니다.
+          프로필 벡터를 만들 수 없는 후보도 제외하지 않고 -inf 점수(맨 뒤)로 순위에 포함합니다.
+        """
         if weights is None:
             weights = {'similarity': 0.5, 'chemistry': 0.4, 'activity': 0.1}
 
@@ -374,7 +749,7 @@ class MatchManager:
             
             # Candidates 변환
             candidate_users = []
-            valid_candidates_map = {} # user_id -> index
+            candidate_indices = [] # candidate_users 위치 -> candidates 인덱스
 
             for i, candidate in enumerate(candidates):
                 candidate_json = candidate.get('full_report_json', {})
@@ -383,64 +758,95 @@ class MatchManager:
                 user_vector = cls._convert_json_to_user_vector(candidate_json, candidate.get('user_id'), birth_date, created_at)
                 if user_vector:
                     candidate_users.append(user_vector)
-                    valid_candidates_map[candidate.get('user_id')] = i
+                    candidate_indices.append(i)
             
             if not candidate_users:
-                return candidates
+                return candidates if limit is None else candidates[:limit]
             
-            # HybridMatcher 실행
-            hybrid_matcher = matcher.HybridMatcher(candidate_users + [target_user])
+            # [1단계] HybridMatcher 실행 (후보 전체를 한 번의 배열 연산으로 채점)
+            # 정규화 기준은 전체 대표 프로필 모집단 통계를 공유 (조회 실패 시 후보군 기준으로 대체)
+            population_stats = PopulationStatsService.snapshot()
+            hybrid_matcher = matcher.HybridMatcher(candidate_users + [target_user], population_stats=population_stats)
             hybrid_matcher.normalize_user(target_user)
-            
-            for candidate_user in candidate_users:
-                hybrid_matcher.normalize_user(candidate_user)
-                scores = hybrid_matcher.calculate_match_score(target_user, candidate_user)
-                
-                new_total = (
-                    scores['similarity_score'] * weights['similarity'] +
-                    scores['chemistry_score'] * weights['chemistry'] +
-                    scores['activity_score'] * weights['activity']
-                )
-                
-                # 결과 업데이트
-                idx = valid_candidates_map.get(candidate_user.user_id)
-                if idx is not None:
-                    candidates[idx]['match_score'] = int(max(0, min(100, new_total * 100)))
-                    candidates[idx]['match_details'] = scores
-
-                    # 나이 차이 계산 및 저장 (단위: 일)
-                    age_diff = 999999  # 날짜 정보 없을 시 후순위로 밀기 위한 큰 값
-                    if target_user.birth_date and candidate_user.birth_date:
-                        delta = target_user.birth_date - candidate_user.birth_date
-                        age_diff = abs(delta.days)
-                    candidates[idx]['age_difference'] = age_diff
-                    
-                    # 확장 패널용 데이터 (Big5, 대화량)
-                    candidates[idx]['my_big5'] = target_user.big5_raw.tolist() if target_user.big5_raw is not None else [50,50,50,50,50]
-                    candidates[idx]['cand_big5'] = candidate_user.big5_raw.tolist() if candidate_user.big5_raw is not None else [50,50,50,50,50]
-                    candidates[idx]['my_line_count'] = target_user.line_count or 0
-                    candidates[idx]['cand_line_count'] = candidate_user.line_count or 0
-
-                    # 심리 기능 스택
-                    candidates[idx]['my_functions'] = matcher.RelationshipBrain.get_function_stack_details(target_user.mbti_type)
-                    candidates[idx]['cand_functions'] = matcher.RelationshipBrain.get_function_stack_details(candidate_user.mbti_type)
-
-                    # 상대적 성향 분석 (Relative Traits)
-                    trait_names_kr = ["개방성", "성실성", "외향성", "우호성", "신경성"]
-                    distinctive = []
-                    if candidate_user.big5_z_score is not None:
-                        for z_idx, z_val in enumerate(candidate_user.big5_z_score):
-                            if z_val >= 0.8:
-                                distinctive.append({"name": trait_names_kr[z_idx], "level": "High", "label": "높음", "color": "blue"})
-                            elif z_val <= -0.8:
-                                distinctive.append({"name": trait_names_kr[z_idx], "level": "Low", "label": "낮음", "color": "gray"})
-                    candidates[idx]['relative_traits'] = distinctive[:3]
-
-            return candidates
+            scores = hybrid_matcher.score_all(target_user, candidate_users)
+
+            new_totals = (
+                scores['similarity_score'] * weights['similarity'] +
+                scores['chemistry_score'] * weights['chemistry'] +
+                scores['activity_score'] * weights['activity']
+            )
+            match_scores = np.clip(new_totals * 100, 0, 100).astype(int)
+
+            # 나이 차이 (단위: 일)
+            age_diffs = np.array([
+                abs((target_user.birth_date - cu.birth_date).days)
+                if target_user.birth_date and cu.birth_date else matcher.AGE_DIFF_UNKNOWN
+                for cu in candidate_users
+            ])
+
+            if limit is None:
+                for pos in range(len(candidate_users)):
+                    cls._fill_match_details(
+                        candidates[candidate_indices[pos]], hybrid_matcher, target_user, candidate_users[pos],
+                        scores, pos, int(match_scores[pos]), int(age_diffs[pos])
+                    )
+                return candidates
+
+            # 순위는 입력 후보 전체 기준 (벡터 생성에 실패한 후보는 -inf 점수로 맨 뒤에 두어 limit 미지정 경로와 같은 집합 유지)
+            n = len(candidates)
+            rank_scores = np.full(n, -np.inf)
+            rank_scores[candidate_indices] = match_scores
+            rank_age_diffs = np.full(n, matcher.AGE_DIFF_UNKNOWN)
+            rank_age_diffs[candidate_indices] = age_diffs
+            sort_columns = {
+                'age_difference': rank_age_diffs,
+                'created_at': np.array([matcher.sort_timestamp(c.get('created_at')) for c in candidates]),
+            }
+            ranked = matcher.top_k_indices(rank_scores, limit, tuple(sort_columns[k] for k in tiebreakers))
+
+            # [2단계] 선택된 후보에 대해서만 상세 데이터 구성
+            pos_of = {idx: pos for pos, idx in enumerate(candidate_indices)}
+            for idx in ranked:
+                pos = pos_of.get(int(idx))
+                if pos is not None:
+                    cls._fill_match_details(
+                        candidates[idx], hybrid_matcher, target_user, candidate_users[pos],
+                        scores, pos, int(match_scores[pos]), int(age_diffs[pos])
+                    )
+            return [candidates[idx] for idx in ranked]
 
         except Exception as e:
             logger.exception("Error calculating match scores")
-            return candidates
+            return candidates if limit is None else candidates[:limit]
+
+    @classmethod
+    def _fill_match_details(cls, candidate, hybrid_matcher, target_user, candidate_user, scores, pos, match_score, age_diff):
+        """score_all 결과의 pos번째 후보에 대해 화면 표시용 점수/상세 데이터를 candidate 사전에 기록"""
+        candidate_user.big5_z_score = scores['big5_z'][pos]
+        candidate['match_score'] = match_score
+        candidate['match_details'] = hybrid_matcher.explain_match(target_user, candidate_user, scores, pos)
+        candidate['age_difference'] = age_diff
+
+        # 확장 패널용 데이터 (Big5, 대화량)
+        candidate['my_big5'] = target_user.big5_raw.tolist() if target_user.big5_raw is not None else [50,50,50,50,50]
+        candidate['cand_big5'] = candidate_user.big5_raw.tolist() if candidate_user.big5_raw is not None else [50,50,50,50,50]
+        candidate['my_line_count'] = target_user.line_count or 0
+        candidate['cand_line_count'] = candidate_user.line_count or 0
+
+        # 심리 기능 스택
+        candidate['my_functions'] = matcher.RelationshipBrain.get_function_stack_details(target_user.mbti_type)
+        candidate['cand_functions'] = matcher.RelationshipBrain.get_function_stack_details(candidate_user.mbti_type)
+
+        # 상대적 성향 분석 (Relative Traits)
+        trait_names_kr = ["개방성", "성실성", "외향성", "우호성", "신경성"]
+        distinctive = []
+        if candidate_user.big5_z_score is not None:
+            for z_idx, z_val in enumerate(candidate_user.big5_z_score):
+                if z_val >= 0.8:
+                    distinctive.append({"name": trait_names_kr[z_idx], "level": "High", "label": "높음", "color": "blue"})
+                elif z_val <= -0.8:
+                    distinctive.append({"name": trait_names_kr[z_idx], "level": "Low", "label": "낮음", "color": "gray"})
+        candidate['relative_traits'] = distinctive[:3]
     
     @classmethod
     def _convert_json_to_user_vector(cls, json_data, user_id, birth_date=None, created_at=None):
@@ -536,9 +942,12 @@ class MatchManager:
                 related_entity_id=new_req.request_id
             )
             db.session.add(notification)
-            
+            InboxVersion.bump(sender_id, receiver_id)
+
             db.session.commit()
-            
+            BadgeCache.invalidate(receiver_id)
+            InboxVersion.notify(sender_id, receiver_id)
+
             return {"success": True, "message": "성공적으로 신청을 보냈습니다.", "request_id": new_req.request_id}
 
         except Exception as e:
@@ -572,7 +981,12 @@ class MatchManager:
             noti = Notification(user_id=req.sender_id, message=msg)
             db.session.add(noti)
             
+            InboxVersion.bump(req.sender_id, req.receiver_id)
             db.session.commit()
+            BadgeCache.invalidate(req.sender_id)
+            InboxVersion.notify(req.sender_id, req.receiver_id)
+            if action == 'REJECTED':
+                cls.notify_match_closed(req.sender_id, req.receiver_id)
             return {"success": True, "message": f"매칭 {res_msg} 처리가 완료되었습니다."}
 
         except Exception as e:
@@ -590,6 +1004,17 @@ class MatchManager:
             logger.exception("Error fetching notifications")
             return []
 
+    @classmethod
+    def count_unread_notifications(cls, user_id):
+        """[알림] 읽지 않은 알림 수 (COUNT 쿼리, 헤더 뱃지용)"""
+        from extensions import db, Notification
+        try:
+            return db.session.query(db.func.count(Notification.notification_id))\
+                .filter(Notification.user_id == user_id, Notification.is_read == False).scalar() or 0
+        except Exception as e:
+            logger.exception("Error counting notifications")
+            return 0
+
     @classmethod
     def mark_notifications_as_read(cls, user_id):
         """[알림] 일괄 읽음 처리"""
@@ -597,7 +1022,10 @@ class MatchManager:
         try:
             Notification.query.filter_by(user_id=user_id, is_read=False)\
                 .update({Notification.is_read: True})
+            InboxVersion.bump(user_id)
             db.session.commit()
+            BadgeCache.invalidate(user_id)
+            InboxVersion.notify(user_id)
             return True
         except Exception as e:
             db.session.rollback()
@@ -612,8 +1040,12 @@ class MatchManager:
             if not req:
                 return {"success": False, "message": "존재하지 않는 매칭 ID입니다."}
             
+            pair = (req.sender_id, req.receiver_id)
             db.session.delete(req)
+            InboxVersion.bump(*pair)
             db.session.commit()
+            InboxVersion.notify(*pair)
+            cls.notify_match_closed(*pair)
             return {"success": True, "message": f"매칭(ID: {request_id})이 삭제되었습니다."}
         except Exception as e:
             db.session.rollback()
@@ -36,7 +36,6 @@ import numpy as np
 from dataclasses import dataclass
 from datetime import date, datetime
 from typing import List, Dict, Optional
-from scipy.spatial.distance import cosine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -207,15 +206,84 @@ class RelationshipBrain:
 
         return "Cognitive_Complement (인지적상호작용)"
 
+    # ------------------------------------------------------------------
+    # [사전 계산 테이블] 유형 쌍에 대한 순수 함수 결과를 import 시 한 번만 계산
+    # - UNKNOWN_CODE(알 수 없는 유형, 16)는 각 테이블의 마지막 행/열(중립값)을 가리킵니다.
+    # ------------------------------------------------------------------
+    MBTI_TYPES = tuple(FUNCTION_STACKS.keys())
+    MBTI_INDEX = {t: i for i, t in enumerate(MBTI_TYPES)}
+    SOCIONICS_TYPES = tuple(t for types in QUADRAS.values() for t in types)
+    SOCIONICS_INDEX = {t: i for i, t in enumerate(SOCIONICS_TYPES)}
+    SOCIONICS_QUADRA = {t: q for q, types in QUADRAS.items() for t in types}
+
+    UNKNOWN_CODE = 16  # MBTI/소시오닉스 모두 16유형 -> 코드 0~15, 16은 알 수 없음 (uint8로 저장 가능)
+    UNKNOWN_LABEL = "Unknown (Unknown)"
+
+    CHEMISTRY_TABLE: np.ndarray = None   # (17, 17) float32, MBTI 궁합 점수 (0~1)
+    SOCIONICS_TABLE: np.ndarray = None   # (17, 17) float64, 쿼드라 궁합 점수 (0.4 / 0.5 / 1.0)
+    LABEL_TABLE: List[List[str]] = None          # 16x16 관계 명칭
+    ANALYSIS_TABLE: List[List[dict]] = None      # 16x16 관계 분석 (공유 객체)
+    STACK_DETAILS: List[List[Dict[str, str]]] = None  # 유형별 기능 스택 상세 (공유 객체)
+
+    @classmethod
+    def _build_tables(cls):
+        """모든 유형 쌍의 점수/명칭/분석 결과를 밀집 테이블로 구성합니다. (모듈 로드 시 1회)"""
+        n_mbti = len(cls.MBTI_TYPES)
+        chemistry = np.full((n_mbti + 1, n_mbti + 1), 0.5, dtype=np.float32)
+        labels = [[cls.UNKNOWN_LABEL] * n_mbti for _ in range(n_mbti)]
+        analyses = [[None] * n_mbti for _ in range(n_mbti)]
+
+        for i, a in enumerate(cls.MBTI_TYPES):
+            stack_a = cls.FUNCTION_STACKS[a]
+            for j, b in enumerate(cls.MBTI_TYPES):
+                stack_b = cls.FUNCTION_STACKS[b]
+                chemistry[i, j] = (cls._calculate_dynamic_score(stack_a, stack_b) + 1) / 2
+                labels[i][j] = cls._get_dynamic_relationship_type(stack_a, stack_b)
+                analyses[i][j] = cls._build_relationship_analysis(a, b, labels[i][j])
+
+        n_socio = len(cls.SOCIONICS_TYPES)
+        socionics = np.full((n_socio + 1, n_socio + 1), 0.5)
+        for i, a in enumerate(cls.SOCIONICS_TYPES):
+            for j, b in enumerate(cls.SOCIONICS_TYPES):
+                socionics[i, j] = 1.0 if cls.SOCIONICS_QUADRA[a] == cls.SOCIONICS_QUADRA[b] else 0.4
+
+        chemistry.setflags(write=False)
+        socionics.setflags(write=False)
+        cls.CHEMISTRY_TABLE = chemistry
+        cls.SOCIONICS_TABLE = socionics
+        cls.LABEL_TABLE = labels
+        cls.ANALYSIS_TABLE = analyses
+        cls.STACK_DETAILS = [cls._build_function_stack_details(t) for t in cls.MBTI_TYPES]
+
+    @staticmethod
+    def mbti_code(mbti_type: Optional[str]) -> int:
+        """MBTI 유형 문자열 -> 테이블 인덱스 (알 수 없는 유형은 UNKNOWN_CODE)"""
+        if not mbti_type:
+            return RelationshipBrain.UNKNOWN_CODE
+        return RelationshipBrain.MBTI_INDEX.get(str(mbti_type).upper(), RelationshipBrain.UNKNOWN_CODE)
+
+    @staticmethod
+    def socionics_code(socionics_type: Optional[str]) -> int:
+        """소시오닉스 유형 문자열 -> 테이블 인덱스 (알 수 없는 유형은 UNKNOWN_CODE)"""
+        if not socionics_type:
+            return RelationshipBrain.UNKNOWN_CODE
+        return RelationshipBrain.SOCIONICS_INDEX.get(str(socionics_type).upper(), RelationshipBrain.UNKNOWN_CODE)
+
+    @staticmethod
+    def encode_mbti(types) -> np.ndarray:
+        """MBTI 유형 목록을 uint8 코드 배열로 변환"""
+        return np.fromiter((RelationshipBrain.mbti_code(t) for t in types), dtype=np.uint8)
+
+    @staticmethod
+    def encode_socionics(types) -> np.ndarray:
+        """소시오닉스 유형 목록을 uint8 코드 배열로 변환"""
+        return np.fromiter((RelationshipBrain.socionics_code(t) for t in types), dtype=np.uint8)
+
     @staticmethod
     def get_chemistry_score(type_a: str, type_b: str) -> float:
-        a = type_a.upper(); b = type_b.upper()
-        if len(a) != 4 or len(b) != 4 or 'X' in a or 'X' in b: return 0.5
-        stack_a = RelationshipBrain.FUNCTION_STACKS.get(a)
-        stack_b = RelationshipBrain.FUNCTION_STACKS.get(b)
-        if not stack_a or not stack_b: return 0.5
-        raw_score = RelationshipBrain._calculate_dynamic_score(stack_a, stack_b)
-        return (raw_score + 1) / 2
+        i = RelationshipBrain.mbti_code(type_a)
+        j = RelationshipBrain.mbti_code(type_b)
+        return float(RelationshipBrain.CHEMISTRY_TABLE[i, j])
 
     @staticmethod
     def get_socionics_details(type_a: str, type_b: str) -> dict:
@@ -223,48 +291,34 @@ class RelationshipBrain:
         if not type_a or not type_b or type_a == "UNK" or type_b == "UNK":
             return {"score": 0.5, "quadra_a": None, "quadra_b": None, "is_same": False}
 
-        quadra_a = None
-        quadra_b = None
-        type_a_upper = type_a.upper()
-        type_b_upper = type_b.upper()
-
-        for q_name, types in RelationshipBrain.QUADRAS.items(): # noqa
-            if type_a_upper in types:
-                quadra_a = q_name
-            if type_b_upper in types:
-                quadra_b = q_name
-
-        score = 0.5
-        if quadra_a and quadra_a == quadra_b:
-            score = 1.0
-        elif quadra_a and quadra_b:
-            score = 0.4
+        quadra_a = RelationshipBrain.SOCIONICS_QUADRA.get(type_a.upper())
+        quadra_b = RelationshipBrain.SOCIONICS_QUADRA.get(type_b.upper())
+        i = RelationshipBrain.socionics_code(type_a)
+        j = RelationshipBrain.socionics_code(type_b)
+        score = float(RelationshipBrain.SOCIONICS_TABLE[i, j])
 
         return {"score": score, "quadra_a": quadra_a, "quadra_b": quadra_b, "is_same": (quadra_a is not None and quadra_a == quadra_b)}
 
 
     @staticmethod
     def get_relationship_label(type_a: str, type_b: str) -> str:
-        a = type_a.upper(); b = type_b.upper()
-        if len(a) != 4 or len(b) != 4 or 'X' in a or 'X' in b: return "Unknown (Unknown)"
-        stack_a = RelationshipBrain.FUNCTION_STACKS.get(a)
-        stack_b = RelationshipBrain.FUNCTION_STACKS.get(b)
-        if not stack_a or not stack_b: return "Unknown (Unknown)"
-
-        relation_key = RelationshipBrain._get_dynamic_relationship_type(stack_a, stack_b)
-        return relation_key
+        i = RelationshipBrain.mbti_code(type_a)
+        j = RelationshipBrain.mbti_code(type_b)
+        if RelationshipBrain.UNKNOWN_CODE in (i, j): return RelationshipBrain.UNKNOWN_LABEL
+        return RelationshipBrain.LABEL_TABLE[i][j]
 
     @staticmethod
     def get_relationship_analysis(type_a: str, type_b: str) -> dict:
-        a = type_a.upper(); b = type_b.upper()
-        if len(a) != 4 or len(b) != 4 or 'X' in a or 'X' in b: return {}
-        stack_a = RelationshipBrain.FUNCTION_STACKS.get(a)
-        stack_b = RelationshipBrain.FUNCTION_STACKS.get(b)
-        if not stack_a or not stack_b: return {}
+        """관계 분석 결과 (사전 계산된 공유 객체이므로 호출 측에서 수정하지 않습니다)"""
+        i = RelationshipBrain.mbti_code(type_a)
+        j = RelationshipBrain.mbti_code(type_b)
+        if RelationshipBrain.UNKNOWN_CODE in (i, j): return {}
+        return RelationshipBrain.ANALYSIS_TABLE[i][j]
 
-        relation_type = RelationshipBrain._get_dynamic_relationship_type(stack_a, stack_b)
-        P1, A1, T1, I1 = stack_a
-        P2, A2, T2, I2 = stack_b
+    @staticmethod
+    def _build_relationship_analysis(a: str, b: str, relation_type: str) -> dict:
+        P1, A1, T1, I1 = RelationshipBrain.FUNCTION_STACKS[a]
+        P2, A2, T2, I2 = RelationshipBrain.FUNCTION_STACKS[b]
 
         return {
             "type": relation_type,
@@ -279,9 +333,14 @@ class RelationshipBrain:
 
     @staticmethod
     def get_function_stack_details(mbti_type: str) -> Optional[List[Dict[str, str]]]:
-        mbti = mbti_type.upper()
-        if mbti not in RelationshipBrain.FUNCTION_STACKS:
+        """기능 스택 상세 (사전 계산된 공유 객체이므로 호출 측에서 수정하지 않습니다)"""
+        i = RelationshipBrain.mbti_code(mbti_type)
+        if i == RelationshipBrain.UNKNOWN_CODE:
             return None
+        return RelationshipBrain.STACK_DETAILS[i]
+
+    @staticmethod
+    def _build_function_stack_details(mbti: str) -> List[Dict[str, str]]:
         stack = RelationshipBrain.FUNCTION_STACKS[mbti]
         func_P, func_A, func_T, func_I = stack
 
@@ -302,16 +361,27 @@ class RelationshipBrain:
              "function": func_I,
              "description": RelationshipBrain.FUNCTION_DESCRIPTIONS.get(func_I, {}).get("inferior", "")}
         ]
+
+
+RelationshipBrain._build_tables()
+
 # ----------------------------
 # 3. 매칭 엔진 (Matching Engine)
 # ----------------------------
 class HybridMatcher:
 
-    def __init__(self, candidates: List[UserVector]):
+    def __init__(self, candidates: List[UserVector], population_stats: Optional[tuple] = None):
+        """
+        population_stats: 외부에서 유지하는 (평균, 표준편차) 통계.
+                          지정하면 후보군으로부터 통계를 다시 계산하지 않습니다.
+        """
         self.candidates = candidates
         self.stats_mean = np.array([50.0]*5)
         self.stats_std = np.array([15.0]*5)
-        self._calculate_population_stats()
+        if population_stats is not None:
+            self.stats_mean, self.stats_std = population_stats
+        else:
+            self._calculate_population_stats()
 
     def _calculate_population_stats(self):
         """전체 후보군의 Big5 분포(평균, 표준편차) 계산"""
@@ -329,8 +399,12 @@ class HybridMatcher:
 
     def normalize_user(self, user: UserVector):
         """Z-Score 정규화"""
-        z_scores = (user.big5_raw - self.stats_mean) / self.stats_std
-        user.big5_z_score = np.clip(z_scores, -3.0, 3.0)
+        user.big5_z_score = self.normalize_matrix(user.big5_raw)
+
+    def normalize_matrix(self, big5_raw: np.ndarray) -> np.ndarray:
+        """Big5 원점수 벡터 또는 (N, 5) 행렬을 한 번에 Z-Score로 변환"""
+        z_scores = (np.asarray(big5_raw, dtype=float) - self.stats_mean) / self.stats_std
+        return np.clip(z_scores, -3.0, 3.0)
 
     def calculate_activity_score(self, count_a: int, count_b: int) -> float:
         """
@@ -338,91 +412,186 @@ class HybridMatcher:
         - 파싱된 라인 수(parsed_lines)가 비슷할수록 높은 점수.
         - 데이터가 너무 적을 경우(10줄 미만) 중립 점수(0.5) 반환.
         """
-        if count_a is None: count_a = 0
-        if count_b is None: count_b = 0
+        return float(self.activity_vector(count_a, np.array([count_b or 0]))[0])
 
-        if count_a < 10 or count_b < 10:
-            return 0.5
+    @staticmethod
+    def activity_vector(count_a: int, counts_b: np.ndarray) -> np.ndarray:
+        """
+        [활동성 점수 - 벡터]
+        calculate_activity_score와 동일한 공식을 후보 전체(counts_b)에 한 번에 적용합니다.
+        공식: 1 / (log2(비율) + 1), 비율이 1이면(동일하면) 1.0, 3배 차이나면 약 0.5
+        """
+        counts_b = np.asarray(counts_b, dtype=float)
+        scores = np.full(counts_b.shape, 0.5)
 
-        a = max(count_a, 10)
-        b = max(count_b, 10)
+        count_a = float(count_a or 0)
+        if count_a < 10:
+            return scores
 
+        valid = counts_b >= 10
+        b = counts_b[valid]
         # 로그 비율 (Log Ratio) 사용
-        ratio = max(a, b) / min(a, b)
+        ratio = np.maximum(count_a, b) / np.minimum(count_a, b)
+        scores[valid] = np.clip(1.0 / (np.log2(ratio) + 1.0), 0.0, 1.0)
+        return scores
 
-        # 공식: 1 / log2(비율 + 1)
-        # 비율이 1이면(동일하면) 1.0, 비율이 3배 차이나면 약 0.5
-        score = 1.0 / (np.log2(ratio) + 1.0)
+    def score_all(self, target: UserVector, pool: List[UserVector]) -> Dict[str, np.ndarray]:
+        """
+        [일괄 매칭 점수 산출]
+        calculate_match_score와 동일한 공식을 후보군 전체에 NumPy 배열 연산으로 적용합니다.
+        공식: Score = (Similarity * 0.5) + (Chemistry * 0.4) + (Activity * 0.1)
 
-        return max(0.0, min(1.0, score))
+        Returns:
+            dict: 각 키가 후보 순서와 같은 길이의 배열인 점수 사전
+                  (big5_z는 (N, 5) Z-Score 행렬)
+        """
+        n = len(pool)
+        big5_raw = np.array([u.big5_raw for u in pool], dtype=float).reshape(n, 5)
+        return self.score_columns(
+            target,
+            big5_z=self.normalize_matrix(big5_raw),
+            mbti_codes=RelationshipBrain.encode_mbti(u.mbti_type for u in pool),
+            socio_codes=RelationshipBrain.encode_socionics(u.socionics_type for u in pool),
+            mbti_conf=np.array([u.mbti_conf or 0.0 for u in pool], dtype=float),
+            socio_conf=np.array([u.socionics_conf or 0.0 for u in pool], dtype=float),
+            line_counts=np.array([u.line_count or 0 for u in pool], dtype=float),
+        )
 
-    def calculate_match_score(self, target: UserVector, candidate: UserVector) -> Dict[str, float]:
+    def score_columns(self, target: UserVector, big5_z: np.ndarray, mbti_codes: np.ndarray,
+                      socio_codes: np.ndarray, mbti_conf: np.ndarray, socio_conf: np.ndarray,
+                      line_counts: np.ndarray) -> Dict[str, np.ndarray]:
         """
-        [최종 매칭 점수 산출]
-        공식: Score = (Similarity * 0.5) + (Chemistry * 0.4) + (Activity * 0.1)
+        [일괄 매칭 점수 산출 - 열 단위 입력]
+        후보 데이터를 열(column) 배열로 직접 받아 채점합니다. (후보 저장소 등 UserVector 없이 호출하는 경로용)
+        big5_z는 이 매처의 통계로 정규화된 (N, 5) 행렬이어야 합니다.
         """
+        n = big5_z.shape[0]
 
         # --- [A] Similarity Score (50%) ---
-        # Big5 Z-Score 기반 코사인 유사도
-        # Zero Vector (모든 값이 평균이라 0인 경우) 예외 처리
-        try:
-            dist = cosine(target.big5_z_score, candidate.big5_z_score)
-            if np.isnan(dist):
-                cos_sim = 0.0
-            else:
-                cos_sim = 1 - dist
-        except Exception:
-            cos_sim = 0.0
+        # Big5 Z-Score 행렬 기반 코사인 유사도
+        target_z = self.normalize_matrix(target.big5_raw)
 
-        similarity_score = (cos_sim + 1) / 2
+        dots = big5_z @ target_z
+        norms = np.linalg.norm(big5_z, axis=1) * np.linalg.norm(target_z)
+        # Zero Vector (모든 값이 평균이라 0인 경우) 예외 처리
+        cos_sim = np.zeros(n)
+        nonzero = norms > 0
+        cos_sim[nonzero] = np.clip(dots[nonzero] / norms[nonzero], -1.0, 1.0)
+        similarity = (cos_sim + 1) / 2
 
         # --- [B] Chemistry Score (40%) ---
-        # B-1. MBTI 궁합
-        mbti_chem = RelationshipBrain.get_chemistry_score(target.mbti_type, candidate.mbti_type) # 새로운 엔진 호출
-        mbti_label = RelationshipBrain.get_relationship_label(target.mbti_type, candidate.mbti_type)
+        # B-1. MBTI 궁합, B-2. 소시오닉스 쿼드라 궁합 (사전 계산 테이블 인덱싱)
+        target_mbti = RelationshipBrain.mbti_code(target.mbti_type)
+        target_socio = RelationshipBrain.socionics_code(target.socionics_type)
+        mbti_chem = RelationshipBrain.CHEMISTRY_TABLE[target_mbti, mbti_codes].astype(float)
+        socio_chem = RelationshipBrain.SOCIONICS_TABLE[target_socio, socio_codes].astype(float)
 
-        # B-2. 소시오닉스 쿼드라 궁합
-        socio_details = RelationshipBrain.get_socionics_details(target.socionics_type, candidate.socionics_type)
-        socio_chem = socio_details["score"]
-        target_quadra = socio_details["quadra_a"]
-        candidate_quadra = socio_details["quadra_b"]
-        socio_quadra_same = socio_details["is_same"]
         # 신뢰도 가중 평균
-        w_m = (target.mbti_conf * candidate.mbti_conf) ** 0.5
-        w_s = (target.socionics_conf * candidate.socionics_conf) ** 0.5
-
-        weight_sum = w_m + w_s + 1e-9
-        chemistry_score = ((mbti_chem * w_m) + (socio_chem * w_s)) / weight_sum
+        w_m = np.sqrt(float(target.mbti_conf or 0.0) * mbti_conf)
+        w_s = np.sqrt(float(target.socionics_conf or 0.0) * socio_conf)
+        chemistry = ((mbti_chem * w_m) + (socio_chem * w_s)) / (w_m + w_s + 1e-9)
 
         # --- [C] Activity Score (10%) ---
-        activity_score = self.calculate_activity_score(target.line_count, candidate.line_count)
+        activity = self.activity_vector(target.line_count, line_counts)
 
         # --- [D] 최종 합산 ---
-        final_score = (similarity_score * 0.5) + (chemistry_score * 0.4) + (activity_score * 0.1)
+        total = (similarity * 0.5) + (chemistry * 0.4) + (activity * 0.1)
 
         return {
-            "total_score": final_score,
-            "similarity_score": similarity_score,
-            "chemistry_score": chemistry_score,
-            "activity_score": activity_score,
+            "total_score": total,
+            "similarity_score": similarity,
+            "chemistry_score": chemistry,
+            "activity_score": activity,
             "mbti_detail": mbti_chem,
             "socio_detail": socio_chem,
+            "mbti_weight": w_m,
+            "socio_weight": w_s,
+            "cos_sim_raw": cos_sim,
+            "big5_z": big5_z,
+            "mbti_code": mbti_codes,
+        }
+
+    def explain_match(self, target: UserVector, candidate: UserVector,
+                      scores: Dict[str, np.ndarray], idx: int) -> Dict[str, float]:
+        """score_all 결과의 idx번째 후보에 대해 확장 패널용 상세 결과 사전을 구성합니다."""
+        socio_details = RelationshipBrain.get_socionics_details(target.socionics_type, candidate.socionics_type)
+        target_code = RelationshipBrain.mbti_code(target.mbti_type)
+        cand_code = int(scores["mbti_code"][idx])
+        if RelationshipBrain.UNKNOWN_CODE not in (target_code, cand_code):
+            mbti_label = RelationshipBrain.LABEL_TABLE[target_code][cand_code]
+            relationship_analysis = RelationshipBrain.ANALYSIS_TABLE[target_code][cand_code]
+        else:
+            mbti_label, relationship_analysis = RelationshipBrain.UNKNOWN_LABEL, {}
+
+        return {
+            "total_score": float(scores["total_score"][idx]),
+            "similarity_score": float(scores["similarity_score"][idx]),
+            "chemistry_score": float(scores["chemistry_score"][idx]),
+            "activity_score": float(scores["activity_score"][idx]),
+            "mbti_detail": float(scores["mbti_detail"][idx]),
+            "socio_detail": float(scores["socio_detail"][idx]),
 
             # 확장 패널용 추가 데이터
             "mbti_label": mbti_label,
             "target_mbti": target.mbti_type,
             "candidate_mbti": candidate.mbti_type,
-            "relationship_analysis": RelationshipBrain.get_relationship_analysis(target.mbti_type, candidate.mbti_type),
-            "socio_quadra_same": socio_quadra_same,
-            "target_quadra": target_quadra,
-            "candidate_quadra": candidate_quadra,
+            "relationship_analysis": relationship_analysis,
+            "socio_quadra_same": socio_details["is_same"],
+            "target_quadra": socio_details["quadra_a"],
+            "candidate_quadra": socio_details["quadra_b"],
             "target_socio": target.socionics_type,
             "candidate_socio": candidate.socionics_type,
-            "mbti_weight": float(w_m),
-            "socio_weight": float(w_s),
-            "cos_sim_raw": float(cos_sim),
+            "mbti_weight": float(scores["mbti_weight"][idx]),
+            "socio_weight": float(scores["socio_weight"][idx]),
+            "cos_sim_raw": float(scores["cos_sim_raw"][idx]),
         }
 
+    def calculate_match_score(self, target: UserVector, candidate: UserVector) -> Dict[str, float]:
+        """
+        [최종 매칭 점수 산출] 단일 후보용 (score_all과 동일한 공식 사용)
+        공식: Score = (Similarity * 0.5) + (Chemistry * 0.4) + (Activity * 0.1)
+        """
+        scores = self.score_all(target, [candidate])
+        return self.explain_match(target, candidate, scores, 0)
+
+# ----------------------------
+# 3-1. 상위 K 선택 (Top-K Selection)
+# ----------------------------
+# 정렬 기준: 점수(내림) -> 나이차(오름) -> 가입일(오름)
+# 전체 정렬(N log N) 대신 부분 선택으로 비용이 k에 비례하도록 합니다.
+
+AGE_DIFF_UNKNOWN = 999999  # 날짜 정보 없을 시 후순위로 밀기 위한 큰 값
+
+
+def sort_timestamp(dt: Optional[datetime]) -> float:
+    """가입일을 정렬용 숫자로 변환 (없으면 맨 뒤로)"""
+    return dt.timestamp() if dt else float("inf")
+
+
+def top_k_indices(scores: np.ndarray, k: Optional[int] = None, tiebreakers=()) -> np.ndarray:
+    """
+    [상위 K 선택 - 배열]
+    점수 내림차순, 동점 시 tiebreakers(오름차순, 앞쪽이 우선) 순서의 상위 k개 인덱스를 반환합니다.
+    argpartition으로 k번째 점수(임계값)를 구한 뒤 임계값 이상인 후보(경계 동점자 포함)만
+    정렬하므로, 동점자 처리는 전체 정렬과 동일하면서 비용은 O(N + m log m)입니다.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    if k is not None and k <= 0:
+        return np.zeros(0, dtype=np.intp)
+
+    if k is None or k >= n:
+        pool = np.arange(n)
+    else:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]  # k번째로 큰 점수
+        pool = np.flatnonzero(scores >= kth)
+
+    # np.lexsort는 마지막 키가 1순위 (원래 순서를 최후 기준으로 두어 안정 정렬과 동일하게 유지)
+    keys = [pool] + [np.asarray(t)[pool] for t in reversed(tiebreakers)] + [-scores[pool]]
+    order = pool[np.lexsort(keys)]
+    return order if k is None else order[:k]
+
+
 # ----------------------------
 # 4. 실행 및 리포트 (Execution)
 # ----------------------------
@@ -490,6 +659,7 @@ def main():
     parser.add_argument("--target", required=True, help="타겟 프로필 JSON 경로")
     parser.add_argument("--db", required=True, help="후보군 폴더 경로")
     parser.add_argument("--output", help="결과 JSON 저장 경로", default=None)
+    parser.add_argument("--top", type=int, help="상위 N명만 출력 (기본: 전체)", default=None)
     args = parser.parse_args()
 
     # 1. 로드
@@ -515,7 +685,6 @@ def main():
     matcher = HybridMatcher(candidates + [target_user])
     # 통계 계산 후 타겟 정규화
     matcher.normalize_user(target_user)
-    for c in candidates: matcher.normalize_user(c)
 
     # 3. 결과 산출
     results = []
@@ -542,25 +711,23 @@ def main():
     )
     print("-" * 115)
 
-    for c in candidates:
-        res = matcher.calculate_match_score(target_user, c)
+    scores = matcher.score_all(target_user, candidates)
 
-        # 나이 차이 계산 (단위: 일)
-        age_diff = 999999  # 날짜 정보 없을 시 후순위로 밀기 위한 큰 값
-        if target_user.birth_date and c.birth_date:
-            delta = target_user.birth_date - c.birth_date
-            age_diff = abs(delta.days)
-        res['age_difference'] = age_diff
-
-        results.append({"cand": c, "res": res})
+    age_diffs = np.array([
+        abs((target_user.birth_date - c.birth_date).days)
+        if target_user.birth_date and c.birth_date else AGE_DIFF_UNKNOWN
+        for c in candidates
+    ])
+    created_ts = np.array([sort_timestamp(c.created_at) for c in candidates])
 
     # 점수 동일 시 나이 차이 적은 순, 그 다음 가입일 순으로 정렬
     # (점수 내림차순, 나이차 오름차순, 가입일 오름차순)
-    results.sort(key=lambda x: (
-        -x['res']['total_score'], 
-        x['res']['age_difference'],
-        x['cand'].created_at or datetime.max # 가입일 없으면 맨 뒤로
-    ))
+    top = top_k_indices(scores['total_score'], args.top, (age_diffs, created_ts))
+    for pos in top:
+        c = candidates[pos]
+        res = matcher.explain_match(target_user, c, scores, pos)
+        res['age_difference'] = int(age_diffs[pos])
+        results.append({"cand": c, "res": res})
 
     for idx, r in enumerate(results):
         c = r['cand']
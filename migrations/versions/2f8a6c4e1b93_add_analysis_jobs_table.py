@@ -0,0 +1,50 @@
+"""Add analysis_jobs table for background chat-log analysis
+
+Revision ID: 2f8a6c4e1b93
+Revises: 9d3f6a1c8e25
+Create Date: 2026-10-17 08:02:44.718306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f8a6c4e1b93'
+down_revision = '9d3f6a1c8e25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py 직접 실행 시 db.create_all()이 먼저 만들었을 수 있음
+    if 'analysis_jobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table('analysis_jobs',
+    sa.Column('job_id', sa.Integer(), nullable=False),
+    sa.Column('job_code', sa.String(length=32), nullable=False),
+    sa.Column('log_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='analysisjobstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.String(length=100), nullable=True),
+    sa.Column('error_message', sa.String(length=500), nullable=True),
+    sa.Column('result_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['log_id'], ['chat_logs.log_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['result_id'], ['personality_results.result_id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('job_id'),
+    sa.UniqueConstraint('job_code')
+    )
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_analysis_jobs_status_created', ['status', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_analysis_jobs_status_created')
+
+    op.drop_table('analysis_jobs')
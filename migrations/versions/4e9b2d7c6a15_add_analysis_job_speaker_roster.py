@@ -0,0 +1,35 @@
+"""Add speaker roster and AWAITING_SPEAKER status to analysis_jobs
+
+Revision ID: 4e9b2d7c6a15
+Revises: 7c1d5e3a9f42
+Create Date: 2026-10-17 09:36:52.481170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9b2d7c6a15'
+down_revision = '7c1d5e3a9f42'
+branch_labels = None
+depends_on = None
+
+OLD_STATUS = sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='analysisjobstatus')
+NEW_STATUS = sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', 'AWAITING_SPEAKER', name='analysisjobstatus')
+
+
+def upgrade():
+    # app.py의 check_and_update_db_schema가 먼저 추가했을 수 있음
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('analysis_jobs')}
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.alter_column('status', existing_type=OLD_STATUS, type_=NEW_STATUS, existing_nullable=False)
+        if 'speaker_roster' not in existing:
+            batch_op.add_column(sa.Column('speaker_roster', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.execute("UPDATE analysis_jobs SET status = 'FAILED' WHERE status = 'AWAITING_SPEAKER'")
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_column('speaker_roster')
+        batch_op.alter_column('status', existing_type=NEW_STATUS, type_=OLD_STATUS, existing_nullable=False)
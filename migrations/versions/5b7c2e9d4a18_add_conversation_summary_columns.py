@@ -0,0 +1,75 @@
+"""Add denormalized unread counters and last-message columns to conversations
+
+Revision ID: 5b7c2e9d4a18
+Revises: 8e2d4b6a1f37
+Create Date: 2026-10-17 06:41:27.530912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7c2e9d4a18'
+down_revision = '8e2d4b6a1f37'
+branch_labels = None
+depends_on = None
+
+# (테이블, 참여자별 안 읽은 수 컬럼)
+# app.py의 check_and_update_db_schema가 먼저 컬럼을 추가한 DB도 있으므로 없는 컬럼만 추가
+TABLES = [
+    ('match_requests', ('sender_unread_count', 'receiver_unread_count')),
+    ('blind_matches', ('user1_unread_count', 'user2_unread_count')),
+]
+
+BACKFILL = [
+    """UPDATE match_requests SET
+        sender_unread_count = (SELECT COUNT(*) FROM messages m WHERE m.request_id = match_requests.request_id
+                               AND m.sender_id = match_requests.receiver_id AND m.is_read = 0),
+        receiver_unread_count = (SELECT COUNT(*) FROM messages m WHERE m.request_id = match_requests.request_id
+                                 AND m.sender_id = match_requests.sender_id AND m.is_read = 0),
+        last_message_id = (SELECT MAX(m.id) FROM messages m WHERE m.request_id = match_requests.request_id)""",
+    """UPDATE match_requests SET
+        last_message_preview = (SELECT SUBSTR(m.content, 1, 100) FROM messages m WHERE m.id = match_requests.last_message_id),
+        last_message_at = (SELECT m.created_at FROM messages m WHERE m.id = match_requests.last_message_id)
+      WHERE last_message_id IS NOT NULL""",
+    """UPDATE blind_matches SET
+        user1_unread_count = (SELECT COUNT(*) FROM blind_match_messages m WHERE m.match_id = blind_matches.id
+                              AND m.sender_id = blind_matches.user2_id AND m.is_read = 0),
+        user2_unread_count = (SELECT COUNT(*) FROM blind_match_messages m WHERE m.match_id = blind_matches.id
+                              AND m.sender_id = blind_matches.user1_id AND m.is_read = 0),
+        last_message_id = (SELECT MAX(m.id) FROM blind_match_messages m WHERE m.match_id = blind_matches.id)""",
+    """UPDATE blind_matches SET
+        last_message_preview = (SELECT SUBSTR(m.content, 1, 100) FROM blind_match_messages m WHERE m.id = blind_matches.last_message_id),
+        last_message_at = (SELECT m.created_at FROM blind_match_messages m WHERE m.id = blind_matches.last_message_id)
+      WHERE last_message_id IS NOT NULL""",
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table, unread_cols in TABLES:
+        existing = {col['name'] for col in inspector.get_columns(table)}
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for col in unread_cols:
+                if col not in existing:
+                    batch_op.add_column(sa.Column(col, sa.Integer(), nullable=False, server_default='0'))
+            if 'last_message_id' not in existing:
+                batch_op.add_column(sa.Column('last_message_id', sa.Integer(), nullable=True))
+            if 'last_message_preview' not in existing:
+                batch_op.add_column(sa.Column('last_message_preview', sa.String(length=200), nullable=True))
+            if 'last_message_at' not in existing:
+                batch_op.add_column(sa.Column('last_message_at', sa.DateTime(), nullable=True))
+
+    for stmt in BACKFILL:
+        op.execute(stmt)
+
+
+def downgrade():
+    for table, unread_cols in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('last_message_at')
+            batch_op.drop_column('last_message_preview')
+            batch_op.drop_column('last_message_id')
+            for col in reversed(unread_cols):
+                batch_op.drop_column(col)
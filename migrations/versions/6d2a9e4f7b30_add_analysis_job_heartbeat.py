@@ -0,0 +1,30 @@
+"""Add analysis_jobs.heartbeat_at for detecting dead analysis workers
+
+Revision ID: 6d2a9e4f7b30
+Revises: 4e9b2d7c6a15
+Create Date: 2026-10-17 10:12:08.540917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2a9e4f7b30'
+down_revision = '4e9b2d7c6a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py의 check_and_update_db_schema가 먼저 추가했을 수 있음
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('analysis_jobs')}
+    if 'heartbeat_at' in existing:
+        return
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('analysis_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
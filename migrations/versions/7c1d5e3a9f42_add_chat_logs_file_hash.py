@@ -0,0 +1,30 @@
+"""Add chat_logs.file_hash for content-addressed analysis cache
+
+Revision ID: 7c1d5e3a9f42
+Revises: 2f8a6c4e1b93
+Create Date: 2026-10-17 08:47:19.035821
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1d5e3a9f42'
+down_revision = '2f8a6c4e1b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py의 check_and_update_db_schema가 먼저 추가했을 수 있음
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('chat_logs')}
+    if 'file_hash' in existing:
+        return
+    with op.batch_alter_table('chat_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('file_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chat_logs', schema=None) as batch_op:
+        batch_op.drop_column('file_hash')
@@ -0,0 +1,46 @@
+"""Add composite indexes for hot query paths
+
+Revision ID: 8e2d4b6a1f37
+Revises: 3c9f1e7a2b64
+Create Date: 2026-10-17 05:20:43.902115
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2d4b6a1f37'
+down_revision = '3c9f1e7a2b64'
+branch_labels = None
+depends_on = None
+
+# (테이블, 인덱스 이름, 컬럼) - extensions.py의 __table_args__와 동일하게 유지
+INDEXES = [
+    ('messages', 'ix_messages_request_created', ['request_id', 'created_at']),
+    ('messages', 'ix_messages_request_sender_read', ['request_id', 'sender_id', 'is_read']),
+    ('notifications', 'ix_notifications_user_read', ['user_id', 'is_read']),
+    ('match_requests', 'ix_match_requests_sender_status', ['sender_id', 'status']),
+    ('match_requests', 'ix_match_requests_receiver_status', ['receiver_id', 'status']),
+    ('personality_results', 'ix_personality_results_user_rep', ['user_id', 'is_representative']),
+    ('group_chat_messages', 'ix_group_chat_messages_room_id', ['room_id', 'id']),
+    ('blind_match_messages', 'ix_blind_match_messages_match_created', ['match_id', 'created_at']),
+    ('user_activity_logs', 'ix_user_activity_logs_user_timestamp', ['user_id', 'timestamp']),
+]
+
+
+def upgrade():
+    # db.create_all()이 모델의 __table_args__로 이미 만든 인덱스는 건너뜀
+    inspector = sa.inspect(op.get_bind())
+    for table, name, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name in existing:
+            continue
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
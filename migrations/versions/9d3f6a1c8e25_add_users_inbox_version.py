@@ -0,0 +1,30 @@
+"""Add users.inbox_version for conditional inbox polling
+
+Revision ID: 9d3f6a1c8e25
+Revises: 5b7c2e9d4a18
+Create Date: 2026-10-17 07:18:05.264419
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6a1c8e25'
+down_revision = '5b7c2e9d4a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py의 check_and_update_db_schema가 먼저 추가했을 수 있음
+    existing = {col['name'] for col in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'inbox_version' in existing:
+        return
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('inbox_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('inbox_version')
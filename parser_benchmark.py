@@ -0,0 +1,103 @@
+# parser_benchmark.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 카카오톡 내보내기 파서 처리량 측정
+======================================================================
+내보내기 형식(pc / mobile_en / mobile_ko)별 합성 파일을 만들어
+parse_target_rows(대상자 한 명)와 parse_all_speakers(전체 화자)의 초당 처리 줄 수를 출력합니다.
+합성 파일은 단체 대화방처럼 화자 여러 명, 여러 줄 메시지, 날짜 구분선, 시스템 메시지를 섞어 만듭니다.
+
+사용법:
+    python parser_benchmark.py                  # 형식별 100만 줄
+    python parser_benchmark.py --lines 200000 --repeat 3 --format pc
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+
+import main as analyzer
+
+SPEAKERS = ["지영", "민수", "서연", "준호", "하은", "도윤", "Alice", "김 철수", "수아", "현우"]
+TEXTS = [
+    "오늘 저녁 뭐 먹을래?", "ㅋㅋㅋㅋ 그거 진짜 웃기다", "사진", "이모티콘", "내일 회의 3시로 옮겨졌어요",
+    "010-1234-5678 로 연락 주세요", "https://example.com/notice 공지 확인해 주세요", "ㅠㅠ 너무 피곤해",
+    "주말에 등산 갈 사람?", "좋아요! 저도 갈게요", "삭제된 메시지입니다.", "아 그거 어제 얘기했던 거 맞지?",
+]
+CONTINUATIONS = ["그리고 하나 더", "2차는 근처에서", "- 준비물: 물, 간식", ""]
+
+
+def _message_line(fmt, rng, speaker, minute):
+    text = rng.choice(TEXTS)
+    hour = 1 + minute // 60 % 12
+    if fmt == "pc":
+        return f"[{speaker}] [오후 {hour}:{minute % 60:02d}] {text}"
+    if fmt == "mobile_en":
+        return f"2024. 5. {1 + minute // 1440 % 28}. 오후 {hour}:{minute % 60:02d}, {speaker} : {text}"
+    return f"2024년 5월 {1 + minute // 1440 % 28}일 오후 {hour}:{minute % 60:02d}, {speaker} : {text}"
+
+
+def write_synthetic_export(path, fmt, lines, seed=0):
+    """형식 fmt의 합성 대화 파일을 lines줄로 씁니다."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("단체방 님과 카카오톡 대화\n저장한 날짜 : 2024-06-01 12:00:00\n\n")
+        written, minute = 3, 0
+        while written < lines:
+            if written % 200 == 0:
+                f.write(f"2024년 5월 {1 + minute // 1440 % 28}일 수요일\n")
+            elif rng.random() < 0.08:
+                f.write(rng.choice(CONTINUATIONS) + "\n")
+            else:
+                minute += 1
+                f.write(_message_line(fmt, rng, rng.choice(SPEAKERS), minute) + "\n")
+            written += 1
+
+
+def benchmark(path, repeat=1):
+    """파일 하나에 대한 {"target_lps", "all_lps", "speakers"} (repeat회 중 최고 기록)"""
+    target_best, all_best, speakers = float("inf"), float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        _, quality = analyzer.parse_target_rows(path, SPEAKERS[0])
+        target_best = min(target_best, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        speakers = len(analyzer.parse_all_speakers(path).roster())
+        all_best = min(all_best, time.perf_counter() - t0)
+
+    total = quality.total_lines
+    return {
+        "lines": total,
+        "mb": os.path.getsize(path) / 1024 / 1024,
+        "target_lps": total / target_best,
+        "all_lps": total / all_best,
+        "speakers": speakers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EchoMind 카카오톡 파서 처리량 측정")
+    parser.add_argument("--lines", type=int, default=1_000_000, help="형식별 합성 파일 줄 수")
+    parser.add_argument("--repeat", type=int, default=1, help="반복 측정 횟수 (최고 기록 사용)")
+    parser.add_argument("--format", choices=list(analyzer.EXPORT_FORMATS), nargs="+",
+                        default=list(analyzer.EXPORT_FORMATS), help="측정할 내보내기 형식")
+    args = parser.parse_args()
+
+    print(f"{'format':>10} {'sniffed':>10} {'lines':>9} {'MB':>7} {'target(lines/s)':>16} {'all(lines/s)':>13} {'speakers':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.format:
+            path = os.path.join(tmp, f"{fmt}.txt")
+            write_synthetic_export(path, fmt, args.lines)
+            with open(path, encoding="utf-8") as f:
+                sniffed = analyzer.sniff_export_format([f.readline().rstrip("\n") for _ in range(analyzer.SNIFF_LINES)])
+            r = benchmark(path, args.repeat)
+            print(f"{fmt:>10} {sniffed or '-':>10} {r['lines']:>9} {r['mb']:>7.1f} "
+                  f"{r['target_lps']:>16,.0f} {r['all_lps']:>13,.0f} {r['speakers']:>9}")
+
+
+if __name__ == "__main__":
+    main()
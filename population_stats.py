@@ -0,0 +1,205 @@
+# population_stats.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] Big5 모집단 통계 서비스 (Population Statistics)
+======================================================================
+
+[시스템 개요]
+매칭 엔진(matcher.HybridMatcher)의 Z-Score 정규화에 쓰이는 Big5 평균/표준편차를
+요청마다 후보군에서 다시 계산하지 않고, 프로세스 단위로 유지하는 서비스입니다.
+/matching, /inbox, 블라인드 매칭, 관리자 시뮬레이션이 모두 같은 통계를 공유하므로
+어느 화면에서든 동일한 정규화 기준이 적용됩니다.
+
+[동작 방식]
+1. Welford 누적기: 대표 프로필(is_representative=True)이 추가/제거될 때
+   평균과 제곱편차합(M2)을 O(1)로 갱신합니다.
+2. 사용자 단위 갱신: refresh_user(user_id)가 해당 사용자의 현재 대표 프로필을 다시 읽어
+   이전 값을 빼고 새 값을 더합니다. (업로드, 대표 변경, 삭제, 정지 등에서 호출)
+3. 재동기화: 누적 오차와 다른 워커 프로세스의 변경을 반영하기 위해
+   POPULATION_STATS_RESYNC_SECONDS 주기로 DB에서 전체를 다시 적재합니다.
+
+[사용법]
+  mean, std = PopulationStatsService.snapshot()
+  PopulationStatsService.refresh_user(user_id)
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BIG5_COLUMNS = ('openness', 'conscientiousness', 'extraversion', 'agreeableness', 'neuroticism')
+
+# 데이터가 적을 때 보정에 쓰는 기본 분포 (matcher.HybridMatcher와 동일)
+DEFAULT_MEAN = np.array([50.0] * 5)
+DEFAULT_STD = np.array([15.0] * 5)
+SHRINK_COUNT = 10.0
+
+# 전체 재적재 주기 (초)
+POPULATION_STATS_RESYNC_SECONDS = 600
+
+
+class WelfordAccumulator:
+    """벡터 단위 Welford 누적기 (추가/제거 모두 O(1))"""
+
+    def __init__(self, dim=5):
+        self.count = 0
+        self.mean = np.zeros(dim)
+        self.m2 = np.zeros(dim)
+
+    def add(self, x):
+        x = np.asarray(x, dtype=float)
+        self.count += 1
+        delta = x - self.mean
+        self.mean = self.mean + delta / self.count
+        self.m2 = self.m2 + delta * (x - self.mean)
+
+    def remove(self, x):
+        x = np.asarray(x, dtype=float)
+        if self.count <= 1:
+            self.count = 0
+            self.mean = np.zeros_like(self.mean)
+            self.m2 = np.zeros_like(self.m2)
+            return
+        delta = x - self.mean
+        self.count -= 1
+        self.mean = self.mean - delta / self.count
+        self.m2 = np.maximum(self.m2 - delta * (x - self.mean), 0.0)
+
+    def std(self):
+        """모표준편차 (ddof=0, np.std와 동일)"""
+        if self.count == 0:
+            return np.zeros_like(self.mean)
+        return np.sqrt(self.m2 / self.count)
+
+
+def shrink_stats(count, mean, std):
+    """
+    표본 수가 적을 때 기본 분포(평균 50, 표준편차 15) 쪽으로 보정한 통계를 반환합니다.
+    (HybridMatcher._calculate_population_stats와 동일한 공식)
+    """
+    weight_real = min(1.0, count / SHRINK_COUNT)
+    shrunk_mean = (mean * weight_real) + (DEFAULT_MEAN * (1 - weight_real))
+    shrunk_std = ((std + 1e-6) * weight_real) + (DEFAULT_STD * (1 - weight_real))
+    return shrunk_mean, shrunk_std
+
+
+class PopulationStatsService:
+    """
+    대표 프로필 Big5 분포를 프로세스 단위로 유지하는 서비스.
+    모든 메서드는 Flask 애플리케이션 컨텍스트 안에서 호출해야 합니다.
+    """
+
+    _lock = threading.RLock()
+    _members = {}          # user_id -> Big5 원점수 벡터
+    _acc = WelfordAccumulator()
+    _loaded_at = None      # 마지막 전체 재적재 시각 (time.monotonic)
+
+    @classmethod
+    def _load_vector(cls, user_id):
+        """사용자의 현재 대표 프로필 Big5 벡터 (모집단 제외 대상이면 None)"""
+        from extensions import db, User, PersonalityResult
+
+        row = db.session.query(*[getattr(PersonalityResult, c) for c in BIG5_COLUMNS])\
+            .join(User, PersonalityResult.user_id == User.user_id)\
+            .filter(
+                PersonalityResult.user_id == user_id,
+                PersonalityResult.is_representative == True,
+                User.is_banned.is_not(True)
+            ).first()
+        if row is None:
+            return None
+        return np.array([50.0 if v is None else v for v in row], dtype=float)
+
+    @classmethod
+    def rebuild(cls):
+        """DB에서 대표 프로필 전체를 다시 읽어 누적기를 새로 구성합니다."""
+        from extensions import db, User, PersonalityResult
+
+        rows = db.session.query(PersonalityResult.user_id, *[getattr(PersonalityResult, c) for c in BIG5_COLUMNS])\
+            .join(User, PersonalityResult.user_id == User.user_id)\
+            .filter(PersonalityResult.is_representative == True, User.is_banned.is_not(True))\
+            .all()
+
+        members = {}
+        acc = WelfordAccumulator()
+        for user_id, *scores in rows:
+            if user_id in members:
+                continue  # 대표 프로필 중복 시 첫 행만 반영
+            vec = np.array([50.0 if v is None else v for v in scores], dtype=float)
+            members[user_id] = vec
+            acc.add(vec)
+
+        with cls._lock:
+            cls._members = members
+            cls._acc = acc
+            cls._loaded_at = time.monotonic()
+
+        logger.info(f"[PopulationStats] 모집단 통계 재적재 완료 ({acc.count}명)")
+        return acc.count
+
+    @classmethod
+    def _ensure_loaded(cls):
+        with cls._lock:
+            loaded_at = cls._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > POPULATION_STATS_RESYNC_SECONDS:
+            cls.rebuild()
+
+    @classmethod
+    def refresh_user(cls, user_id):
+        """사용자의 대표 프로필 변경을 누적기에 반영합니다. (추가/교체/제거 모두 처리)"""
+        if user_id is None:
+            return
+        try:
+            with cls._lock:
+                if cls._loaded_at is None:
+                    return  # 아직 적재 전이면 첫 snapshot에서 전체를 읽음
+            vec = cls._load_vector(user_id)
+            with cls._lock:
+                old = cls._members.pop(user_id, None)
+                if old is not None:
+                    cls._acc.remove(old)
+                if vec is not None:
+                    cls._members[user_id] = vec
+                    cls._acc.add(vec)
+        except Exception:
+            logger.exception(f"[PopulationStats] 사용자 통계 갱신 실패 (user_id={user_id})")
+
+    @classmethod
+    def remove_user(cls, user_id):
+        """삭제된 사용자를 누적기에서 제외합니다."""
+        with cls._lock:
+            old = cls._members.pop(user_id, None)
+            if old is not None:
+                cls._acc.remove(old)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        보정된 (평균, 표준편차)를 반환합니다.
+        DB 조회에 실패하면 None을 반환하며, 이 경우 호출 측은 후보군 기반 통계로 대체합니다.
+        """
+        try:
+            cls._ensure_loaded()
+        except Exception:
+            logger.exception("[PopulationStats] 모집단 통계 적재 실패")
+            return None
+
+        with cls._lock:
+            count = cls._acc.count
+            mean = cls._acc.mean.copy()
+            std = cls._acc.std()
+        return shrink_stats(count, mean, std)
+
+    @classmethod
+    def resync_job(cls, app):
+        """[스케줄러] 주기적으로 모집단 통계를 DB와 재동기화합니다."""
+        with app.app_context():
+            try:
+                cls.rebuild()
+            except Exception:
+                logger.exception("[PopulationStats] 주기적 재동기화 실패")
@@ -0,0 +1,127 @@
+# realtime.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 실시간 푸시 채널 (Socket.IO)
+======================================================================
+
+[시스템 개요]
+1:1 채팅, 그룹 채팅, 블라인드 채팅과 인박스는 클라이언트 폴링으로 새 데이터를 확인합니다.
+Flask-SocketIO가 설치되어 있고 REALTIME_ENABLED가 켜져 있으면, 메시지 전송 시점에
+해당 방을 구독 중인 클라이언트에게 'update' 이벤트를 보내(fan-out) 즉시 갱신하게 합니다.
+푸시는 "새 데이터가 있다"는 신호만 전달하며, 실제 데이터는 기존 커서 API(after_id 등)로
+가져옵니다. 따라서 읽음 처리/권한 검사는 기존 API 한 곳에만 존재합니다.
+
+[방(Room) 이름]
+- chat:<match_code>   1:1 채팅 (MatchRequest 당사자)
+- group:<room_code>   그룹 채팅 (GroupChatParticipant)
+- blind:<match_code>  블라인드 채팅 (BlindMatch 당사자)
+- inbox:<user_id>     인박스 (본인)
+- analysis:<job_code> 채팅 로그 분석 작업 상태 (본인 작업, analysis_pipeline.py)
+
+[구성]
+- SOCKETIO_MESSAGE_QUEUE 미설정: 프로세스 내부 큐 (로컬 개발/단일 워커, 외부 브로커 불필요)
+- 여러 워커 운영 시: SOCKETIO_MESSAGE_QUEUE=redis://... 로 워커 간 전파
+- 라이브러리가 없거나 비활성화되면 publish()는 아무 것도 하지 않고, 클라이언트는 폴링만 사용합니다.
+
+[사용법]
+  realtime.init_app(app)
+  realtime.publish(f"chat:{match_code}")
+"""
+
+import logging
+
+from flask import session
+
+try:
+    from flask_socketio import SocketIO, join_room
+except ImportError:  # 선택 의존성 (requirements.txt의 [RECOMMENDED] 항목)
+    SocketIO = None
+    join_room = None
+
+logger = logging.getLogger(__name__)
+
+socketio = SocketIO() if SocketIO is not None else None
+_enabled = False
+
+
+def init_app(app):
+    """앱 설정에 따라 Socket.IO 서버를 연결합니다. (사용 불가 시 폴링 전용으로 동작)"""
+    global _enabled
+
+    if not app.config.get('REALTIME_ENABLED', False):
+        logger.info("[Realtime] 비활성화됨 (폴링 전용)")
+        return
+    if socketio is None:
+        logger.warning("[Realtime] flask_socketio 미설치 - 폴링 전용으로 동작합니다.")
+        return
+
+    socketio.init_app(
+        app,
+        message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE') or None,
+        async_mode=app.config.get('SOCKETIO_ASYNC_MODE') or None,
+    )
+    _register_handlers()
+    _enabled = True
+    logger.info("[Realtime] Socket.IO 푸시 채널 활성화")
+
+
+def is_enabled():
+    return _enabled
+
+
+def publish(room, **payload):
+    """room 구독자에게 갱신 신호를 보냅니다. (비활성화 시 무시, 실패해도 요청은 계속 진행)"""
+    if not _enabled:
+        return
+    try:
+        socketio.emit('update', dict(payload, room=room), to=room)
+    except Exception:
+        logger.exception(f"[Realtime] 푸시 전송 실패 (room={room})")
+
+
+def _authorize_room(user_id, kind, key):
+    """구독 요청을 검증하고 방 이름을 반환합니다. (권한 없으면 None)"""
+    from extensions import MatchRequest, GroupChatRoom, GroupChatParticipant, BlindMatch, AnalysisJob
+
+    if kind == 'inbox':
+        return f"inbox:{user_id}"
+
+    if kind == 'chat':
+        req = MatchRequest.query.filter_by(match_code=str(key)).first()
+        if req and user_id in (req.sender_id, req.receiver_id):
+            return f"chat:{req.match_code}"
+
+    elif kind == 'group':
+        room = GroupChatRoom.query.filter_by(room_code=str(key)).first()
+        if room and GroupChatParticipant.query.filter_by(room_id=room.id, user_id=user_id).first():
+            return f"group:{room.room_code}"
+
+    elif kind == 'blind':
+        match = BlindMatch.query.filter_by(match_code=str(key)).first()
+        if match and user_id in (match.user1_id, match.user2_id):
+            return f"blind:{match.match_code}"
+
+    elif kind == 'analysis':
+        job = AnalysisJob.query.filter_by(job_code=str(key)).first()
+        if job and job.user_id == user_id:
+            return f"analysis:{job.job_code}"
+
+    return None
+
+
+def _register_handlers():
+    @socketio.on('subscribe')
+    def on_subscribe(data):
+        user_id = session.get('user_id')
+        if not user_id or not isinstance(data, dict):
+            return {'ok': False}
+        try:
+            room = _authorize_room(user_id, data.get('kind'), data.get('id'))
+        except Exception:
+            logger.exception(f"[Realtime] 구독 검증 실패 (user_id={user_id}, data={data})")
+            return {'ok': False}
+        if room is None:
+            return {'ok': False}
+        join_room(room)
+        return {'ok': True, 'room': room}
@@ -0,0 +1,191 @@
+# recommendation_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 사용자별 매칭 추천 목록 캐시 (Materialized Recommendations)
+======================================================================
+
+[시스템 개요]
+/matching 방문마다 전체 후보를 다시 채점하지 않도록, 사용자별 상위
+RECOMMENDATION_TOP_N명의 후보 ID와 점수를 user_recommendations 테이블에 보관합니다.
+조회는 (user_id, rank_order) 인덱스를 타는 단일 SELECT이며, 실제 점수와 상세 설명은
+캐시된 후보 몇십 명만 다시 채점해 만듭니다. (MatchManager.get_matching_candidates)
+
+[무효화 규칙]
+1. 조회 시점 필터: 정지/삭제된 후보, 새로 매칭 요청이 생긴 상대, 더미 숨김 대상은
+   읽을 때 제외합니다. 제외 후 남은 후보가 부족하면 캐시 미스로 처리합니다.
+2. 재계산 표시(is_stale):
+   - 프로필 변경: 본인 목록 + 해당 사용자를 포함한 다른 사용자 목록
+   - 매칭 거절/취소/삭제: 두 사용자 목록 (다시 후보가 될 수 있으므로)
+   - 더미 숨김 설정 변경: 전체
+3. 만료: RECOMMENDATION_TTL_SECONDS가 지난 목록은 사용하지 않습니다.
+
+오래되었거나(stale) 없는 목록은 요청 시 실시간 채점으로 대체하고 결과를 다시 저장합니다.
+스케줄러(MatchManager.refresh_recommendations_job)가 RECOMMENDATION_REFRESH_AGE_SECONDS가
+지난 목록을 미리 재계산하므로, 자주 방문하는 사용자는 대부분 캐시에서 응답합니다.
+
+[사용법]
+  ids = RecommendationCache.read(user_id, excluded_user_ids, hide_dummies, limit)
+  RecommendationCache.store(user_id, candidates)
+  RecommendationCache.invalidate_candidate(user_id)
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# 사용자별 보관 후보 수 (조회 시 필터로 빠질 인원을 감안해 화면 표시 수보다 넉넉하게)
+RECOMMENDATION_TOP_N = 60
+# 목록 유효 시간 / 스케줄러가 미리 재계산하는 기준 (초)
+RECOMMENDATION_TTL_SECONDS = 3600
+RECOMMENDATION_REFRESH_AGE_SECONDS = 1800
+# 스케줄러 1회 실행당 재계산할 최대 사용자 수
+RECOMMENDATION_REFRESH_BATCH = 200
+
+
+class RecommendationCache:
+    """
+    user_recommendations 테이블 읽기/쓰기 헬퍼.
+    모든 메서드는 Flask 애플리케이션 컨텍스트 안에서 호출해야 합니다.
+    """
+
+    @classmethod
+    def read(cls, user_id, excluded_user_ids, hide_dummies, limit):
+        """
+        캐시된 후보 ID 목록(순위순)을 반환합니다.
+        목록이 없거나, 재계산 표시/만료되었거나, 필터 후 후보가 부족하면 None을 반환합니다.
+        """
+        from extensions import db, User, UserRecommendation
+
+        try:
+            rows = db.session.query(
+                UserRecommendation.candidate_id, UserRecommendation.is_stale, UserRecommendation.computed_at,
+                User.user_id.label('exists_id'), User.is_banned, User.is_dummy
+            ).outerjoin(User, UserRecommendation.candidate_id == User.user_id)\
+             .filter(UserRecommendation.user_id == user_id)\
+             .order_by(UserRecommendation.rank_order)\
+             .all()
+        except Exception:
+            logger.exception(f"[RecommendationCache] 추천 목록 조회 실패 (user_id={user_id})")
+            return None
+
+        if not rows:
+            return None
+
+        cutoff = datetime.utcnow() - timedelta(seconds=RECOMMENDATION_TTL_SECONDS)
+        if any(r.is_stale or r.computed_at is None or r.computed_at < cutoff for r in rows):
+            return None
+
+        candidate_ids = [
+            r.candidate_id for r in rows
+            if r.exists_id is not None
+            and not r.is_banned
+            and str(r.candidate_id) not in excluded_user_ids
+            and not (hide_dummies and r.is_dummy)
+        ]
+
+        # 목록이 꽉 차 있었는데 필터 후 부족하면, 목록 밖 후보가 빈자리를 채워야 하므로 재계산
+        if len(candidate_ids) < limit and len(rows) >= RECOMMENDATION_TOP_N:
+            return None
+        return candidate_ids
+
+    @classmethod
+    def store(cls, user_id, candidates):
+        """실시간 채점 결과(순위순 후보 dict 리스트)로 사용자의 추천 목록을 교체합니다."""
+        from extensions import db, UserRecommendation
+
+        try:
+            UserRecommendation.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+            now = datetime.utcnow()
+            db.session.add_all([
+                UserRecommendation(
+                    user_id=user_id,
+                    candidate_id=cand['user_id'],
+                    rank_order=rank,
+                    match_score=cand.get('match_score', 0),
+                    is_stale=False,
+                    computed_at=now
+                )
+                for rank, cand in enumerate(candidates[:RECOMMENDATION_TOP_N])
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"[RecommendationCache] 추천 목록 저장 실패 (user_id={user_id})")
+
+    @classmethod
+    def mark_stale(cls, user_ids):
+        """사용자들의 추천 목록에 재계산 표시를 합니다."""
+        from extensions import db, UserRecommendation
+
+        user_ids = [int(uid) for uid in user_ids if uid is not None]
+        if not user_ids:
+            return
+        try:
+            UserRecommendation.query.filter(UserRecommendation.user_id.in_(user_ids))\
+                .update({UserRecommendation.is_stale: True}, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"[RecommendationCache] 재계산 표시 실패 (user_ids={user_ids})")
+
+    @classmethod
+    def mark_all_stale(cls):
+        """전체 추천 목록에 재계산 표시를 합니다. (더미 숨김 등 전역 설정 변경 시)"""
+        from extensions import db, UserRecommendation
+
+        try:
+            UserRecommendation.query.update({UserRecommendation.is_stale: True}, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("[RecommendationCache] 전체 재계산 표시 실패")
+
+    @classmethod
+    def invalidate_candidate(cls, user_id):
+        """
+        사용자의 프로필/계정 상태가 바뀐 경우: 본인 목록과 이 사용자를 포함한 목록을 재계산 대상으로 표시합니다.
+        본인 목록이 있었는지 여부를 반환합니다. (있었으면 호출 측에서 백그라운드 재계산)
+        """
+        from extensions import db, UserRecommendation
+
+        try:
+            holders = [uid for (uid,) in db.session.query(UserRecommendation.user_id)
+                       .filter(UserRecommendation.candidate_id == user_id).distinct()]
+            has_own = db.session.query(UserRecommendation.id)\
+                .filter(UserRecommendation.user_id == user_id).first() is not None
+        except Exception:
+            logger.exception(f"[RecommendationCache] 무효화 대상 조회 실패 (user_id={user_id})")
+            return False
+
+        cls.mark_stale(holders + [user_id])
+        return has_own
+
+    @classmethod
+    def remove_user(cls, user_id):
+        """삭제된 사용자의 목록을 지우고, 이 사용자를 포함한 목록을 재계산 대상으로 표시합니다."""
+        from extensions import db, UserRecommendation
+
+        cls.invalidate_candidate(user_id)
+        try:
+            UserRecommendation.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"[RecommendationCache] 추천 목록 삭제 실패 (user_id={user_id})")
+
+    @classmethod
+    def refresh_targets(cls, batch=RECOMMENDATION_REFRESH_BATCH):
+        """스케줄러가 미리 재계산할 사용자 ID 목록 (재계산 표시 또는 오래된 목록, 오래된 순)"""
+        from extensions import db, UserRecommendation
+        from sqlalchemy import or_
+
+        cutoff = datetime.utcnow() - timedelta(seconds=RECOMMENDATION_REFRESH_AGE_SECONDS)
+        rows = db.session.query(UserRecommendation.user_id)\
+            .filter(
+                UserRecommendation.rank_order == 0,
+                or_(UserRecommendation.is_stale == True, UserRecommendation.computed_at < cutoff)
+            ).order_by(UserRecommendation.computed_at)\
+            .limit(batch).all()
+        return [uid for (uid,) in rows]
@@ -12,6 +12,7 @@
 
 from app import app
 from extensions import db
+from candidate_store import CandidateStore
 
 def reset_database():
     print("WARNING: This will delete ALL data in the database.")
@@ -24,6 +25,9 @@ def reset_database():
             
             print("Creating all tables from extensions.py...")
             db.create_all() # 모델 정의대로 테이블 생성
+
+            # 워커들이 매핑 중인 후보 스냅샷도 빈 상태로 다시 발행
+            CandidateStore.rebuild()
             
             print("Database has been reset successfully!")
     else:
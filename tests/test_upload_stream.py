@@ -0,0 +1,68 @@
+# tests/test_upload_stream.py
+# -*- coding: utf-8 -*-
+
+"""
+upload_stream.ChatUploadRequest: 중단된 업로드의 파일 정리
+실행: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+from flask import Flask, jsonify, request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upload_stream import ChatUploadRequest, finish_upload  # noqa: E402
+
+BOUNDARY = 'EchoMindBoundary'
+CHAT = '[지영] [오후 1:00] 안녕하세요\n'.encode('utf-8') * 200
+
+
+def _file_part():
+    return (f'--{BOUNDARY}\r\n'
+            'Content-Disposition: form-data; name="file"; filename="chat.txt"\r\n'
+            'Content-Type: text/plain\r\n\r\n').encode('utf-8') + CHAT
+
+
+@pytest.fixture
+def upload_dir(tmp_path):
+    return tmp_path
+
+
+@pytest.fixture
+def client(upload_dir):
+    app = Flask(__name__)
+    app.request_class = ChatUploadRequest
+    app.config['UPLOAD_FOLDER'] = str(upload_dir)
+
+    @app.route('/upload', methods=['POST'], endpoint='upload_chat')
+    def upload_chat():
+        file = request.files.get('file')
+        if file is None:
+            return jsonify(saved=None)
+        return jsonify(saved=os.path.basename(finish_upload(file, str(upload_dir)).path))
+
+    return app.test_client()
+
+
+def test_aborted_upload_removes_partial_file(client, upload_dir):
+    """종료 경계 없이 끊긴 본문: files에 들어가지 못한 싱크의 파일도 요청 종료 시 삭제"""
+    response = client.post('/upload', data=_file_part(),
+                           content_type=f'multipart/form-data; boundary={BOUNDARY}')
+
+    assert response.get_json() == {'saved': None}
+    assert os.listdir(upload_dir) == []
+
+
+def test_completed_upload_keeps_file(client, upload_dir):
+    """정상 업로드: finish_upload로 확정한 파일은 요청이 끝나도 유지"""
+    body = _file_part() + f'\r\n--{BOUNDARY}--\r\n'.encode('utf-8')
+    response = client.post('/upload', data=body,
+                           content_type=f'multipart/form-data; boundary={BOUNDARY}')
+
+    saved = response.get_json()['saved']
+    assert os.listdir(upload_dir) == [saved]
+    with open(upload_dir / saved, 'rb') as f:
+        assert f.read() == CHAT
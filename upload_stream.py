@@ -0,0 +1,208 @@
+# upload_stream.py
+# -*- coding: utf-8 -*-
+
+"""
+[EchoMind] 채팅 로그 업로드 스트리밍 수신 (요청 본문 -> 저장/해시/크기 제한/파싱을 한 번에)
+======================================================================
+
+[시스템 개요]
+기본 Werkzeug는 업로드 파일을 임시 파일(SpooledTemporaryFile)에 받아 두고, 업로드 뷰가 이를 다시 읽어
+uploads/에 저장한 뒤, 분석 워커가 저장된 파일을 또 읽어 파싱합니다.
+ChatUploadRequest는 /upload의 .txt 파일 파트를 ChatUploadSink로 직접 받아, 본문 조각이 도착할 때마다
+  1. uploads/에 한 번만 기록 (분석 작업은 다른 스레드/프로세스가 처리하므로 작업용 사본은 필요)
+  2. SHA-256 계산 (분석 캐시 키)
+  3. 크기 제한 확인 (MAX_CONTENT_LENGTH)
+  4. 줄 단위로 디코딩하여 main.SpeakerStreamParser에 전달 (분석 캐시 사용 시)
+을 같은 패스에서 처리합니다. 파싱 결과는 업로드 뷰가 분석 캐시에 넣어 두므로 워커는 파일을 다시 읽지 않습니다.
+
+[조기 거부]
+앞 SNIFF_LINES줄에서 카카오톡 메시지 형식을 찾지 못하거나 크기 제한을 넘으면 본문을 끝까지 받기 전에
+UploadRejected로 중단하고 기록 중이던 파일을 삭제합니다.
+
+[사용법]
+  app.request_class = ChatUploadRequest
+  upload = finish_upload(file, app.config['UPLOAD_FOLDER'])  # UploadRejected 가능
+  upload.path, upload.file_hash, upload.speakers
+"""
+
+import io
+import os
+import uuid
+import codecs
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import Request, current_app
+from werkzeug.utils import secure_filename
+
+from config import config_by_name
+from analysis_cache import save_and_hash
+import main as analyzer
+
+logger = logging.getLogger(__name__)
+
+env = os.getenv('FLASK_ENV', 'development')
+cfg = config_by_name[env]
+
+
+class UploadRejected(Exception):
+    """
+    업로드를 받는 도중 거부 (크기 초과 / 카카오톡 형식 아님)
+    Werkzeug 폼 파서는 ValueError를 조용히 무시하므로 ValueError를 상속하지 않습니다.
+    """
+
+
+@dataclass
+class UploadedChat:
+    path: str
+    file_hash: str
+    speakers: Optional[analyzer.SpeakerParse] = None  # 업로드 중 파싱한 결과 (분석 캐시 미사용 시 None)
+
+
+def upload_path(upload_folder, filename):
+    return os.path.join(upload_folder, f"{uuid.uuid4().hex}_{secure_filename(filename)}")
+
+
+class ChatUploadSink:
+    """Werkzeug 파일 파트 스트림 대상: 기록과 동시에 해시/크기 확인/형식 판별/파싱"""
+
+    def __init__(self, path, max_bytes=None, parse=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._file = open(path, 'w+b')
+        self._digest = hashlib.sha256()
+        # 파일을 open(..., encoding="utf-8", errors="ignore")로 읽을 때와 같은 디코딩/줄바꿈 변환
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder('utf-8')(errors='ignore'), translate=True)
+        self._partial = ''
+        self._head = []  # 형식 확인 전까지의 줄 (확인 후 None)
+        self._parser = analyzer.SpeakerStreamParser() if parse else None
+        self._kept = False
+
+    # -------------------------------------------------------------------
+    # [Werkzeug 스트림 인터페이스]
+    # -------------------------------------------------------------------
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes and self.size > self.max_bytes:
+            self._reject(f"파일이 너무 큽니다. (최대 {self.max_bytes // (1024 * 1024)}MB)")
+        self._file.write(data)
+        self._digest.update(data)
+        self._feed(self._decoder.decode(data))
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        return self._file.seek(offset, whence)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def readline(self, size=-1):
+        return self._file.readline(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """요청 종료 시 Werkzeug가 호출합니다. finish() 되지 않은 업로드는 파일을 삭제합니다."""
+        if not self._kept:
+            self.discard()
+        elif not self._file.closed:
+            self._file.close()
+
+    # -------------------------------------------------------------------
+    # [업로드 완료 / 폐기]
+    # -------------------------------------------------------------------
+    def finish(self):
+        """본문 수신이 끝난 업로드를 확정하고 UploadedChat을 반환합니다."""
+        self._feed(self._decoder.decode(b'', final=True), final=True)
+        if self._head is not None:
+            self._check_format()  # SNIFF_LINES보다 짧은 파일
+        speakers = self._parser.close() if self._parser else None
+        self._file.close()
+        self._kept = True
+        return UploadedChat(path=self.path, file_hash=self._digest.hexdigest(), speakers=speakers)
+
+    def discard(self):
+        try:
+            if not self._file.closed:
+                self._file.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"[UploadStream] 업로드 파일 삭제 실패: {e}")
+
+    # -------------------------------------------------------------------
+    # [내부]
+    # -------------------------------------------------------------------
+    def _feed(self, text, final=False):
+        lines = (self._partial + text).split('\n')
+        self._partial = '' if final else lines.pop()
+        if final and lines and not lines[-1]:
+            lines.pop()  # 마지막 줄바꿈 뒤의 빈 조각 (파일 읽기에서는 줄이 아님)
+        if not lines:
+            return
+        if self._head is not None:
+            self._head.extend(lines)
+            if len(self._head) >= analyzer.SNIFF_LINES:
+                self._check_format()
+        if self._parser:
+            self._parser.feed(lines)
+
+    def _check_format(self):
+        head, self._head = self._head, None
+        if analyzer.sniff_export_format(head[:analyzer.SNIFF_LINES]) is None:
+            self._reject("카카오톡 대화 내보내기(.txt) 형식이 아닙니다. 대화 내보내기 파일을 그대로 올려주세요.")
+
+    def _reject(self, message):
+        self.discard()
+        raise UploadRejected(message)
+
+
+class ChatUploadRequest(Request):
+    """
+    채팅 로그 업로드 엔드포인트의 .txt 파일 파트를 ChatUploadSink로 받는 요청 클래스
+    Werkzeug는 request.files에 들어간 스트림만 닫으므로, 본문이 잘리거나(클라이언트 중단/종료 경계 누락)
+    형식이 깨져 files에 들어가지 못한 싱크는 close()에서 직접 정리합니다. (완료되지 않은 파일 삭제)
+    """
+
+    STREAM_ENDPOINTS = {'upload_chat'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._upload_sinks = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint in self.STREAM_ENDPOINTS and filename and filename.endswith('.txt'):
+            sink = ChatUploadSink(
+                upload_path(current_app.config['UPLOAD_FOLDER'], filename),
+                max_bytes=current_app.config.get('MAX_CONTENT_LENGTH'),
+                parse=cfg.ANALYSIS_CACHE_ENABLED,
+            )
+            self._upload_sinks.append(sink)
+            return sink
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+    def close(self):
+        """요청 종료 시 Flask가 호출합니다. request.files 밖에 남은 싱크까지 닫습니다."""
+        try:
+            super().close()
+        finally:
+            for sink in self._upload_sinks:
+                sink.close()
+
+
+def finish_upload(file_storage, upload_folder):
+    """업로드된 .txt 파일을 확정합니다. (ChatUploadRequest를 거치지 않은 요청은 저장하면서 해시만 계산)"""
+    stream = file_storage.stream
+    if isinstance(stream, ChatUploadSink):
+        return stream.finish()
+
+    save_path = upload_path(upload_folder, file_storage.filename)
+    return UploadedChat(path=save_path, file_hash=save_and_hash(file_storage, save_path))